@@ -40,6 +40,32 @@ MAX_STUDENTS_PER_SLOT = 1500
 # Recommended: True
 USE_GRASP = True  
 
+# How GRASP improves each schedule it constructs by moving and swapping course groups.
+# "best" takes the best move or swap each step, "first" takes a random improving one, None skips the local search.
+# Recommended: "best"
+GRASP_LOCAL_SEARCH = "best"
+
+# Run the GRASP placements and local search steps as numba-compiled loops. Needs numba (pip install numba), otherwise NumPy is used.
+# Benchmark them with `python manage.py benchmark_grasp_kernels`.
+# Recommended: True
+GRASP_JIT = True
+
+# Number of processes of the GRASP pool, split between the numbers of courses of PHASE_1_NUM_COURSES. 0 uses every available core.
+# Recommended: 0
+GRASP_PROCESSES = 0
+
+# Number of best diverse schedules each GRASP process keeps in its elite pool.
+# Recommended: 10
+GRASP_ELITE_POOL_SIZE = 10
+
+# Number of GRASP restarts between two path relinkings of schedules from the elite pool. 0 disables path relinking.
+# Recommended: 50 to 200 restarts.
+GRASP_PATH_RELINKING_INTERVAL = 100
+
+# Number of schedules from the GRASP elite pool offered to SCIP as partial solutions when warm starting phase 1.
+# Recommended: 3
+PHASE_1_GRASP_SEEDS = 3
+
 # List of number of courses to handle in phase 1 optimization.
 # Recommended: 17-21 courses.
 # Does not recommend adding more than 5 different numbers.
@@ -49,10 +75,97 @@ PHASE_1_NUM_COURSES = [17, 18, 19, 20, 21]
 # Recommended: 30 to 60 seconds.
 PHASE_1_TIME_LIMIT = 60 # in seconds
 
+# Reuse the result of a phase 1 solve when a schedule of the same semester solves the same phase 1 again:
+# same constraints, phase 1 penalties (overlap, B2B and PMtoAM), number of courses, GRASP warm start, time limit,
+# MAX_STUDENTS_PER_SLOT and, with the GRASP warm start, GRASP_LOCAL_SEARCH, GRASP_ELITE_POOL_SIZE, GRASP_PATH_RELINKING_INTERVAL and PHASE_1_GRASP_SEEDS.
+# The schedule records that its phase 1 was reused. The results are kept in the database until the semester is deleted.
+# Recommended: True
+PHASE_1_CACHE = True
+
+# Numbers of courses and time limit of phase 1 for the schedules of a portfolio.
+# Every schedule of the portfolio solves phase 1 with and without GRASP for each number of courses.
+# Recommended: 17-20 courses, 300 seconds.
+PORTFOLIO_PHASE_1_NUM_COURSES = [20, 19, 18, 17]
+PORTFOLIO_PHASE_1_TIME_LIMIT = 300 # in seconds
+
 # Time limit for phase 2 optimization
 # Recommended: 2 to 8 hours.
 PHASE_2_TIME_LIMIT = 60 * 60 * 4 # in seconds
 
+# Time limit for building a schedule of every course group to warm start phase 2. 0 starts phase 2 without it.
+# The schedule is built with GRASP, then improved with the phase 2 objective, and given to SCIP as its first incumbent.
+# Recommended: 60 to 300 seconds.
+PHASE_2_WARM_START_TIME_LIMIT = 120 # in seconds
+
+# Time limit for re-optimizing an existing schedule or version, when the request does not give one.
+# The schedule is improved by a phase 2 solve starting from it, LNS around it, or a local search, without phase 1.
+# Recommended: 60 to 600 seconds.
+REOPTIMIZE_TIME_LIMIT = 300 # in seconds
+
+# Number of threads for SCIP's concurrent solver in phase 2.
+# If more than 1, only the best phase 1 result is optimized in phase 2, by one multi-threaded SCIP solve,
+# instead of one single-threaded process per phase 1 result. Compare both with `python manage.py benchmark_phase2`.
+# Recommended: 0 (one process per phase 1 result)
+PHASE_2_CONCURRENT_THREADS = 0
+
+# Seconds between two checkpoints of a running phase 2 run, on top of the one saved with every new incumbent. 0 disables the checkpoints.
+# If the job runner stops during phase 2 of a schedule, it resumes the runs from their checkpoints when it starts again, instead of losing the schedule.
+# The runs of a portfolio are not checkpointed.
+# Recommended: 300 seconds.
+PHASE_2_CHECKPOINT_INTERVAL = 300 # in seconds
+
+# Whether the phase 2 runs, one per phase 1 result, share their primal and dual bounds while they solve.
+# A run is stopped once its dual bound is worse than the incumbent of another run by PHASE_2_RACING_MARGIN (relative),
+# since it can not find a better schedule anymore. Its core goes to the runs waiting for one.
+# A negative margin also stops the runs that could only improve on the best incumbent by less than it.
+# Recommended: True, 0
+PHASE_2_RACING = True
+PHASE_2_RACING_MARGIN = 0
+
+# Number of cores the phase 1 and phase 2 processes of an optimization may use at once. 0 for every available core.
+# The solves wait in a queue until enough cores are free; a multi-threaded phase 2 solve takes PHASE_2_CONCURRENT_THREADS cores.
+# Recommended: 0
+OPTIMIZER_CORES = 0
+
+# Memory in MB the phase 1 and phase 2 solves of an optimization may use at once. 0 for no limit.
+# The memory of each solve is estimated from the size of its model before it starts, and the solves wait in a queue until their
+# estimates fit. Each solve gets its estimate as SCIP's memory limit. The log shows the estimate of every solve next to the memory it used.
+# Recommended: 0, or about 80% of the memory of the server divided by OPTIMIZATION_JOBS_CONCURRENCY.
+OPTIMIZER_MEMORY_BUDGET = 0
+
+# Number of optimization requests run at once by `python manage.py run_optimization_jobs`. The others wait in the queue.
+# Each request runs its own phase 1 and phase 2 processes, so more than 1 only helps with spare cores and memory.
+# Recommended: 1
+OPTIMIZATION_JOBS_CONCURRENCY = 1
+
+# Seconds between two heartbeats of a running optimization request.
+# A request that missed a few heartbeats, e.g. because its process was killed, no longer counts as running.
+# Recommended: 30 seconds.
+OPTIMIZATION_JOB_HEARTBEAT = 30 # in seconds
+
+# Whether the phase 2 3 in 24 and 4 in 48 window constraints are added only when a solution violates them.
+# The objective is the same either way, but the initial model is much smaller, since most windows are never binding.
+# Ignored when PHASE_2_CONCURRENT_THREADS is more than 1.
+# Recommended: False. Try True for semesters whose phase 2 model takes long to build or to solve the root LP.
+PHASE_2_LAZY_WINDOWS = False
+
+# Improve the phase 2 schedule with Large Neighborhood Search (LNS) after the phase 2 optimization.
+# LNS repeatedly frees a few course groups and re-solves a small model, keeping every improvement.
+# With LNS, PHASE_2_TIME_LIMIT can be shortened since LNS makes steady progress afterwards.
+USE_LNS = False
+
+# Time limit for the whole LNS search
+# Recommended: 1 to 4 hours.
+LNS_TIME_LIMIT = 60 * 60 # in seconds
+
+# Time limit for each LNS subproblem
+# Recommended: 30 to 120 seconds.
+LNS_SUBPROBLEM_TIME_LIMIT = 60 # in seconds
+
+# Number of course groups freed in each LNS subproblem
+# Recommended: 10 to 20 course groups.
+LNS_NEIGHBORHOOD_SIZE = 15
+
 # CSV File Column names in students.csv
 RANDOMIZED_ID_COL = "Randomized ID"
 STUDENT_CRN_COL = "CRN " # STUDENTS_CRN_COLS + "1", "2", etc. -->  "CRN 1", "CRN 2" ... 
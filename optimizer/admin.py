@@ -16,6 +16,7 @@ from .models import (
     ScheduleVersion,
     Semester,
     PortfolioID,
+    OptimizationProgress,
 )
 
 # Register your models here.
@@ -27,3 +28,4 @@ admin.site.register(CourseGroup)
 admin.site.register(PreferenceProfile)
 admin.site.register(ScheduleVersion)
 admin.site.register(PortfolioID)
+admin.site.register(OptimizationProgress)
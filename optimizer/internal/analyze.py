@@ -7,9 +7,10 @@ This file contains the internal logic for analyzing the schedule and computes in
 
 
 from ..internal import create_model, schedule
+from .evaluate import ScheduleEvaluator
 from datetime import datetime
+import numpy as np
 import pandas as pd
-import copy
 
 """
 Class that analyzes the given schedule
@@ -59,24 +60,27 @@ class Analyzer:
         Analyze a given solution
         """    
         students_df = self.students_df
-        copy_students_df = copy.deepcopy(students_df)
         schedule_info = self.course_info
 
         n = self.data["n"]
+        num_timeslots = len(self.sol_schedule)
 
-        students_processed = 0
         missing = {}
-        
-        for id in students_df["Randomized ID"].tolist():
-            for i in range(1, 16):
-                crn = students_df.loc[students_df["Randomized ID"] == id]["CRN " + str(i)].values[0]
-                        
+
+        # One pass over the students: the (crn, timeslot) of every exam of every student.
+        # A student enrolled in two crns of one group has two exams at the same timeslot, so it counts as an overlap.
+        student_ids = []
+        student_exams = []
+        crn_columns = ["CRN " + str(i) for i in range(1, 16)]
+        for row in students_df[["Randomized ID"] + crn_columns].itertuples(index=False, name=None):
+            id = row[0]
+            exams = []
+            for crn in row[1:]:
                 if pd.isnull(crn) or pd.isna(crn) or crn == -1:
                     continue
 
                 # CRN may be a string or an int, so check both
                 if str(crn) not in schedule_info and int(crn) not in schedule_info:
-                    copy_students_df.loc[copy_students_df["Randomized ID"] == id,"CRN " + str(i)] = -1
                     continue
                 elif str(crn) in schedule_info:
                     group = schedule_info[str(crn)]["course_group"]
@@ -84,19 +88,17 @@ class Analyzer:
                     group = schedule_info[int(crn)]["course_group"]
                 
                 if pd.isnull(group) or pd.isna(group):
-                    copy_students_df.loc[copy_students_df["Randomized ID"] == id,"CRN " + str(i)] = -1
                     continue
                 elif group not in self.group2slot: # the group does exist but it is not in the optimized schedule
-                    copy_students_df.loc[copy_students_df["Randomized ID"] == id,"CRN " + str(i)] = -1
                     if crn not in missing:
                         missing[crn] = 1
                     else:
                         missing[crn] += 1
                     continue
 
-                copy_students_df.loc[copy_students_df["Randomized ID"] == id,"CRN " + str(i)] = self.group2slot[group]
-
-            students_processed += 1   
+                exams.append((int(crn), int(self.group2slot[group])))
+            student_ids.append(id)
+            student_exams.append(sorted(exams, key=lambda x: x[1]))
                      
         bad_groups = []        
         for crn in missing:
@@ -124,14 +126,24 @@ class Analyzer:
         F_OVERLAP = "faculty_overlap"
         F_B2B = "faculty_back_to_back"
 
+        # Every exam is its own "group", already at its timeslot, so the evaluator counts the exams of every student at every timeslot.
+        rows = [i for i, exams in enumerate(student_exams) for crn, timeslot in exams]
+        slot_of = np.array([timeslot for exams in student_exams for crn, timeslot in exams], dtype=np.int64)
+        three_windows, four_windows = self.compute_windows(num_timeslots)
+        evaluator = ScheduleEvaluator(range(len(slot_of)), len(student_ids), (rows, np.arange(len(slot_of))), num_timeslots,
+                                      np.array([n[t] for t in range(num_timeslots)]), np.arange(num_timeslots - 1), three_windows, four_windows)
+        issues = evaluator.student_issues(evaluator.student_counts(slot_of))
+        has_exams = np.array([len(exams) > 0 for exams in student_exams], dtype=bool)
+        inconvenient = (issues["overlap"] + issues["B2B"] + issues["PMtoAM"] + issues["threein24"] + issues["fourin48"]) > 0
+
         global_issues = dict()
-        global_issues[OVERLAP] = 0
+        global_issues[OVERLAP] = int(issues["overlap"].sum())
         global_issues[FORCED_OVERLAP] = self.data["forced_overlap"]
-        global_issues[BACK_TO_BACK] = 0
-        global_issues[NIGHT_MORNING] = 0
-        global_issues[THREE_IN_24] = 0
-        global_issues[FOUR_IN_48] = 0
-        global_issues[INCONVENIENT_STUDENT] = 0
+        global_issues[BACK_TO_BACK] = int(issues["B2B"].sum())
+        global_issues[NIGHT_MORNING] = int(issues["PMtoAM"].sum())
+        global_issues[THREE_IN_24] = int(issues["threein24"].sum())
+        global_issues[FOUR_IN_48] = int(issues["fourin48"].sum())
+        global_issues[INCONVENIENT_STUDENT] = int(inconvenient.sum())
         
         student_overlap_problems = []
         student_b2b_problems = []
@@ -143,116 +155,29 @@ class Analyzer:
         global_issues[F_OVERLAP], fac_overlap_problems = self.find_faculty_overlaps(schedule_info,self.sol_schedule)
         global_issues[F_B2B], fac_b2b_problems = self.find_faculty_back_to_back(schedule_info,self.sol_schedule)
 
-        students_analyzed = 0
-
-        inconvenient_count = 0
-
-
-        for id in students_df["Randomized ID"].tolist():
-            inconvenient = False
-
-            timeslots = list()
-            local_issues = dict()
-            crns = list()
-            local_issues[OVERLAP] = 0
-            local_issues[THREE_IN_24] = 0
-            local_issues[FOUR_IN_48] = 0
-            local_issues[BACK_TO_BACK] = 0
-            local_issues[NIGHT_MORNING] = 0
-
-            for i in range(1, 16):
-                timeslot = copy_students_df.loc[copy_students_df["Randomized ID"] == id]["CRN " + str(i)].values[0]
-                if timeslot != -1:
-                    timeslots.append(timeslot)
-                    crns.append(int(students_df.loc[copy_students_df["Randomized ID"] == id]["CRN " + str(i)].values[0]))
-            if len(timeslots) == 0:
-                continue
-
-            
-            #combine so sorting the timeslots sorts the crns into the same order
-            combined_data = list(zip(crns, timeslots))
-
-            # Sort the tuples based on the timeslots
-            sorted_data = sorted(combined_data, key=lambda x: x[1])  # Sort based on the second element (timeslot)
-
-            # Unzip the sorted tuples back into separate crns and timeslots lists
-            crns, timeslots = zip(*sorted_data)
-
-            unique_timeslots = list(copy.deepcopy(timeslots))
-
-            # Overlap
+        # The descriptions of the problems, only for the students with issues.
+        for index in np.flatnonzero(inconvenient):
+            id = student_ids[index]
+            crns, timeslots = zip(*student_exams[index])
             for i in range(len(timeslots) - 1):
                 if timeslots[i] == timeslots[i + 1]:
-                    inconvenient = True
-                    local_issues[OVERLAP] += 1
-                    unique_timeslots.remove(timeslots[i])
-                    print("Overlap!", id, timeslots[i], "Enrolled Groups:", end=" ")
-                    print("timeslot:", self.timeslot_to_time(timeslots[i]))
+                    print("Overlap!", id, timeslots[i], "timeslot:", self.timeslot_to_time(timeslots[i]))
                     student_overlap_problems.append("ID: {}, timeslot: {}, crns: {}, {}".format(id, self.timeslot_to_time(timeslots[i]), crns[i], crns[i+1]))
-                    for j in range(1, 16):
-                        crn = students_df.loc[students_df["Randomized ID"] == id]["CRN " + str(j)].values[0]
-                        timeslot = copy_students_df.loc[copy_students_df["Randomized ID"] == id]["CRN " + str(j)].values[0]
-                        if pd.isnull(crn) or pd.isna(crn) or crn == -1 or pd.isna(timeslot) or timeslot == -1:
-                            continue
-                        
-            timeslots = unique_timeslots
-                
+
+            timeslots = sorted(set(timeslots))
             for i in range(len(timeslots) - 1):
-                # 4 in 48 hours
-                if i < len(timeslots) - 3:
-                    if timeslots[i + 3] - timeslots[i] < 8:
-                        first_exam_time = self.timeslot_to_time_object(timeslots[i])
-                        fourth_exam_time = self.timeslot_to_time_object(timeslots[i + 3])
-                        hours = (fourth_exam_time - first_exam_time).total_seconds() / 3600
-                        if hours < 48:
-                            local_issues[FOUR_IN_48] = 1
-                            four_in_48_problems.append("ID: {}, timeslot: {}".format(id, self.timeslot_to_time(timeslots[i])))
-                            inconvenient = True
-                        
-
-                # 3 in 24 hours
-                if i < len(timeslots) - 2:
-                    first_exam_time = self.timeslot_to_time_object(timeslots[i])
-                    third_exam_time = self.timeslot_to_time_object(timeslots[i + 2])
-                    hours = (third_exam_time - first_exam_time).total_seconds() / 3600
-                    if hours < 24:
-                        local_issues[THREE_IN_24] = 1
-                        three_in_24_problems.append("ID: {}, timeslot: {}".format(id, self.timeslot_to_time(timeslots[i])))
-                        inconvenient = True
-
-                # Back to back exam
+                if i < len(timeslots) - 3 and timeslots[i + 3] < four_windows[timeslots[i], 1]:
+                    four_in_48_problems.append("ID: {}, timeslot: {}".format(id, self.timeslot_to_time(timeslots[i])))
+                if i < len(timeslots) - 2 and timeslots[i + 2] < three_windows[timeslots[i], 1]:
+                    three_in_24_problems.append("ID: {}, timeslot: {}".format(id, self.timeslot_to_time(timeslots[i])))
                 if timeslots[i + 1] - timeslots[i] == 1 and n[timeslots[i]] == 0: 
-                    local_issues[BACK_TO_BACK] += 1
                     student_b2b_problems.append("ID: {}, first timeslot: {}".format(id, self.timeslot_to_time(timeslots[i])))
-                    inconvenient = True
-
-                # Night to morning exam
                 if timeslots[i + 1] - timeslots[i] == 1 and n[timeslots[i]] == 1:
-                    local_issues[NIGHT_MORNING] += 1
                     night_morning_problems.append("ID: {}".format(id))
-                    inconvenient = True
-                    
-            global_issues[OVERLAP] += local_issues[OVERLAP]
-            global_issues[THREE_IN_24] += 0 if local_issues[THREE_IN_24] == 0 else 1
-            global_issues[FOUR_IN_48] += 0 if local_issues[FOUR_IN_48] == 0 else 1
-            global_issues[BACK_TO_BACK] += local_issues[BACK_TO_BACK]
-            global_issues[NIGHT_MORNING] += local_issues[NIGHT_MORNING]
-            
-            if inconvenient:
-                inconvenient_count += 1
-
-            # Computes the number of students with inconvenient schedules
-            if local_issues[OVERLAP] > 0 or local_issues[THREE_IN_24] > 0 or local_issues[FOUR_IN_48] > 0 or local_issues[BACK_TO_BACK] > 0 or local_issues[NIGHT_MORNING] > 0:
-                global_issues[INCONVENIENT_STUDENT] += 1
-                inconvenience_problems.append("ID: {}".format(id))
-            
-            students_analyzed += 1
-            
-            if students_analyzed % 1000 == 0:
-                print(students_analyzed, "students analyzed")
+            inconvenience_problems.append("ID: {}".format(id))
             
-        print("Total students analyzed:", students_analyzed)
-        print("Total students with issues:", inconvenient_count)
+        print("Total students analyzed:", int(has_exams.sum()))
+        print("Total students with issues:", global_issues[INCONVENIENT_STUDENT])
         for key in [OVERLAP, FORCED_OVERLAP, THREE_IN_24, FOUR_IN_48, BACK_TO_BACK, NIGHT_MORNING, INCONVENIENT_STUDENT, F_OVERLAP, F_B2B]:
             print(key, global_issues[key])
 
@@ -267,6 +192,22 @@ class Analyzer:
         problem_dict[F_B2B] = fac_b2b_problems
         return global_issues, problem_dict
 
+    def compute_windows(self, num_timeslots):
+        """
+        The windows of the 3 in 24 and 4 in 48 issues, from the start times of the exams.
+        A 3 in 24 window of timeslot i ends at the first timeslot 24 hours or more after i.
+        A 4 in 48 window of timeslot i ends at the first timeslot 48 hours or more after i, or 8 timeslots after i.
+        returns: two arrays with the [start, end) window of every timeslot, for 3 in 24 and for 4 in 48
+        """
+        times = [self.timeslot_to_time_object(t) for t in range(num_timeslots)]
+        three = []
+        four = []
+        for i in range(num_timeslots):
+            hours = [(times[j] - times[i]).total_seconds() / 3600 for j in range(i, num_timeslots)]
+            three.append((i, next((i + k for k, h in enumerate(hours) if h >= 24), num_timeslots)))
+            four.append((i, next((i + k for k, h in enumerate(hours) if k >= 8 or h >= 48), num_timeslots)))
+        return np.array(three, dtype=int).reshape(-1, 2), np.array(four, dtype=int).reshape(-1, 2)
+
 
 
     def find_faculty_overlaps(self, info, sol_schedule):
@@ -0,0 +1,140 @@
+"""
+Exam Scheduler Web-UI
+Tsugunobu Miyake, Luke Snyder. 2025
+
+Checkpoints of the phase 2 runs, so that a long phase 2 can be resumed after the job runner stopped.
+The Phase2Checkpoint of every run is created with its phase 1 result before the runs start, so that the runs still waiting for a core
+or in their warm start when the job runner stopped are resumed too. While a run solves, its checkpoint is saved with every new incumbent
+and every PHASE_2_CHECKPOINT_INTERVAL seconds.
+A resumed run rebuilds the model from the same phase 1 result and starts from the saved incumbent.
+"""
+
+import hashlib
+import json
+import time
+
+import numpy as np
+from django.db import connections
+from pyscipopt import Eventhdlr, SCIP_EVENTTYPE
+
+from ..models import Phase2Checkpoint
+
+
+def canonical(value):
+    """
+    returns: string representing value the same way whatever the order of its dicts, lists and sets. Dict entries of 0 are left out
+    """
+    if isinstance(value, dict):
+        return "{" + ",".join(sorted(repr(key) + ":" + canonical(item) for key, item in value.items() if not (isinstance(item, (int, float)) and item == 0))) + "}"
+    if isinstance(value, (list, tuple, set)):
+        return "[" + ",".join(sorted(canonical(item) for item in value)) + "]"
+    return repr(value)
+
+def params_hash(shared_params):
+    """
+    param shared_params: SharedParams of the params of the model_creator
+    returns: hex sha256 of the params, the same whatever the order of the students, faculty and groups. The small params are hashed
+             by canonical, and every matrix as its buffer, with its rows and columns sorted. "v" is left out, since it follows from "u"
+    """
+    digest = hashlib.sha256()
+    for key in sorted(shared_params.small):
+        digest.update(key.encode())
+        digest.update(canonical(shared_params.small[key]).encode())
+    order = {key: [index[item] for item in sorted(index, key=repr)] for key, index in shared_params.indices.items()}
+    for key, (rows, cols, dtype) in sorted(shared_params.MATRICES.items()):
+        digest.update(key.encode())
+        digest.update(np.ascontiguousarray(getattr(shared_params, key)[np.ix_(order[rows], order[cols])]).data)
+    return digest.hexdigest()
+
+def run_hash(params_digest, penalties):
+    """
+    param params_digest: hex sha256 of the params, given by params_hash
+    param penalties: dict of the form {string of problem: float penalty associated with the problem}
+    returns: hex sha256 of the params and penalties of a phase 2 run, saved in its checkpoint
+    """
+    return hashlib.sha256((params_digest + json.dumps(penalties, sort_keys=True)).encode()).hexdigest()
+
+def load(schedule_entry):
+    """
+    returns: dict of the form {(phase1 cost, num_courses): Phase2Checkpoint} of the runs of the schedule, like the phase 1 results
+    """
+    return {(checkpoint.phase1_cost, checkpoint.num_courses): checkpoint for checkpoint in Phase2Checkpoint.objects.filter(schedule=schedule_entry)}
+
+def clear(schedule_entry):
+    Phase2Checkpoint.objects.filter(schedule=schedule_entry).delete()
+
+def create(schedule_pk, run_name, num_courses, phase1_cost, phase1_group2slot, params_hash):
+    """
+    Creates the checkpoint of a run before it starts, unless the run is resumed and already has one.
+    param phase1_group2slot: dict of the form {group:timeslot} fixed by phase 1
+    """
+    Phase2Checkpoint.objects.get_or_create(schedule_id=schedule_pk, run_name=run_name, defaults={
+        "num_courses": num_courses,
+        "phase1_cost": phase1_cost,
+        "phase1_group2slot": phase1_group2slot,
+        "params_hash": params_hash,
+    })
+
+def save(schedule_pk, run_name, fields):
+    """
+    Updates the checkpoint of a run, created by create. Called by the IncumbentWriter of the run.
+    param fields: dict of the Phase2Checkpoint fields to set
+    """
+    Phase2Checkpoint.objects.update_or_create(schedule_id=schedule_pk, run_name=run_name, defaults=fields)
+    # This runs in the writer thread, which has its own connection. Do not keep it open between checkpoints.
+    connections.close_all()
+
+
+class Phase2Checkpointer(Eventhdlr):
+    """
+    Saves the checkpoint of a phase 2 run with every new incumbent, and its elapsed time every interval seconds.
+    The writes go through the IncumbentWriter of the Phase2SCIPCallback, so wait_for_writes of the callback waits for them too.
+    """
+    EVENTS = SCIP_EVENTTYPE.BESTSOLFOUND | SCIP_EVENTTYPE.NODESOLVED
+
+    def __init__(self, callback, schedule_pk, checkpoint, interval):
+        """
+        param callback: Phase2SCIPCallback of the run
+        param checkpoint: dict with the "params_hash" and "phase1_cost" of the run, and the "elapsed_time" it already ran if resumed
+        param interval: seconds between two saves of the elapsed time
+        """
+        self.callback = callback
+        self.schedule_pk = schedule_pk
+        self.interval = interval
+        self.elapsed_before = checkpoint.get("elapsed_time", 0)
+        self.start_time = time.time()
+        self.last_save = self.start_time
+
+    def elapsed_time(self):
+        return self.elapsed_before + time.time() - self.start_time
+
+    def eventinit(self):
+        self.model.catchEvent(self.EVENTS, self)
+
+    def eventexit(self):
+        self.model.dropEvent(self.EVENTS, self)
+
+    def eventexec(self, event):
+        if event.getType() == SCIP_EVENTTYPE.BESTSOLFOUND:
+            self.save_incumbent(self.model.getBestSol())
+        elif time.time() - self.last_save >= self.interval:
+            self.last_save = time.time()
+            self.callback.submit(save, self.schedule_pk, self.callback.run_name, {"elapsed_time": self.elapsed_time()})
+
+    def save_incumbent(self, solution, finished=False):
+        self.last_save = time.time()
+        self.callback.submit(save, self.schedule_pk, self.callback.run_name, {
+            "group2slot": self.callback.get_SCIP_group2slot(solution),
+            "objective": self.model.getSolObjVal(solution),
+            "elapsed_time": self.elapsed_time(),
+            "finished": finished,
+        })
+
+    def finish(self):
+        """
+        Saves the final incumbent of the run, and marks the run as finished so that a resume does not solve it again.
+        """
+        if self.model.getNSols() > 0:
+            self.save_incumbent(self.model.getBestSol(), finished=True)
+        else:
+            self.callback.submit(save, self.schedule_pk, self.callback.run_name, {"elapsed_time": self.elapsed_time(), "finished": True})
@@ -19,11 +19,14 @@ import pandas as pd
 import os 
 from datetime import datetime, timedelta
 import itertools
-from pyscipopt import Eventhdlr, SCIP_EVENTTYPE
+from pyscipopt import Eventhdlr, SCIP_EVENTTYPE, Conshdlr, SCIP_RESULT
 import time
 
 import re
 
+from .evaluate import ScheduleEvaluator
+from .shared_params import nonzero_columns
+
 class ModelCreator:
     SURVEY_PREF = "survey"
     NIGHT_TO_MORNING_PREF = "fewer_night_morning"
@@ -418,14 +421,16 @@ class ModelCreator:
         phase1 = Phase1ModelCreator(self.params, initial_constraints, no_group2slot, self.semester_entry, num_phase1_courses, penalties)
         return phase1.create_SCIP_model(time_minimum)
 
-    def create_phase2_SCIP_model(self, penalties, num_courses, output_dir):
+    def create_phase2_SCIP_model(self, penalties, num_courses, output_dir, name=None, schedule_pk=None):
         """
         param penalties: dict with key being issue and value is penalty for incurring that issue.
         param num_courses: number of courses to be fixed in phase 1.
         param output_dir: directory to save the output files to.
+        param name: prefix of the output files. Defaults to "Fixed<num_courses>".
+        param schedule_pk: database id of the schedule being optimized. If given, every new incumbent is recorded as OptimizationProgress.
         """
-        phase2  = Phase2ModelCreator(self.params, penalties, num_courses, output_dir)
-        self.phase2SCIP_model = phase2.create_SCIP_model()
+        self.phase2 = Phase2ModelCreator(self.params, penalties, num_courses, output_dir, name, schedule_pk)
+        self.phase2SCIP_model = self.phase2.create_SCIP_model()
         return self.phase2SCIP_model
 
 
@@ -652,15 +657,24 @@ class Phase1SCIPCallback(Eventhdlr):
 Creates phase 2 model
 """
 class Phase2ModelCreator:
-    def __init__(self, params, penalties, num_courses, output_dir):
+    def __init__(self, params, penalties, num_courses, output_dir, name=None, schedule_pk=None):
         """
         param params: sets computed in Model Creator to use for model creation
         param penalties: dictionary with key being issue and value is penalty for incurring that issue
+        param name: prefix of the files the callback writes. Defaults to "Fixed<num_courses>".
+        param schedule_pk: database id of the schedule being optimized. If given, the callback records the progress in the database.
+        After create_SCIP_model, the variables are kept in self.sch ({(group, timeslot): x_gt}), self.student ({(student, timeslot): m_st}),
+        self.faculty ({(faculty, timeslot): o_ft}), self.bad and self.faculty_bad
+        so that other code (e.g. LNS) can fix or read them without searching the model by name.
         """
         self.data = params
         self.bad_things, self.penalties = scip.multidict(penalties)
         self.num_courses = num_courses
         self.output_dir = output_dir
+        self.name = name if name is not None else "Fixed" + str(num_courses)
+        self.schedule_pk = schedule_pk
+        # The copies made by SCIP's concurrent solver do not include python constraint handlers, so they would ignore the windows.
+        self.lazy_windows = settings.PHASE_2_LAZY_WINDOWS and settings.PHASE_2_CONCURRENT_THREADS <= 1
     
     def create_SCIP_model(self):
         decisions, m, o, stud_problem_combos, faculty_problem_combos = self.create_issues()
@@ -702,10 +716,7 @@ class Phase2ModelCreator:
         G = self.data["G"] 
         T = self.data["T"] 
         F = self.data["F"] 
-        h = self.data["h"] 
         d = self.data["d"] 
-        u = self.data["u"] 
-        v = self.data["v"] 
         n = self.data["n"] 
         N_s = self.data["N_s"] 
         num_exams = self.data["num_exams"]
@@ -718,6 +729,10 @@ class Phase2ModelCreator:
         print("Begin building the model.")
         print("G:", G)
 
+        # Groups of every student and faculty. The constraints sum over these instead of h[s,g] and u[f,g] over every group.
+        student_groups = nonzero_columns(self.data["h"], S, G)
+        faculty_groups = nonzero_columns(self.data["u"], F, G)
+
         ## Decision Variables
 
             # When a decision variable is indexed by a set of items, we can use the addVars method to add all of the variables at once.
@@ -768,7 +783,7 @@ class Phase2ModelCreator:
         for s in S:
             for t in T:
                 if d[t] == 1:
-                    mod.addCons(sum(h[s,g]*sch[g,t] for g in G) <= (1 + bad[s, t, "overlap"]), name="overlap_"+str(s)+","+str(t))
+                    mod.addCons(sum(sch[g,t] for g in student_groups[s]) <= (1 + bad[s, t, "overlap"]), name="overlap_"+str(s)+","+str(t))
             num_student += 1
         
         # m[s,t] constraint
@@ -776,21 +791,20 @@ class Phase2ModelCreator:
             for t in T:
                 # For binary m_st variable
                 if d[t] == 1:
-                    mod.addCons(sum(h[s,g]*sch[g,t] for g in G) <=  num_exams[s] * student[s,t], name="mst_constraint_"+str(s)+","+str(t))
+                    mod.addCons(sum(sch[g,t] for g in student_groups[s]) <=  num_exams[s] * student[s,t], name="mst_constraint_"+str(s)+","+str(t))
 
 
         print("m[s,t] set")
 
         # 3 exams in 24 hours
+        windows = []
         for s in S:
             if num_exams[s] < 3: # Not setting constraint if the student takes less than 3 exams
                 continue
 
             for start in T[0:len(T)-3]:
                 if d[start] == 1 and d[start + 3] == 1: 
-                    mod.addCons(sum(student[s,t] for t in range(start, start+4)) <= 2 + (num_exams[s] - 2) * bad[s,"threein24"], name="threein24_constraint_"+str(s)+","+str(start))
-
-        print("3 in 24 set")
+                    windows.append((s, "threein24", start, range(start, start+4), 2))
 
         # 4 exams in 48 hours
         for s in S:
@@ -798,12 +812,23 @@ class Phase2ModelCreator:
                 continue
             for start in T[0:len(T)-7]:
                 if start + 7 in d and d[start] == 1 and d[start + 7] == 1:
-                    mod.addCons(sum(student[s,t] for t in range(start, start+8)) <= 3 + (num_exams[s] - 3) * bad[s,"fourin48"], name="fourin48_constraint_"+str(s)+","+str(start))
+                    windows.append((s, "fourin48", start, range(start, start+8), 3))
                 elif start + 6 in d and d[start] == 1 and d[start + 6] == 1:
-                    mod.addCons(sum(student[s,t] for t in range(start, start+7)) <= 3 + (num_exams[s] - 3) * bad[s,"fourin48"], name="fourin48_constraint_"+str(s)+","+str(start))
-                
-
-        print("4 in 48 set")
+                    windows.append((s, "fourin48", start, range(start, start+7), 3))
+
+        # Each window: sum of m[s,t] in the window <= limit + (num_exams[s] - limit) * bad[s, issue]
+        if self.lazy_windows:
+            # Most windows are never binding. They are only added when a solution violates them.
+            window_conshdlr = Phase2WindowConshdlr(windows, student, bad, num_exams)
+            mod.includeConshdlr(window_conshdlr, "windows", "3 in 24 and 4 in 48 windows added when violated",
+                                sepapriority=1, enfopriority=-1, chckpriority=-1, sepafreq=1, needscons=True)
+            mod.addPyCons(mod.createCons(window_conshdlr, "windows", initial=False, separate=True, enforce=True, check=True, propagate=False))
+            print(len(windows), "3 in 24 and 4 in 48 windows are added lazily")
+        else:
+            for s, issue, start, window, limit in windows:
+                mod.addCons(sum(student[s,t] for t in window) <= limit + (num_exams[s] - limit) * bad[s,issue], name=issue+"_constraint_"+str(s)+","+str(start))
+            print("3 in 24 set")
+            print("4 in 48 set")
 
 
         # Back to back & night to morning
@@ -830,10 +855,10 @@ class Phase2ModelCreator:
             if f == "TBD":
                 pass
 
-            for g1 in G:
-                for g2 in G:
-                    if v[f,g1,g2] == 1:
-                        mod.addCons((sum(sch[g1,t] + sch[g2,t] for t in T if d[t] == 1) <=  1 + faculty_bad[f, "facultyoverlap"]), name="faculty_overlap_"+f+"_"+g1+"_"+g2)
+            # v[f,g1,g2] = 1 for every pair of groups of the faculty, including a group with itself
+            for g1 in faculty_groups[f]:
+                for g2 in faculty_groups[f]:
+                    mod.addCons((sum(sch[g1,t] + sch[g2,t] for t in T if d[t] == 1) <=  1 + faculty_bad[f, "facultyoverlap"]), name="faculty_overlap_"+f+"_"+g1+"_"+g2)
         print("Faculty overlaps set")
 
         # o[f,t] constraint
@@ -843,7 +868,7 @@ class Phase2ModelCreator:
             
             for t in T:
                 if d[t] == 1:
-                    mod.addCons(sum(u[f,g] * sch[g,t] for g in G) <=  f_num_exams[f] * faculty[f,t], name="oft_constraint_"+str(f)+","+str(t))
+                    mod.addCons(sum(sch[g,t] for g in faculty_groups[f]) <=  f_num_exams[f] * faculty[f,t], name="oft_constraint_"+str(f)+","+str(t))
 
             
             
@@ -861,9 +886,16 @@ class Phase2ModelCreator:
         print("Faculty back to backs set")
         print("Finish building the model")
 
-        eventhdlr = Phase2SCIPCallback(mod, num_courses=self.num_courses, output_dir=self.output_dir)
+        eventhdlr = Phase2SCIPCallback(mod, name=self.name, output_dir=self.output_dir, sch=sch, evaluator=ScheduleEvaluator.from_params(self.data), schedule_pk=self.schedule_pk)
         mod.includeEventhdlr(eventhdlr, "BESTSOLFOUND", "python event handler to catch BESTSOLFOUND")
 
+        self.model = mod
+        self.eventhdlr = eventhdlr
+        self.sch = sch
+        self.student = student
+        self.faculty = faculty
+        self.bad = bad
+        self.faculty_bad = faculty_bad
         return mod
 
 class Phase2SCIPCallback(Eventhdlr):
@@ -871,13 +903,33 @@ class Phase2SCIPCallback(Eventhdlr):
     This is a custom event that is added to the phase 2 scip model. 
     When a new incumbent solution is found, it saves the solution and analysis to files.
     Later, the main thread can read these files to get the best solution and analysis.
+    If schedule_pk is given, it also records the bounds and inconveniences as OptimizationProgress so the dashboard can show them.
+    Only the values are read inside the callback. Writing the files and the database is done by a background thread,
+    so call wait_for_writes() before reading the files.
     """
-    def __init__(self, mod, num_courses, output_dir):
+    INCONVENIENCE_TYPES = ["overlap", "B2B", "PMtoAM", "threein24", "fourin48", "facultyoverlap", "facultyB2B"]
+
+    def __init__(self, mod, name, output_dir, sch, evaluator, schedule_pk=None):
+        """
+        param sch: dict of the form {(group, timeslot): x_gt variable}
+        param evaluator: ScheduleEvaluator of the semester, counts the inconveniences of every new incumbent
+        """
         self.start_time = time.time()
         self.model = mod
-        self.name = "Fixed" + str(num_courses)
-        self.solnfile = os.path.join(output_dir, self.name + "_best_solution.json")
-        self.analysisfile = os.path.join(output_dir, self.name + "_analysis.json")
+        # Not self.name, which SCIP overwrites with the name given to includeEventhdlr.
+        self.run_name = name
+        self.schedule_pk = schedule_pk
+        self.best_obj = float('inf')
+        self.solnfile = os.path.join(output_dir, self.run_name + "_best_solution.json")
+        self.analysisfile = os.path.join(output_dir, self.run_name + "_analysis.json")
+        self.writer = None
+
+        # Exactly one x_gt of a group is 1, so sum(t * x_gt) is the timeslot of the group.
+        group_slots = dict()
+        for (g, t), var in sch.items():
+            group_slots.setdefault(g, []).append((t, var))
+        self.slot_exprs = {g: scip.quicksum(t * var for t, var in slot_vars) for g, slot_vars in group_slots.items()}
+        self.evaluator = evaluator
 
     def eventinit(self):
         self.model.catchEvent(SCIP_EVENTTYPE.BESTSOLFOUND, self)
@@ -886,58 +938,152 @@ class Phase2SCIPCallback(Eventhdlr):
         self.model.dropEvent(SCIP_EVENTTYPE.BESTSOLFOUND, self)
 
     def eventexec(self, event):
+        self.publish(self.model.getBestSol())
+
+    def publish(self, solution):
+        """
+        Writes the given solution to the files (and database) if it is better than the last one written.
+        Called for every new incumbent, and after a concurrent solve, whose solvers do not run this event handler.
+        """
         current_time = time.time()
         execution_time = current_time - self.start_time
 
+        # The model may be solved several times (e.g. by LNS). Never overwrite the files with a worse solution.
+        obj = self.model.getSolObjVal(solution)
+        if obj >= self.best_obj:
+            return
+        self.best_obj = obj
+
+        group2slot = self.get_SCIP_group2slot(solution)
+        inconveniences = self.get_SCIP_inconviences(group2slot)
+        inconveniences["ObjVal"] = obj
+
+        from . import progress
+        self.submit(self.write_files, group2slot, inconveniences)
+
+        if self.schedule_pk is not None:
+            dual_bound = self.model.getDualbound()
+            dual_bound = None if self.model.isInfinity(abs(dual_bound)) else dual_bound
+            self.submit(progress.record_progress, self.schedule_pk, self.run_name, execution_time, obj, dual_bound, self.model.getNNodes(), inconveniences)
+
+    def submit(self, function, *args):
+        """
+        Runs function(*args) in the background thread of this run, after the writes submitted before it.
+        """
+        from . import progress
+        if self.writer is None:
+            self.writer = progress.IncumbentWriter()
+        self.writer.submit(function, *args)
+
+    def write_files(self, group2slot, inconveniences):
         with open(self.solnfile, "w") as f:
-            group2slot = self.get_SCIP_group2slot()
             json.dump(group2slot, f)
 
         with open(self.analysisfile, "w") as f:
-            inconveniences = self.get_SCIP_inconviences()
-            inconveniences["ObjVal"] = self.model.getObjVal()
             json.dump(inconveniences, f)
 
-    def get_SCIP_group2slot(self):
-        model = self.model
-
-        group2slot = dict()
-        for v in model.getVars():
-            try:
-                solution = model.getBestSol()
-                if "x_gt" in v.name and abs(model.getSolVal(solution, v) - 1) < settings.EPSILON:
-                        result = re.search(r"x_gt\[(.+),([\d]+)\]", v.name)
-                        group2slot[result.group(1)] = int(result.group(2))
-            except UnicodeDecodeError:
-                print("hecked up on variable", v.name)
-                pass
+    def wait_for_writes(self):
+        """
+        Blocks until every incumbent found so far is written to the files and the database.
+        """
+        if self.writer is not None:
+            self.writer.flush()
 
-        return group2slot
+    def get_SCIP_group2slot(self, solution):
+        return {g: int(round(self.model.getSolVal(solution, expr))) for g, expr in self.slot_exprs.items()}
     
-    def get_SCIP_inconviences(self):
-        model = self.model
-        inconvinience_types = ["overlap", "B2B", "PMtoAM", "threein24", "fourin48", "facultyoverlap", "facultyB2B"]
-        inconviences = {key: 0 for key in inconvinience_types}
-
-        solution = model.getBestSol()
-
-        for v in model.getVars():
-            inconvience_value = model.getSolVal(solution, v)
-
-            if "facultyoverlap" in v.name:
-                inconviences["facultyoverlap"] += inconvience_value
-            elif "facultyB2B" in v.name:
-                inconviences["facultyB2B"] += inconvience_value
-            elif "overlap" in v.name:
-                inconviences["overlap"] += inconvience_value
-            elif "threein24" in v.name:
-                inconviences["threein24"] += inconvience_value
-            elif "fourin48" in v.name:
-                inconviences["fourin48"] += inconvience_value
-            elif "B2B" in v.name:
-                inconviences["B2B"] += inconvience_value
-            elif "PMtoAM" in v.name:
-                inconviences["PMtoAM"] += inconvience_value
-
-
-        return inconviences
\ No newline at end of file
+    def get_SCIP_inconviences(self, group2slot):
+        issues = self.evaluator.evaluate(self.evaluator.slots_of(group2slot))
+        return {key: issues[key] for key in self.INCONVENIENCE_TYPES}
+
+
+class Phase2WindowConshdlr(Conshdlr):
+    """
+    Constraint handler for the 3 in 24 and 4 in 48 windows of phase 2, used when PHASE_2_LAZY_WINDOWS is True.
+    The model starts without the window constraints. Whenever an LP, pseudo, or integer solution violates a window,
+    the window is added as the same linear constraint the eager model would have, so the objective is unchanged.
+    """
+    def __init__(self, windows, student, bad, num_exams):
+        """
+        param windows: list of (student, issue, start timeslot, timeslots of the window, limit)
+        param student: dict of the form {(student, timeslot): m_st variable}
+        param bad: dict of the form {(student, issue): badness variable}
+        param num_exams: dict of the form {student: number of exams}
+        """
+        self.windows = windows
+        self.student = student
+        self.bad = bad
+        self.num_exams = num_exams
+        self.added = set()
+
+    def consinitsol(self, constraints):
+        # Constraints added in a previous solve were freed with the transformed problem (e.g. between LNS subproblems).
+        self.added = set()
+
+    def find_violated(self, solution=None):
+        """
+        param solution: solution to check. None checks the current LP or pseudo solution
+        returns: list of indices of the windows violated by the solution that were not added yet
+        """
+        m_values = dict()
+        bad_values = dict()
+        violated = []
+        for i, (s, issue, start, window, limit) in enumerate(self.windows):
+            if i in self.added:
+                continue
+            if (s, issue) not in bad_values:
+                bad_values[s, issue] = self.model.getSolVal(solution, self.bad[s, issue])
+            total = 0
+            for t in window:
+                if (s, t) not in m_values:
+                    m_values[s, t] = self.model.getSolVal(solution, self.student[s, t])
+                total += m_values[s, t]
+            if total > limit + (self.num_exams[s] - limit) * bad_values[s, issue] + 1e-6:
+                violated.append(i)
+        return violated
+
+    def add_windows(self, violated):
+        for i in violated:
+            s, issue, start, window, limit = self.windows[i]
+            m_vars = [self.model.getTransformedVar(self.student[s, t]) for t in window]
+            bad_var = self.model.getTransformedVar(self.bad[s, issue])
+            self.model.addCons(scip.quicksum(m_vars) <= limit + (self.num_exams[s] - limit) * bad_var,
+                               name=issue+"_constraint_"+str(s)+","+str(start), initial=True, removable=False)
+            self.added.add(i)
+
+    def separate_or_enforce(self, solution=None, feasible_result=SCIP_RESULT.FEASIBLE):
+        violated = self.find_violated(solution)
+        if len(violated) == 0:
+            return {"result": feasible_result}
+        self.add_windows(violated)
+        return {"result": SCIP_RESULT.CONSADDED}
+
+    def conssepalp(self, constraints, nusefulconss):
+        return self.separate_or_enforce(feasible_result=SCIP_RESULT.DIDNOTFIND)
+
+    def conssepasol(self, constraints, nusefulconss, solution):
+        return self.separate_or_enforce(solution, feasible_result=SCIP_RESULT.DIDNOTFIND)
+
+    def consenfolp(self, constraints, nusefulconss, solinfeasible):
+        return self.separate_or_enforce()
+
+    def consenfops(self, constraints, nusefulconss, solinfeasible, objinfeasible):
+        return self.separate_or_enforce()
+
+    def conscheck(self, constraints, solution, checkintegrality, checklprows, printreason, completely):
+        if len(self.find_violated(solution)) > 0:
+            return {"result": SCIP_RESULT.INFEASIBLE}
+        return {"result": SCIP_RESULT.FEASIBLE}
+
+    def conslock(self, constraint, locktype, nlockspos, nlocksneg):
+        # Without these locks, presolving would fix every m_st to 1 and every badness to 0, since neither appears in another constraint that way.
+        get_var = (lambda var: var) if constraint.isOriginal() else self.model.getTransformedVar
+        locked = set()
+        for s, issue, start, window, limit in self.windows:
+            for t in window:
+                if (s, t) not in locked:
+                    locked.add((s, t))
+                    self.model.addVarLocks(get_var(self.student[s, t]), nlocksneg, nlockspos)
+            if (s, issue) not in locked:
+                locked.add((s, issue))
+                self.model.addVarLocks(get_var(self.bad[s, issue]), nlockspos, nlocksneg)
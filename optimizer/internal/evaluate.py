@@ -0,0 +1,179 @@
+"""
+Exam Scheduler Web-UI
+Tsugunobu Miyake, Luke Snyder. 2025
+
+Computes the issues of a schedule from the enrollment of the students and faculty in the course groups.
+The number of exams of every student at every timeslot is computed in one pass over the enrollments,
+then every issue is counted with NumPy array operations over all students at once.
+The counts are stored timeslot-major (T x students) in int16, so every operation is over long rows of students.
+Used by the GRASP checks, the phase 2 callback, the phase 2 warm start and the Analyzer, so that they all agree.
+"""
+
+import numpy as np
+
+from .shared_params import nonzero_indices
+
+
+def model_windows(T, d):
+    """
+    The 3 in 24 and 4 in 48 windows of the phase 2 model.
+    param T: list of timeslots
+    param d: dict of the form {timeslot: 1 if exams can be held, 0 otherwise}
+    returns: two arrays of [start, end) timeslot windows, for 3 in 24 and for 4 in 48
+    """
+    three = [(t, t + 4) for t in T[0:len(T) - 3] if d[t] == 1 and d[t + 3] == 1]
+    four = []
+    for t in T[0:len(T) - 7]:
+        if t + 7 in d and d[t] == 1 and d[t + 7] == 1:
+            four.append((t, t + 8))
+        elif t + 6 in d and d[t] == 1 and d[t + 6] == 1:
+            four.append((t, t + 7))
+    return np.array(three, dtype=int).reshape(-1, 2), np.array(four, dtype=int).reshape(-1, 2)
+
+
+class ScheduleEvaluator:
+    """
+    Student issues, per student:
+        overlap: number of exams at a timeslot after the first one, summed over the timeslots
+        B2B / PMtoAM: number of timeslots t with exams at t and t + 1, where t is not a night / is a night timeslot
+        threein24 / fourin48: 1 if a window has more than 2 / 3 timeslots with exams
+        overlap_pairs, B2B_pairs, PMtoAM_pairs: the same as the first three, but counting every pair of exams,
+                                                which is what the phase 1 model and GRASP penalize
+    Faculty issues, per faculty:
+        facultyoverlap: 1 if the faculty has exams of two groups at one timeslot
+        facultyB2B: 1 if the faculty has exams at two consecutive timeslots
+    """
+    STUDENT_ISSUES = ["overlap", "B2B", "PMtoAM", "threein24", "fourin48"]
+    PAIR_ISSUES = ["overlap_pairs", "B2B_pairs", "PMtoAM_pairs"]
+    FACULTY_ISSUES = ["facultyoverlap", "facultyB2B"]
+
+    def __init__(self, groups, num_students, student_enrollments, num_timeslots, night, pair_starts, three_windows, four_windows,
+                 num_faculty=0, faculty_enrollments=([], [])):
+        """
+        param groups: list of the course groups. Schedules are arrays of the timeslot of every group, in this order
+        param num_students: number of students
+        param student_enrollments: (student indices, group indices) of every enrollment of a student in a group
+        param num_timeslots: number of timeslots
+        param night: array of the timeslots, 1 for night timeslots
+        param pair_starts: array of the timeslots t that form a back-to-back or night-to-morning pair with t + 1
+        param three_windows: array of [start, end) timeslot windows for 3 in 24
+        param four_windows: array of [start, end) timeslot windows for 4 in 48
+        param num_faculty: number of faculty
+        param faculty_enrollments: (faculty indices, group indices) of every group a faculty teaches
+        """
+        self.groups = list(groups)
+        self.group_index = {g: i for i, g in enumerate(self.groups)}
+        self.num_students = num_students
+        self.student_rows = np.asarray(student_enrollments[0], dtype=np.int64)
+        self.student_cols = np.asarray(student_enrollments[1], dtype=np.int64)
+        self.num_faculty = num_faculty
+        self.faculty_rows = np.asarray(faculty_enrollments[0], dtype=np.int64)
+        self.faculty_cols = np.asarray(faculty_enrollments[1], dtype=np.int64)
+        self.num_timeslots = num_timeslots
+
+        pair_starts = np.asarray(pair_starts, dtype=int)
+        night = np.asarray(night)
+        self.b2b_starts = pair_starts[night[pair_starts] == 0]
+        self.n2m_starts = pair_starts[night[pair_starts] == 1]
+        self.pair_starts = pair_starts
+        self.windows = [("threein24", np.asarray(three_windows, dtype=int).reshape(-1, 2), 2),
+                        ("fourin48", np.asarray(four_windows, dtype=int).reshape(-1, 2), 3)]
+
+    @classmethod
+    def from_params(cls, params):
+        """
+        param params: dict of the form {string: data} from the model_creator. Uses "S", "G", "T", "F", "d", "n", "h" and "u"
+        returns: a ScheduleEvaluator of the students, faculty and timeslots of the phase 2 model
+        """
+        S = params["S"]
+        G = params["G"]
+        T = params["T"]
+        F = params["F"]
+        d = params["d"]
+        student_enrollments = nonzero_indices(params["h"], S, G)
+        faculty_enrollments = nonzero_indices(params["u"], F, G)
+        night = np.array([params["n"].get(t, 0) for t in T])
+        pair_starts = [t for t in T[0:len(T) - 1] if d[t] == 1 and d[t + 1] == 1]
+        three_windows, four_windows = model_windows(T, d)
+        return cls(G, len(S), student_enrollments, len(T), night, pair_starts, three_windows, four_windows, len(F), faculty_enrollments)
+
+    def slots_of(self, group2slot):
+        """
+        param group2slot: dict of the form {course_group: timeslot}
+        returns: array of the timeslot of every group, -1 for the groups that are not in group2slot
+        """
+        slot_of = np.full(len(self.groups), -1, dtype=np.int64)
+        for g, t in group2slot.items():
+            if g in self.group_index:
+                slot_of[self.group_index[g]] = int(t)
+        return slot_of
+
+    def counts(self, slot_of, rows, cols, num_rows):
+        """
+        returns: T x num_rows array of the number of exams of every row at every timeslot. Groups at timeslot -1 are skipped
+        """
+        slots = slot_of[cols]
+        placed = slots >= 0
+        cells = slots[placed] * num_rows + rows[placed]
+        return np.bincount(cells, minlength=num_rows * self.num_timeslots).reshape(self.num_timeslots, num_rows).astype(np.int16)
+
+    def student_counts(self, slot_of):
+        return self.counts(slot_of, self.student_rows, self.student_cols, self.num_students)
+
+    def faculty_counts(self, slot_of):
+        return self.counts(slot_of, self.faculty_rows, self.faculty_cols, self.num_faculty)
+
+    def student_issues(self, counts, pairs=False):
+        """
+        param counts: T x ... array of the number of exams of students at every timeslot, e.g. from student_counts
+        param pairs: whether to also count the pair issues
+        returns: dict of the form {issue: ... array of the issue of every student}
+        """
+        exams = counts > 0
+        issues = dict()
+        issues["overlap"] = np.maximum(counts - 1, 0).sum(axis=0)
+        issues["B2B"] = (exams[self.b2b_starts] & exams[self.b2b_starts + 1]).sum(axis=0)
+        issues["PMtoAM"] = (exams[self.n2m_starts] & exams[self.n2m_starts + 1]).sum(axis=0)
+        # cumulative[t] is the number of timeslots before t with exams, so a window [a, b) has cumulative[b] - cumulative[a].
+        cumulative = np.zeros((counts.shape[0] + 1,) + counts.shape[1:], dtype=np.int16)
+        for t in range(counts.shape[0]):
+            np.add(cumulative[t], exams[t], out=cumulative[t + 1])
+        for issue, windows, limit in self.windows:
+            if len(windows) == 0:
+                issues[issue] = np.zeros(counts.shape[1:], dtype=int)
+                continue
+            in_window = cumulative[windows[:, 1]] - cumulative[windows[:, 0]]
+            issues[issue] = (in_window > limit).any(axis=0).astype(int)
+        if pairs:
+            issues["overlap_pairs"] = (counts * (counts - 1) // 2).sum(axis=0)
+            issues["B2B_pairs"] = (counts[self.b2b_starts] * counts[self.b2b_starts + 1]).sum(axis=0)
+            issues["PMtoAM_pairs"] = (counts[self.n2m_starts] * counts[self.n2m_starts + 1]).sum(axis=0)
+        return issues
+
+    def faculty_issues(self, counts):
+        """
+        param counts: T x ... array of the number of exams of faculty at every timeslot, e.g. from faculty_counts
+        returns: dict of the form {issue: ... array of the issue of every faculty}
+        """
+        exams = counts > 0
+        both = exams[self.pair_starts] & exams[self.pair_starts + 1]
+        return {"facultyoverlap": (counts > 1).any(axis=0).astype(int), "facultyB2B": both.any(axis=0).astype(int)}
+
+    def evaluate(self, slot_of, pairs=False):
+        """
+        param slot_of: array of the timeslot of every group, -1 for the groups that are not scheduled. See slots_of
+        param pairs: whether to also count the pair issues
+        returns: dict of the form {issue: total over the students or faculty}
+        """
+        issues = self.student_issues(self.student_counts(slot_of), pairs)
+        issues.update(self.faculty_issues(self.faculty_counts(slot_of)))
+        return {issue: int(values.sum()) for issue, values in issues.items()}
+
+    @staticmethod
+    def cost(issues, penalties):
+        """
+        param issues: dict of the form {issue: count or array}
+        param penalties: dict of the form {issue: penalty}. Issues without a penalty cost nothing
+        returns: the total penalty of the issues
+        """
+        return sum(penalties[issue] * value for issue, value in issues.items() if issue in penalties)
@@ -0,0 +1,672 @@
+"""
+Exam Scheduler Web-UI
+Tsugunobu Miyake, Luke Snyder. 2025
+
+Greedy Randomized Adaptive Search (GRASP) construction for phase 1, using NumPy arrays.
+The course group intersections are held as a dense G x G array, and the cost of every candidate (group, timeslot)
+is kept in a table that each placement updates by adding the placed group's intersections to the rows of its neighbors,
+instead of recomputing it. The candidates are drawn from segment trees (CandidateSampler) that a placement updates
+only where the table or the availability changed.
+"""
+
+import numpy as np
+
+from .shared_params import SharedArrays
+
+
+class GraspPair:
+    __slots__ = ("group", "timeslot", "cost", "group_size", "overlap", "b2b", "n2m", "last_update")
+
+    def __init__(self, g, g_size, t):
+        self.group = g
+        self.timeslot = t
+        self.cost = 0
+        self.group_size = g_size
+        self.overlap = 0
+        self.b2b = 0
+        self.n2m = 0
+        self.last_update = "None"
+
+    def update_cost(self, new_cost):
+        self.cost = new_cost
+
+    def get_cost(self):
+        return self.cost
+
+    def __str__(self):
+        return "g: {}, t: {}, cost: {}, overlap {}, b2b {}, n2m {} last update: {}".format(self.group, self.timeslot, self.cost, self.overlap, self.b2b, self.n2m, self.last_update)
+
+
+class GraspEngine:
+    BEST_IMPROVEMENT = "best"
+    FIRST_IMPROVEMENT = "first"
+
+    def __init__(self, pairs, schedule, penalties, params, max_group_size, smoothing=0, local_search=BEST_IMPROVEMENT, kernels=None):
+        """
+        param pairs: list of GraspPairs that represent all combinations of (group, timeslot) that may be chosen
+        param schedule: dict of the form {timeslot: [groups_at_this_time]}. has initial constraints inside it already if any exist
+        param penalties: dict of the form {string of problem: float penalty associated with the problem}. Uses "overlap", "B2B" and "PMtoAM"
+        param params: dict of the form {string: data} from the model_creator, uses "n" and "N_s". Or SharedGraspParams
+        param max_group_size: a timeslot can not hold this many students or more
+        param smoothing: added to every cost before weighting the random choice. higher value is more random
+        param local_search: BEST_IMPROVEMENT or FIRST_IMPROVEMENT, how local_search chooses among the improving moves and swaps
+        param kernels: Kernels from the kernels module to run the placements and the local search steps with, or None to use NumPy
+        """
+        self.penalties = penalties
+        self.local_search_mode = local_search
+        self.max_group_size = max_group_size
+        self.smoothing = smoothing
+        self.kernels = kernels
+        self.rng = np.random.default_rng()
+
+        # The timeslots are consecutive integers, so timeslot t + 1 is the next column.
+        self.timeslots = sorted(schedule.keys())
+        slot_index = {t: i for i, t in enumerate(self.timeslots)}
+
+        # Groups to place come first, followed by the groups already in the schedule.
+        self.groups = []
+        for pair in pairs:
+            if pair.group not in self.groups:
+                self.groups.append(pair.group)
+        self.num_free = len(self.groups)
+        self.initial_schedule = {t: list(groups) for t, groups in schedule.items()}
+        for t in self.timeslots:
+            for g in schedule[t]:
+                if g not in self.groups:
+                    self.groups.append(g)
+        group_index = {g: i for i, g in enumerate(self.groups)}
+
+        G = len(self.groups)
+        T = len(self.timeslots)
+
+        # N[g1, g2] = number of students in both groups
+        if isinstance(params, SharedGraspParams):
+            night = params.night
+            indices = [params.group_index[g] for g in self.groups]
+            self.N = params.intersections[np.ix_(indices, indices)].astype(float)
+            self.sizes = params.sizes[indices].astype(float)
+        else:
+            N_s = params["N_s"]
+            night = params["n"]
+            self.N = np.zeros((G, G))
+            for i, g1 in enumerate(self.groups):
+                for j, g2 in enumerate(self.groups):
+                    if i != j:
+                        self.N[i, j] = N_s[g1, g2]
+            self.sizes = np.array([N_s[g] for g in self.groups], dtype=float)
+
+        # allowed[g, t] = True if (g, t) is one of the pairs
+        self.allowed = np.zeros((self.num_free, T), dtype=bool)
+        for pair in pairs:
+            self.allowed[group_index[pair.group], slot_index[pair.timeslot]] = True
+
+        # Penalty for sharing students with the group in the next / previous timeslot.
+        # An exam followed by the next slot is back-to-back, unless it is a night exam, in which case it is night-to-morning.
+        self.next_penalty = np.zeros(T)
+        self.prev_penalty = np.zeros(T)
+        self.next_exists = np.zeros(T, dtype=bool)
+        self.prev_exists = np.zeros(T, dtype=bool)
+        self.next_is_b2b = np.zeros(T, dtype=bool)
+        self.prev_is_b2b = np.zeros(T, dtype=bool)
+        for i, t in enumerate(self.timeslots):
+            if t + 1 in slot_index:
+                self.next_exists[i] = True
+                self.next_is_b2b[i] = night[t] == 0
+                self.next_penalty[i] = penalties["B2B"] if night[t] == 0 else penalties["PMtoAM"]
+            if t - 1 in slot_index:
+                self.prev_exists[i] = True
+                self.prev_is_b2b[i] = night[t - 1] == 0
+                self.prev_penalty[i] = penalties["B2B"] if night[t - 1] == 0 else penalties["PMtoAM"]
+
+        # X[g, t] = 1 if group g is placed at timeslot t. The fixed groups are placed before every construction.
+        self.initial_X = np.zeros((G, T))
+        self.initial_slot_of = np.full(G, -1)
+        for t in self.timeslots:
+            for g in schedule[t]:
+                self.initial_X[group_index[g], slot_index[t]] = 1
+                self.initial_slot_of[group_index[g]] = slot_index[t]
+
+        # shared_with[g] = number of students group g shares with each group to place. Placing or moving g adds this row to the table.
+        F = self.num_free
+        self.N_free = np.ascontiguousarray(self.N[:F])
+        self.free_sizes = self.sizes[:F, None]
+        self.shared_with = np.ascontiguousarray(self.N_free.T)
+        # The groups to place that share students with group g are neighbor_ids[neighbor_ptr[g]:neighbor_ptr[g + 1]].
+        # Placing or moving g only changes their rows of the table.
+        rows, cols = np.nonzero(self.shared_with)
+        self.neighbor_ptr = np.searchsorted(rows, np.arange(G + 1))
+        self.neighbor_ids = cols
+        # The groups to place from the largest to the smallest. A timeslot is too full for the first num_full[t] of them.
+        self.by_size = np.argsort(-self.sizes[:F], kind="stable")
+
+        # table[g, t] = cost of the issues between group g at timeslot t and every placed group.
+        # unavailable[g, t] = True if g is already placed, (g, t) is not allowed, or the timeslot is too full for g.
+        # Both start from the fixed groups and are updated incrementally by every placement.
+        self.initial_table = np.zeros((F, T))
+        self.initial_students = self.sizes @ self.initial_X
+        for g in np.flatnonzero(self.initial_slot_of >= 0):
+            self.add_to_table(self.initial_table, g, self.initial_slot_of[g], 1)
+        self.blocked = ~self.allowed
+        self.initial_unavailable = self.blocked | (self.initial_students + self.free_sizes >= self.max_group_size)
+        self.initial_num_full = (self.initial_students[None, :] + self.sizes[self.by_size][:, None] >= self.max_group_size).sum(axis=0)
+        self.initial_sampler = CandidateSampler(self.initial_table, self.initial_unavailable, smoothing)
+
+        # State of the current construction. Allocated once and reset in place by every construction.
+        self.table = np.zeros((F, T))
+        self.unavailable = np.zeros((F, T), dtype=bool)
+        self.students = np.zeros(T)
+        self.num_full = np.zeros(T, dtype=int)
+        self.sampler = CandidateSampler(self.table, self.unavailable, smoothing)
+        # State of the local search: the cost change of moving every group to every timeslot, and of swapping every two groups.
+        self.move_delta = np.zeros((F, T))
+        self.swap_delta = np.zeros((F, F))
+        self.free = np.arange(F)
+        self.all_slots = np.arange(T)
+        # The placements, in order, and the timeslot index of every group (-1 if not placed).
+        self.num_placed = 0
+        self.placed_groups = np.zeros(F, dtype=int)
+        self.slot_of = self.initial_slot_of.copy()
+        # Arguments of the kernels that do not change between constructions.
+        self.penalty_args = (float(penalties["overlap"]), self.next_penalty, self.prev_penalty, self.prev_exists, self.next_exists)
+        self.neighbor_args = (self.shared_with, self.neighbor_ptr, self.neighbor_ids)
+
+    def reset(self):
+        np.copyto(self.table, self.initial_table)
+        np.copyto(self.unavailable, self.initial_unavailable)
+        np.copyto(self.students, self.initial_students)
+        np.copyto(self.num_full, self.initial_num_full)
+        np.copyto(self.slot_of, self.initial_slot_of)
+        self.sampler.copy(self.initial_sampler)
+        self.num_placed = 0
+
+    def construct(self, cost_limit=float('inf')):
+        """
+        Builds one schedule. The largest group is placed at a random timeslot, then groups are placed one at a time,
+        choosing a (group, timeslot) with a probability inversely proportional to the cost it adds.
+        Use get_schedule and get_pairs to read the schedule, since the next construction overwrites it.
+        Call local_search afterwards to improve it.
+        param cost_limit: the construction is abandoned once its cost goes over this limit, since placements only add cost
+        returns: the cost of the schedule. infinite if the remaining groups could not be placed without exceeding max_group_size,
+                 or if the construction was abandoned
+        """
+        self.reset()
+        total_cost = 0
+
+        # place largest group randomly
+        largest = int(np.argmax(self.sizes[:self.num_free]))
+        slot = int(self.rng.choice(np.flatnonzero(self.allowed[largest])))
+        total_cost += self.place(largest, slot)
+
+        # One random number per placement, so that the kernels make the same choices from the same generator.
+        uniforms = self.rng.random(self.num_free - 1)
+        if self.kernels is not None:
+            total_cost, self.num_placed = self.kernels.construct(self.table, self.unavailable, self.students, self.slot_of, self.placed_groups,
+                                                                 self.num_full, self.num_placed, float(total_cost), float(cost_limit), uniforms,
+                                                                 self.sampler.weights, self.sampler.zeros, self.by_size, self.sizes,
+                                                                 float(self.max_group_size), float(self.smoothing), *self.neighbor_args, *self.penalty_args)
+            return total_cost
+
+        for u in uniforms:
+            index = self.sampler.sample(u)
+            if index is None:
+                return float('inf')
+            g, slot = divmod(index, len(self.timeslots))
+            total_cost += self.place(g, slot)
+            if total_cost > cost_limit:
+                return float('inf')
+
+        return total_cost
+
+    def place(self, g, slot, sample=True):
+        """
+        Places group g at timeslot index slot. Updates the table rows of the neighbors of g and the candidates that became unavailable.
+        param sample: whether to update the sampler, which only construct draws from
+        returns: the cost added by the placement
+        """
+        cost = self.table[g, slot]
+        self.add_to_table(self.table, g, slot, 1)
+        self.students[slot] += self.sizes[g]
+        self.unavailable[g] = True
+        # The timeslot is now too full for the next groups in by_size, if any.
+        start = end = self.num_full[slot]
+        while end < self.num_free and self.students[slot] + self.sizes[self.by_size[end]] >= self.max_group_size:
+            end += 1
+        full = self.by_size[start:end]
+        self.unavailable[full, slot] = True
+        self.num_full[slot] = end
+
+        self.placed_groups[self.num_placed] = g
+        self.num_placed += 1
+        self.slot_of[g] = slot
+
+        if sample:
+            T = len(self.timeslots)
+            neighbors = self.neighbors(g)
+            near = np.arange(slot - 1 if self.prev_exists[slot] else slot, slot + 2 if self.next_exists[slot] else slot + 1)
+            changed = np.concatenate([g * T + self.all_slots, (neighbors[:, None] * T + near).ravel(), full * T + slot])
+            self.sampler.update(changed, self.table, self.unavailable)
+        return cost
+
+    def neighbors(self, g):
+        """
+        returns: array of the groups to place that share students with group g
+        """
+        return self.neighbor_ids[self.neighbor_ptr[g]:self.neighbor_ptr[g + 1]]
+
+    def issues(self, g, slot, X):
+        """
+        param X: G x T 0/1 matrix of the placements group g is compared to
+        returns: overlaps, back-to-backs and night-to-mornings that placing group g at timeslot index slot adds, and their cost
+        """
+        shared = self.N[g] @ X
+        overlap = shared[slot]
+        b2b = 0
+        n2m = 0
+        if self.next_exists[slot]:
+            if self.next_is_b2b[slot]:
+                b2b += shared[slot + 1]
+            else:
+                n2m += shared[slot + 1]
+        if self.prev_exists[slot]:
+            if self.prev_is_b2b[slot]:
+                b2b += shared[slot - 1]
+            else:
+                n2m += shared[slot - 1]
+        cost = self.penalties["overlap"] * overlap + self.penalties["B2B"] * b2b + self.penalties["PMtoAM"] * n2m
+        return overlap, b2b, n2m, cost
+
+    def local_search(self, cost):
+        """
+        Improves the last construction by moving single groups to another timeslot and swapping the timeslots of two groups,
+        until no move or swap lowers the cost. Every step takes the best improvement, or a random improving one with FIRST_IMPROVEMENT.
+        The cost change of every move and swap is kept in move_delta and swap_delta between steps.
+        A step adds the intersections of the groups that moved to the table rows of their neighbors, and recomputes the deltas
+        of the groups that share students with them or are at the two timeslots that changed (see update_deltas).
+        Choosing the step still reads every delta.
+        param cost: cost of the last construction
+        returns: the cost after the local search
+        """
+        if not np.isfinite(cost):
+            return cost
+
+        if self.kernels is not None:
+            first_improvement = self.local_search_mode == self.FIRST_IMPROVEMENT
+            done = False
+            while not done:
+                uniforms = self.rng.random(64 if first_improvement else 0)
+                cost, done = self.kernels.local_search(self.table, self.students, self.slot_of, float(cost), first_improvement, uniforms, self.allowed,
+                                                       self.blocked, self.N_free, *self.neighbor_args, self.sizes, float(self.max_group_size),
+                                                       *self.penalty_args)
+            return cost
+
+        # After a construction, the table holds the cost of every group at every timeslot given all the other groups.
+        self.fill_move_delta(self.free, self.all_slots)
+        self.fill_swap_delta(self.free)
+        while True:
+            step = self.choose_step(self.move_delta, self.swap_delta)
+            if step is None:
+                return cost
+            kind, a, b = step
+            if kind == "move":
+                cost += self.move_delta[a, b]
+                slot_a = self.slot_of[a]
+                self.move(a, b, self.table, self.students)
+                self.update_deltas(a, -1, slot_a, b)
+            else:
+                cost += self.swap_delta[a, b]
+                slot_a = self.slot_of[a]
+                slot_b = self.slot_of[b]
+                self.move(a, slot_b, self.table, self.students)
+                self.move(b, slot_a, self.table, self.students)
+                self.update_deltas(a, b, slot_a, slot_b)
+
+    def fill_move_delta(self, rows, cols):
+        """
+        Sets move_delta[g, t] for the groups in rows and the timeslot indices in cols.
+        Moving group g to timeslot t changes the cost by table[g, t] - table[g, slot of g].
+        It is inf if the move is not allowed, the timeslot is too full for g, or g is already at t.
+        """
+        slots = self.slot_of[rows]
+        current = self.table[rows, slots]
+        delta = self.table[np.ix_(rows, cols)] - current[:, None]
+        delta[self.blocked[np.ix_(rows, cols)]] = np.inf
+        delta[self.students[cols][None, :] + self.sizes[rows][:, None] >= self.max_group_size] = np.inf
+        delta[slots[:, None] == cols[None, :]] = np.inf
+        self.move_delta[np.ix_(rows, cols)] = delta
+
+    def fill_swap_delta(self, rows):
+        """
+        Sets swap_delta[g, h] and swap_delta[h, g] for the groups g in rows and every group h.
+        Swapping groups g and h costs both moves, minus the issues between g and h that the table counts at the old timeslots.
+        It is inf if either move is not allowed, either timeslot gets too full, or g and h are at the same timeslot.
+        The two moves are added in parentheses, so that swap_delta is exactly symmetric.
+        """
+        table = self.table
+        free = self.free
+        slot_g = self.slot_of[rows]
+        slot_h = self.slot_of[free]
+        diff = slot_h[None, :] - slot_g[:, None]
+        between = np.where(diff == 1, self.next_penalty[slot_g][:, None], 0) + np.where(diff == -1, self.prev_penalty[slot_g][:, None], 0)
+        delta = ((table[np.ix_(rows, slot_h)] - table[rows, slot_g][:, None]) + (table[np.ix_(free, slot_g)].T - table[free, slot_h][None, :])
+                 - 2 * self.N_free[rows][:, free] * (self.penalties["overlap"] - between))
+        allowed = self.allowed[np.ix_(rows, slot_h)] & self.allowed[np.ix_(free, slot_g)].T
+        size_g = self.sizes[rows][:, None]
+        size_h = self.sizes[free][None, :]
+        full = (self.students[slot_g][:, None] - size_g + size_h >= self.max_group_size) | (self.students[slot_h][None, :] - size_h + size_g >= self.max_group_size)
+        delta[~allowed | full | (diff == 0)] = np.inf
+        self.swap_delta[rows] = delta
+        self.swap_delta[:, rows] = delta.T
+
+    def update_deltas(self, a, b, slot_a, slot_b):
+        """
+        Updates the deltas after group a (and b, for a swap, otherwise -1) moved between timeslot indices slot_a and slot_b.
+        Only the table rows of the groups that share students with a or b changed, and only the students at slot_a and slot_b,
+        so the deltas of these groups and of the groups at these two timeslots are recomputed, and the moves to the two timeslots.
+        """
+        F = self.num_free
+        touched = (self.slot_of[:F] == slot_a) | (self.slot_of[:F] == slot_b) | (self.shared_with[a] != 0)
+        if b >= 0:
+            touched |= self.shared_with[b] != 0
+        rows = np.flatnonzero(touched)
+        self.fill_move_delta(rows, self.all_slots)
+        self.fill_move_delta(self.free, np.array([slot_a, slot_b]))
+        self.fill_swap_delta(rows)
+
+    def get_solution(self):
+        """
+        returns: array of the timeslot index of every group to place in the last construction, e.g. for an ElitePool
+        """
+        return self.slot_of[:self.num_free].copy()
+
+    def load(self, solution):
+        """
+        Replaces the last construction with a solution from get_solution, so that get_schedule, get_pairs and local_search use it.
+        param solution: array of the timeslot index of every group to place
+        returns: the cost of the solution
+        """
+        self.reset()
+        cost = 0
+        for g in range(self.num_free):
+            cost += self.place(g, solution[g], sample=False)
+        return cost
+
+    def path_relink(self, source, target, min_distance=1):
+        """
+        Walks from the source solution to the target solution, moving one group to its timeslot in the target at a time.
+        Every step takes the move that adds the least cost, skipping the ones that would make a timeslot too full.
+        The best solution on the path at least min_distance moves away from both ends is improved with local_search,
+        since local_search would bring the solutions next to an end back to it.
+        param source: solution from get_solution
+        param target: solution from get_solution
+        param min_distance: number of moves to skip at both ends of the path
+        returns: the cost and the solution found, or inf and None if the path has no solution far enough from the two ends
+        """
+        epsilon = 1e-9
+        F = self.num_free
+        cost = self.load(source)
+        best_cost = float('inf')
+        best = None
+        steps = 0
+        while True:
+            differ = np.flatnonzero(self.slot_of[:F] != target)
+            if len(differ) <= min_distance:
+                break
+            slots = self.slot_of[differ]
+            targets = target[differ]
+            delta = self.table[differ, targets] - self.table[differ, slots]
+            delta[self.students[targets] + self.sizes[differ] >= self.max_group_size] = np.inf
+            i = int(np.argmin(delta))
+            if not np.isfinite(delta[i]):
+                break
+            cost += delta[i]
+            self.move(differ[i], targets[i], self.table, self.students)
+            steps += 1
+            if steps >= min_distance and cost < best_cost - epsilon:
+                best_cost = cost
+                best = self.get_solution()
+
+        if best is None:
+            return float('inf'), None
+        cost = self.local_search(self.load(best))
+        return cost, self.get_solution()
+
+    def choose_step(self, move_delta, swap_delta):
+        """
+        returns: ("move", group, timeslot index) or ("swap", group, group) that lowers the cost, or None if there is none
+        """
+        epsilon = 1e-9
+        if self.local_search_mode == self.FIRST_IMPROVEMENT:
+            moves = np.flatnonzero(move_delta < -epsilon)
+            swaps = np.flatnonzero(swap_delta < -epsilon)
+            if len(moves) + len(swaps) == 0:
+                return None
+            i = int(self.rng.random() * (len(moves) + len(swaps)))
+            if i < len(moves):
+                return ("move",) + divmod(int(moves[i]), move_delta.shape[1])
+            return ("swap",) + divmod(int(swaps[i - len(moves)]), swap_delta.shape[1])
+
+        best_move = int(np.argmin(move_delta))
+        best_swap = int(np.argmin(swap_delta))
+        if min(move_delta.flat[best_move], swap_delta.flat[best_swap]) >= -epsilon:
+            return None
+        if move_delta.flat[best_move] <= swap_delta.flat[best_swap]:
+            return ("move",) + divmod(best_move, move_delta.shape[1])
+        return ("swap",) + divmod(best_swap, swap_delta.shape[1])
+
+    def move(self, g, slot, table, students):
+        """
+        Moves group g to timeslot index slot, updating the table and the number of students per timeslot.
+        """
+        old_slot = self.slot_of[g]
+        self.add_to_table(table, g, old_slot, -1)
+        self.add_to_table(table, g, slot, 1)
+        students[old_slot] -= self.sizes[g]
+        students[slot] += self.sizes[g]
+        self.slot_of[g] = slot
+
+    def add_to_table(self, table, g, slot, sign):
+        """
+        Adds (sign = 1) or removes (sign = -1) the issues with group g at timeslot index slot to the rows of its neighbors:
+        their intersections times the overlap penalty at slot, and times the back-to-back / night-to-morning penalty next to it.
+        """
+        neighbors = self.neighbors(g)
+        shared = sign * self.shared_with[g, neighbors]
+        table[neighbors, slot] += self.penalties["overlap"] * shared
+        if self.prev_exists[slot]:
+            table[neighbors, slot - 1] += self.next_penalty[slot - 1] * shared
+        if self.next_exists[slot]:
+            table[neighbors, slot + 1] += self.prev_penalty[slot + 1] * shared
+
+    def get_schedule(self):
+        """
+        returns: the schedule of the last construction in the form {timeslot: [groups_at_this_time]}, including the fixed groups
+        """
+        schedule = {t: list(groups) for t, groups in self.initial_schedule.items()}
+        for i in range(self.num_placed):
+            g = self.placed_groups[i]
+            schedule[self.timeslots[self.slot_of[g]]].append(self.groups[g])
+        return schedule
+
+    def get_pairs(self):
+        """
+        returns: list of GraspPairs, one per placement of the last construction in the order they were placed,
+                 with the issues each one has with the groups placed before it
+        """
+        pairs = []
+        X = self.initial_X.copy()
+        for i in range(self.num_placed):
+            g = self.placed_groups[i]
+            slot = self.slot_of[g]
+            pair = GraspPair(self.groups[g], self.sizes[g], self.timeslots[slot])
+            pair.overlap, pair.b2b, pair.n2m, cost = self.issues(g, slot, X)
+            pair.update_cost(cost)
+            pairs.append(pair)
+            X[g, slot] = 1
+        return pairs
+
+class CandidateSampler:
+    """
+    Draws the (group, timeslot) candidates of a construction in O(log(G T)), and updates a candidate in O(log(G T)).
+    Uniformly among the available zero cost candidates if there are any, otherwise with weights 1 / (cost + smoothing).
+    Two segment trees over the candidates hold the weights and the number of zero cost candidates. Candidate (g, t) is leaf g * T + t,
+    so the candidates of a group are T consecutive leaves.
+    Every internal node is set to the sum of its two children, never updated by a difference, so the trees do not drift
+    and are the same whatever order the leaves change in. This lets the loop kernels keep the same trees one leaf at a time.
+    """
+    def __init__(self, table, unavailable, smoothing):
+        """
+        param table: num_free x T array of the cost of every candidate
+        param unavailable: num_free x T array, True for the candidates that can not be chosen
+        """
+        self.smoothing = smoothing
+        self.leaves = max(2, 1 << (table.size - 1).bit_length())
+        self.weights = np.zeros(2 * self.leaves)
+        self.zeros = np.zeros(2 * self.leaves, dtype=int)
+        self.set_leaves(np.arange(table.size), table.ravel(), unavailable.ravel())
+        level = self.leaves
+        while level > 1:
+            self.weights[level // 2:level] = self.weights[level:2 * level:2] + self.weights[level + 1:2 * level:2]
+            self.zeros[level // 2:level] = self.zeros[level:2 * level:2] + self.zeros[level + 1:2 * level:2]
+            level //= 2
+
+    def copy(self, other):
+        np.copyto(self.weights, other.weights)
+        np.copyto(self.zeros, other.zeros)
+
+    def set_leaves(self, indices, costs, unavailable):
+        available = ~unavailable
+        zero = available & (costs == 0)
+        weighted = available & ~zero
+        weights = np.zeros(len(indices))
+        weights[weighted] = 1 / (costs[weighted] + self.smoothing)
+        self.weights[self.leaves + indices] = weights
+        self.zeros[self.leaves + indices] = zero
+
+    def update(self, indices, table, unavailable):
+        """
+        Sets the candidates with the given flat indices from the table, then their ancestors, one level at a time.
+        """
+        self.set_leaves(indices, table.ravel()[indices], unavailable.ravel()[indices])
+        # A node may appear several times, and is set to the same sum each time.
+        nodes = (self.leaves + indices) // 2
+        while True:
+            left = 2 * nodes
+            self.weights[nodes] = self.weights[left] + self.weights[left + 1]
+            self.zeros[nodes] = self.zeros[left] + self.zeros[left + 1]
+            if nodes[0] == 1:
+                return
+            nodes //= 2
+
+    def sample(self, u):
+        """
+        param u: random number in [0, 1) that makes the choice
+        returns: the flat index g * T + t of the chosen candidate, or None if no candidate is available
+        """
+        node = 1
+        if self.zeros[1] > 0:
+            k = int(u * self.zeros[1])
+            while node < self.leaves:
+                node *= 2
+                if self.zeros[node] <= k:
+                    k -= self.zeros[node]
+                    node += 1
+        elif self.weights[1] > 0:
+            x = u * self.weights[1]
+            while node < self.leaves:
+                node *= 2
+                # A subtree without weight is never entered, even if rounding leaves x past the weight of the left one.
+                if x >= self.weights[node] and self.weights[node + 1] > 0:
+                    x -= self.weights[node]
+                    node += 1
+        else:
+            return None
+        return int(node - self.leaves)
+
+
+class ElitePool:
+    """
+    The best diverse solutions found by GRASP, in the form of GraspEngine.get_solution.
+    A solution joins the pool if it is better than every solution in it, or if it is better than the worst one and differs from
+    every solution in it by at least min_distance groups. Once the pool is full, it replaces the most similar solution worse than it.
+    """
+    EPSILON = 1e-9
+
+    def __init__(self, size, min_distance):
+        """
+        param size: maximum number of solutions in the pool
+        param min_distance: number of groups at a different timeslot for a solution to count as different
+        """
+        self.size = size
+        self.min_distance = min_distance
+        self.costs = []
+        self.solutions = []
+
+    def __len__(self):
+        return len(self.solutions)
+
+    def best_cost(self):
+        return min(self.costs, default=float('inf'))
+
+    def add(self, cost, solution):
+        """
+        returns: True if the solution joined the pool
+        """
+        if self.size <= 0 or not np.isfinite(cost):
+            return False
+        distances = [int(np.count_nonzero(other != solution)) for other in self.solutions]
+        if 0 in distances:
+            return False
+        diverse = min(distances, default=self.min_distance) >= self.min_distance
+        if not (cost < self.best_cost() - self.EPSILON or diverse):
+            return False
+
+        if len(self.solutions) < self.size:
+            self.costs.append(cost)
+            self.solutions.append(solution)
+            return True
+        worse = [i for i in range(len(self.costs)) if self.costs[i] > cost + self.EPSILON]
+        if len(worse) == 0:
+            return False
+        i = min(worse, key=lambda i: distances[i])
+        self.costs[i] = cost
+        self.solutions[i] = solution
+        return True
+
+    def choose_pair(self, rng):
+        """
+        returns: two different solutions of the pool, chosen at random
+        """
+        i, j = rng.choice(len(self.solutions), size=2, replace=False)
+        return self.solutions[i], self.solutions[j]
+
+    def ranked(self):
+        """
+        returns: list of (cost, solution) from the best to the worst
+        """
+        order = sorted(range(len(self.costs)), key=lambda i: self.costs[i])
+        return [(self.costs[i], self.solutions[i]) for i in order]
+
+
+class SharedGraspParams(SharedArrays):
+    """
+    The course group intersections and sizes of a semester, in multiprocessing.shared_memory blocks,
+    so that GRASP processes read them without a copy. Only the names of the blocks are pickled:
+    the main process creates the blocks, passes this object to the processes, and unlinks the blocks once they are done.
+    """
+    def __init__(self, params):
+        """
+        param params: dict of the form {string: data} from the model_creator. Uses "G", "n" and "N_s"
+        """
+        super().__init__()
+        N_s = params["N_s"]
+        self.groups = list(params["G"])
+        self.group_index = {g: i for i, g in enumerate(self.groups)}
+        self.night = dict(params["n"])
+        G = len(self.groups)
+
+        intersections = self.create("intersections", (G, G), np.int32)
+        for i, g1 in enumerate(self.groups):
+            for j, g2 in enumerate(self.groups):
+                if i != j:
+                    intersections[i, j] = N_s.get((g1, g2), 0)
+        self.create("sizes", (G,), np.int32)[:] = [N_s[g] for g in self.groups]
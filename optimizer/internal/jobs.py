@@ -0,0 +1,204 @@
+"""
+Exam Scheduler Web-UI
+Tsugunobu Miyake, Luke Snyder. 2025
+
+Database backed queue of optimization requests. The views enqueue a job and return its id right away,
+and the run_optimization_jobs command claims the jobs and runs each one in its own process.
+While a job runs, a thread of its process updates the heartbeat of the job, so that a job whose process died is not counted as running.
+"""
+
+import errno
+import multiprocessing
+import os
+import socket
+import threading
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connections, transaction
+from django.utils import timezone
+
+from ..models import OptimizationJob, Phase2Checkpoint, Schedule
+from .progress import close_connections_before_fork
+
+# A running job whose heartbeat is older than this many heartbeat intervals is considered dead.
+STALE_HEARTBEATS = 4
+
+# The kinds of jobs resumed when their process stopped. Only the phase 2 runs of a schedule job save Phase2Checkpoints:
+# the runs of a portfolio and a re-optimization do not, so these jobs are marked as failed instead.
+RESUMABLE_KINDS = [OptimizationJob.SCHEDULE]
+
+
+def enqueue(kind, payload):
+    """
+    param kind: OptimizationJob.SCHEDULE, OptimizationJob.PORTFOLIO or OptimizationJob.REOPTIMIZE
+    param payload: dict of the form {string: data}, the data of the optimization request
+    returns: the new OptimizationJob
+    """
+    return OptimizationJob.objects.create(kind=kind, payload=payload)
+
+def worker_name():
+    return "{}:{}".format(socket.gethostname(), os.getpid())
+
+def running_jobs():
+    """
+    returns: QuerySet of the running jobs whose heartbeat is recent
+    """
+    stale_before = timezone.now() - timedelta(seconds=settings.OPTIMIZATION_JOB_HEARTBEAT * STALE_HEARTBEATS)
+    return OptimizationJob.objects.filter(status=OptimizationJob.RUNNING, heartbeat_at__gte=stale_before)
+
+def claim(limit):
+    """
+    Marks the oldest queued job as running, if fewer than limit jobs are running, counting the jobs of every job runner.
+    returns: the claimed OptimizationJob, or None
+    """
+    with transaction.atomic():
+        if running_jobs().count() >= limit:
+            return None
+        for job in OptimizationJob.objects.filter(status=OptimizationJob.QUEUED).order_by("pk"):
+            now = timezone.now()
+            # Another job runner may be claiming the same job. Only the update that still finds it queued succeeds.
+            claimed = OptimizationJob.objects.filter(pk=job.pk, status=OptimizationJob.QUEUED).update(
+                status=OptimizationJob.RUNNING, worker=worker_name(), claimed_at=now, heartbeat_at=now)
+            if claimed:
+                job.refresh_from_db()
+                return job
+    return None
+
+def attach_schedule(job, schedule_entry):
+    """
+    Records the schedule a job optimizes, so that it can be resumed or marked as failed if the job runner stops.
+    """
+    job.schedule = schedule_entry
+    OptimizationJob.objects.filter(pk=job.pk).update(schedule=schedule_entry)
+
+def finish(job_pk, status, result=None, error=""):
+    OptimizationJob.objects.filter(pk=job_pk).update(status=status, result=result, error=error, finished_at=timezone.now())
+
+def job_status(job_pk):
+    """
+    returns: dict describing the job, e.g. to be polled while it runs
+    """
+    job = OptimizationJob.objects.get(pk=job_pk)
+    return {
+        "id": job.pk,
+        "kind": job.kind,
+        "status": job.get_status(),
+        "done": job.status in (OptimizationJob.DONE, OptimizationJob.FAILED),
+        "result": job.result,
+        "error": job.error,
+        "created_at": job.created_at.isoformat(),
+        "heartbeat_at": job.heartbeat_at.isoformat() if job.heartbeat_at else None,
+    }
+
+def job_function(kind):
+    """
+    returns: the function running the jobs of kind. It takes the payload and the job, and returns the result
+    """
+    from ..views import optimize as optimize_views
+
+    return {
+        OptimizationJob.SCHEDULE: optimize_views.optimize_schedule,
+        OptimizationJob.PORTFOLIO: optimize_views.optimize_portfolio,
+        OptimizationJob.REOPTIMIZE: optimize_views.reoptimize_schedule,
+    }[kind]
+
+class Heartbeat(threading.Thread):
+    """
+    Background thread of a job process that updates heartbeat_at of the job every OPTIMIZATION_JOB_HEARTBEAT seconds.
+    """
+    def __init__(self, job_pk):
+        super().__init__(daemon=True)
+        self.job_pk = job_pk
+        self.stopped = threading.Event()
+        self.start()
+
+    def run(self):
+        while not self.stopped.wait(settings.OPTIMIZATION_JOB_HEARTBEAT):
+            try:
+                OptimizationJob.objects.filter(pk=self.job_pk, status=OptimizationJob.RUNNING).update(heartbeat_at=timezone.now())
+            except Exception:
+                # E.g. the database is locked by the writes of the solves. The next heartbeat tries again.
+                print(traceback.format_exc())
+            finally:
+                # This thread has its own connection. Do not keep it open between heartbeats.
+                connections.close_all()
+
+    def stop(self):
+        self.stopped.set()
+        self.join()
+
+def run_job(job_pk):
+    """
+    Runs a claimed job and records its result, or the traceback if it raised. Target of the process of every job.
+    """
+    # The job process, rather than the job runner, so that a restarted job runner can tell whether it is still alive.
+    OptimizationJob.objects.filter(pk=job_pk).update(worker=worker_name())
+    job = OptimizationJob.objects.get(pk=job_pk)
+    heartbeat = Heartbeat(job.pk)
+    try:
+        result = job_function(job.kind)(job.payload, job)
+        finish(job.pk, OptimizationJob.DONE, result=result)
+    except Exception:
+        print(traceback.format_exc())
+        finish(job.pk, OptimizationJob.FAILED, error=traceback.format_exc())
+    finally:
+        heartbeat.stop()
+
+def start(job):
+    """
+    Starts the process running a claimed job.
+    returns: the multiprocessing.Process
+    """
+    close_connections_before_fork()
+    process = multiprocessing.get_context("fork").Process(target=run_job, args=(job.pk,), name="optimization job {}".format(job.pk))
+    process.start()
+    return process
+
+def check_exit(job_pk, exitcode):
+    """
+    Marks the job as failed if its process exited without recording a result, e.g. when it was killed.
+    """
+    if exitcode != 0:
+        OptimizationJob.objects.filter(pk=job_pk, status=OptimizationJob.RUNNING).update(
+            status=OptimizationJob.FAILED, error="The job process exited with code {}.".format(exitcode), finished_at=timezone.now())
+
+def is_orphaned(job):
+    """
+    returns: True if the process of a running job is gone: its heartbeat is stale, or it ran on this host and has exited
+    """
+    if job.heartbeat_at is None or not running_jobs().filter(pk=job.pk).exists():
+        return True
+    host, _, pid = job.worker.rpartition(":")
+    if host != socket.gethostname() or not pid.isdigit():
+        return False
+    try:
+        os.kill(int(pid), 0)
+    except OSError as e:
+        return e.errno == errno.ESRCH
+    return False
+
+def recover():
+    """
+    Finds the running jobs whose process is gone, e.g. after a restart of the server. Called when the job runner starts.
+    A schedule job that reached phase 2 with checkpoints is queued again to resume from them. Every other one, e.g. every portfolio job,
+    is marked as failed, see RESUMABLE_KINDS.
+    returns: list of (job pk, True if resumed)
+    """
+    recovered = []
+    for job in OptimizationJob.objects.filter(status=OptimizationJob.RUNNING):
+        if not is_orphaned(job):
+            continue
+        resumable = (job.kind in RESUMABLE_KINDS and job.schedule_id is not None
+                     and Phase2Checkpoint.objects.filter(schedule_id=job.schedule_id).exists())
+        if resumable:
+            payload = dict(job.payload, resume_schedule_pk=job.schedule_id)
+            OptimizationJob.objects.filter(pk=job.pk, status=OptimizationJob.RUNNING).update(
+                status=OptimizationJob.QUEUED, payload=payload, worker="", claimed_at=None, heartbeat_at=None)
+        else:
+            OptimizationJob.objects.filter(pk=job.pk, status=OptimizationJob.RUNNING).update(
+                status=OptimizationJob.FAILED, error="The job process stopped before the job was done.", finished_at=timezone.now())
+            Schedule.objects.filter(jobs=job, status__in=[Schedule.PHASE_0, Schedule.PHASE_1, Schedule.PHASE_2]).update(status=Schedule.ERROR)
+        recovered.append((job.pk, resumable))
+    return recovered
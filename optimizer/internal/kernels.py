@@ -0,0 +1,315 @@
+"""
+Exam Scheduler Web-UI
+Tsugunobu Miyake, Luke Snyder. 2025
+
+Loop versions of the sequential steps of the GraspEngine: the placements of a construction and the steps of the local search.
+When numba is installed they are compiled to machine code (COMPILED), otherwise GraspEngine keeps its NumPy implementation.
+PYTHON runs the two kernels uncompiled (the helpers they call are compiled if numba is installed), which is slow,
+but lets the tests compare the loops with NumPy without numba.
+Given the same random numbers, the kernels make the same choices as the NumPy implementation.
+"""
+
+import numpy as np
+from django.conf import settings
+
+try:
+    import numba
+except ImportError:
+    numba = None
+
+
+def add_to_table(table, shared_with, neighbor_ptr, neighbor_ids, g, slot, sign, overlap_penalty, next_penalty, prev_penalty, prev_exists, next_exists):
+    """
+    Same as GraspEngine.add_to_table.
+    """
+    for i in range(neighbor_ptr[g], neighbor_ptr[g + 1]):
+        h = neighbor_ids[i]
+        shared = sign * shared_with[g, h]
+        table[h, slot] += overlap_penalty * shared
+        if prev_exists[slot]:
+            table[h, slot - 1] += next_penalty[slot - 1] * shared
+        if next_exists[slot]:
+            table[h, slot + 1] += prev_penalty[slot + 1] * shared
+
+
+def update_candidate(weights, zeros, table, unavailable, smoothing, index):
+    """
+    Sets the leaf of the candidate with the given flat index from the table, then its ancestors, the way CandidateSampler.update does.
+    """
+    g, t = divmod(index, table.shape[1])
+    weight = 0.0
+    zero = 0
+    if not unavailable[g, t]:
+        if table[g, t] == 0:
+            zero = 1
+        else:
+            weight = 1 / (table[g, t] + smoothing)
+    node = weights.shape[0] // 2 + index
+    weights[node] = weight
+    zeros[node] = zero
+    node //= 2
+    while node >= 1:
+        weights[node] = weights[2 * node] + weights[2 * node + 1]
+        zeros[node] = zeros[2 * node] + zeros[2 * node + 1]
+        node //= 2
+
+
+def sample(weights, zeros, u):
+    """
+    Same as CandidateSampler.sample, but returns -1 if no candidate is available.
+    """
+    leaves = weights.shape[0] // 2
+    node = 1
+    if zeros[1] > 0:
+        k = int(u * zeros[1])
+        while node < leaves:
+            node *= 2
+            if zeros[node] <= k:
+                k -= zeros[node]
+                node += 1
+    elif weights[1] > 0:
+        x = u * weights[1]
+        while node < leaves:
+            node *= 2
+            if x >= weights[node] and weights[node + 1] > 0:
+                x -= weights[node]
+                node += 1
+    else:
+        return -1
+    return node - leaves
+
+
+def construct(table, unavailable, students, slot_of, placed_groups, num_full, num_placed, total_cost, cost_limit, uniforms, weights, zeros,
+              by_size, sizes, max_group_size, smoothing, shared_with, neighbor_ptr, neighbor_ids,
+              overlap_penalty, next_penalty, prev_penalty, prev_exists, next_exists):
+    """
+    Places the remaining groups of a construction, one per random number, the way GraspEngine.construct does.
+    The arrays of the engine and the trees of its CandidateSampler are updated in place.
+    param num_placed: number of groups placed so far
+    param total_cost: cost of the groups placed so far
+    param uniforms: one random number in [0, 1) per placement
+    returns: (cost of the schedule, number of groups placed). The cost is inf if a group could not be placed or it went over cost_limit
+    """
+    F, T = table.shape
+    for step in range(uniforms.shape[0]):
+        index = sample(weights, zeros, uniforms[step])
+        if index < 0:
+            return np.inf, num_placed
+        g, slot = divmod(index, T)
+
+        total_cost += table[g, slot]
+        add_to_table(table, shared_with, neighbor_ptr, neighbor_ids, g, slot, 1, overlap_penalty, next_penalty, prev_penalty, prev_exists, next_exists)
+        students[slot] += sizes[g]
+        for t in range(T):
+            unavailable[g, t] = True
+            update_candidate(weights, zeros, table, unavailable, smoothing, g * T + t)
+        first = slot - 1 if prev_exists[slot] else slot
+        last = slot + 1 if next_exists[slot] else slot
+        for i in range(neighbor_ptr[g], neighbor_ptr[g + 1]):
+            for t in range(first, last + 1):
+                update_candidate(weights, zeros, table, unavailable, smoothing, neighbor_ids[i] * T + t)
+        end = num_full[slot]
+        while end < F and students[slot] + sizes[by_size[end]] >= max_group_size:
+            unavailable[by_size[end], slot] = True
+            update_candidate(weights, zeros, table, unavailable, smoothing, by_size[end] * T + slot)
+            end += 1
+        num_full[slot] = end
+
+        placed_groups[num_placed] = g
+        num_placed += 1
+        slot_of[g] = slot
+        if total_cost > cost_limit:
+            return np.inf, num_placed
+    return total_cost, num_placed
+
+
+def move_group(table, students, slot_of, shared_with, neighbor_ptr, neighbor_ids, sizes, g, slot,
+               overlap_penalty, next_penalty, prev_penalty, prev_exists, next_exists):
+    """
+    Same as GraspEngine.move.
+    """
+    old_slot = slot_of[g]
+    penalties = (overlap_penalty, next_penalty, prev_penalty, prev_exists, next_exists)
+    add_to_table(table, shared_with, neighbor_ptr, neighbor_ids, g, old_slot, -1, *penalties)
+    add_to_table(table, shared_with, neighbor_ptr, neighbor_ids, g, slot, 1, *penalties)
+    students[old_slot] -= sizes[g]
+    students[slot] += sizes[g]
+    slot_of[g] = slot
+
+
+def fill_move_delta(table, students, slot_of, blocked, sizes, max_group_size, rows, cols, move_delta):
+    """
+    Same as GraspEngine.fill_move_delta.
+    """
+    for g in rows:
+        slot = slot_of[g]
+        current = table[g, slot]
+        for t in cols:
+            if blocked[g, t] or students[t] + sizes[g] >= max_group_size or t == slot:
+                move_delta[g, t] = np.inf
+            else:
+                move_delta[g, t] = table[g, t] - current
+
+
+def fill_swap_delta(table, students, slot_of, allowed, N_free, sizes, max_group_size, overlap_penalty, next_penalty, prev_penalty,
+                    rows, swap_delta):
+    """
+    Same as GraspEngine.fill_swap_delta.
+    """
+    F = swap_delta.shape[0]
+    for g in rows:
+        slot_g = slot_of[g]
+        current_g = table[g, slot_g]
+        left_g = students[slot_g] - sizes[g]
+        for h in range(F):
+            slot_h = slot_of[h]
+            diff = slot_h - slot_g
+            delta = np.inf
+            if diff != 0 and allowed[g, slot_h] and allowed[h, slot_g] and left_g + sizes[h] < max_group_size \
+                    and students[slot_h] - sizes[h] + sizes[g] < max_group_size:
+                between = 0.0
+                if diff == 1:
+                    between = next_penalty[slot_g]
+                elif diff == -1:
+                    between = prev_penalty[slot_g]
+                delta = (table[g, slot_h] - current_g) + (table[h, slot_g] - table[h, slot_h]) - 2 * N_free[g, h] * (overlap_penalty - between)
+            swap_delta[g, h] = delta
+            swap_delta[h, g] = delta
+
+
+def update_deltas(table, students, slot_of, allowed, blocked, N_free, shared_with, sizes, max_group_size, overlap_penalty, next_penalty,
+                  prev_penalty, a, b, slot_a, slot_b, move_delta, swap_delta):
+    """
+    Same as GraspEngine.update_deltas. b is -1 after a move.
+    """
+    F, T = move_delta.shape
+    touched = np.zeros(F, dtype=np.bool_)
+    for h in range(F):
+        touched[h] = slot_of[h] == slot_a or slot_of[h] == slot_b or shared_with[a, h] != 0 or (b >= 0 and shared_with[b, h] != 0)
+    rows = np.nonzero(touched)[0]
+    fill_move_delta(table, students, slot_of, blocked, sizes, max_group_size, rows, np.arange(T), move_delta)
+    fill_move_delta(table, students, slot_of, blocked, sizes, max_group_size, np.arange(F), np.array([slot_a, slot_b]), move_delta)
+    fill_swap_delta(table, students, slot_of, allowed, N_free, sizes, max_group_size, overlap_penalty, next_penalty, prev_penalty,
+                    rows, swap_delta)
+
+
+def choose(delta, k, epsilon):
+    """
+    returns: the flat index of the lowest delta if k is -1, otherwise of the k-th delta below -epsilon
+    """
+    flat = delta.ravel()
+    best = 0
+    for i in range(flat.shape[0]):
+        if k < 0:
+            if flat[i] < flat[best]:
+                best = i
+        elif flat[i] < -epsilon:
+            if k == 0:
+                return i
+            k -= 1
+    return best
+
+
+def local_search(table, students, slot_of, cost, first_improvement, uniforms, allowed, blocked, N_free, shared_with, neighbor_ptr, neighbor_ids,
+                 sizes, max_group_size, overlap_penalty, next_penalty, prev_penalty, prev_exists, next_exists):
+    """
+    Runs the steps of GraspEngine.local_search. The arrays of the engine are updated in place.
+    The deltas are computed once per call and updated after every step.
+    param first_improvement: True to take a random improving step, with one random number of uniforms per step
+    returns: (cost after the steps, True if no step lowers the cost anymore). False means the random numbers ran out
+    """
+    epsilon = 1e-9
+    F, T = table.shape
+    move_delta = np.empty((F, T))
+    swap_delta = np.empty((F, F))
+    penalties = (overlap_penalty, next_penalty, prev_penalty, prev_exists, next_exists)
+    free = np.arange(F)
+    fill_move_delta(table, students, slot_of, blocked, sizes, max_group_size, free, np.arange(T), move_delta)
+    fill_swap_delta(table, students, slot_of, allowed, N_free, sizes, max_group_size, overlap_penalty, next_penalty, prev_penalty,
+                    free, swap_delta)
+    step = 0
+    while True:
+        num_moves = 0
+        for value in move_delta.ravel():
+            if value < -epsilon:
+                num_moves += 1
+        num_swaps = 0
+        for value in swap_delta.ravel():
+            if value < -epsilon:
+                num_swaps += 1
+        if num_moves + num_swaps == 0:
+            return cost, True
+
+        if first_improvement:
+            if step == uniforms.shape[0]:
+                return cost, False
+            k = int(uniforms[step] * (num_moves + num_swaps))
+            take_move = k < num_moves
+            move = choose(move_delta, k, epsilon) if take_move else 0
+            swap = 0 if take_move else choose(swap_delta, k - num_moves, epsilon)
+        else:
+            move = choose(move_delta, -1, epsilon)
+            swap = choose(swap_delta, -1, epsilon)
+            take_move = move_delta.ravel()[move] <= swap_delta.ravel()[swap]
+        step += 1
+
+        if take_move:
+            a, slot_b = divmod(move, T)
+            b = -1
+            cost += move_delta[a, slot_b]
+            slot_a = slot_of[a]
+            move_group(table, students, slot_of, shared_with, neighbor_ptr, neighbor_ids, sizes, a, slot_b, *penalties)
+        else:
+            a, b = divmod(swap, F)
+            cost += swap_delta[a, b]
+            slot_a = slot_of[a]
+            slot_b = slot_of[b]
+            move_group(table, students, slot_of, shared_with, neighbor_ptr, neighbor_ids, sizes, a, slot_b, *penalties)
+            move_group(table, students, slot_of, shared_with, neighbor_ptr, neighbor_ids, sizes, b, slot_a, *penalties)
+        update_deltas(table, students, slot_of, allowed, blocked, N_free, shared_with, sizes, max_group_size, overlap_penalty, next_penalty,
+                      prev_penalty, a, b, slot_a, slot_b, move_delta, swap_delta)
+
+
+class Kernels:
+    def __init__(self, name, construct, local_search):
+        self.name = name
+        self.construct = construct
+        self.local_search = local_search
+
+
+def grasp_kernels():
+    """
+    returns: the kernels the GRASP engines should use, COMPILED if GRASP_JIT is set and numba is installed, otherwise None for NumPy
+    """
+    return COMPILED if settings.GRASP_JIT else None
+
+
+def warm_up():
+    """
+    Compiles the kernels, or loads them from numba's cache, by running them on two groups and two timeslots.
+    Called before starting the GRASP pool, so that the processes do not each compile them.
+    """
+    from .grasp import GraspEngine, GraspPair
+
+    kernels = grasp_kernels()
+    if kernels is None:
+        return
+    pairs = [GraspPair(g, 1, t) for g in range(2) for t in range(2)]
+    N_s = {(0, 0): 0, (0, 1): 1, (1, 0): 1, (1, 1): 0, 0: 1, 1: 1}
+    engine = GraspEngine(pairs, {0: [], 1: []}, {"overlap": 1, "B2B": 0, "PMtoAM": 0}, {"N_s": N_s, "n": {0: 0, 1: 0}}, 10, 0, GraspEngine.BEST_IMPROVEMENT, kernels)
+    engine.local_search(engine.construct())
+
+
+PYTHON = Kernels("python", construct, local_search)
+
+COMPILED = None
+if numba is not None:
+    add_to_table = numba.njit(cache=True)(add_to_table)
+    update_candidate = numba.njit(cache=True)(update_candidate)
+    sample = numba.njit(cache=True)(sample)
+    move_group = numba.njit(cache=True)(move_group)
+    fill_move_delta = numba.njit(cache=True)(fill_move_delta)
+    fill_swap_delta = numba.njit(cache=True)(fill_swap_delta)
+    update_deltas = numba.njit(cache=True)(update_deltas)
+    choose = numba.njit(cache=True)(choose)
+    COMPILED = Kernels("numba", numba.njit(cache=True)(construct), numba.njit(cache=True)(local_search))
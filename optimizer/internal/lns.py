@@ -0,0 +1,209 @@
+"""
+Exam Scheduler Web-UI
+Tsugunobu Miyake, Luke Snyder. 2025
+
+Large Neighborhood Search (LNS) around the phase 2 model.
+Starting from a complete schedule, it repeatedly frees a small set of course groups, fixes the others in place,
+and re-solves the resulting small MIP with a short time limit. Improvements are kept as soon as they are found,
+so the search can be stopped at any time with the best schedule so far.
+"""
+
+import random
+import time
+
+from django.conf import settings
+
+
+def missing_groups(G, group2slot):
+    """
+    returns: list of the course groups of G that group2slot does not place. Every group if group2slot is None
+    """
+    if group2slot is None:
+        return list(G)
+    return [g for g in G if g not in group2slot]
+
+
+class LNSOptimizer:
+    RANDOM_NEIGHBORHOOD = "random"
+    TWO_DAYS_NEIGHBORHOOD = "two_days"
+    WORST_GROUPS_NEIGHBORHOOD = "worst_groups"
+    NEIGHBORHOODS = [RANDOM_NEIGHBORHOOD, TWO_DAYS_NEIGHBORHOOD, WORST_GROUPS_NEIGHBORHOOD]
+
+    def __init__(self, phase2_creator, group2slot, fixed_group2slot={}, no_group2slot={}, neighborhood_size=15, subproblem_time_limit=60, on_improvement=None):
+        """
+        param phase2_creator: Phase2ModelCreator whose create_SCIP_model was already called. Its model is reused for every subproblem.
+        param group2slot: dict of the form {course_group: timeslot}. A complete schedule to start from. Raises ValueError if it misses a course group
+        param fixed_group2slot: dict of the form {course_group: timeslot} set by the user. These groups are never freed
+        param no_group2slot: dict of the form {course_group: [t1, t2]} to indicate where courses are NOT allowed to be placed
+        param neighborhood_size: number of course groups freed by the random and worst groups neighborhoods
+        param subproblem_time_limit: SCIP time limit in seconds for each subproblem
+        param on_improvement: optional function called as on_improvement(group2slot, objective) whenever a better schedule is accepted
+        """
+        self.creator = phase2_creator
+        self.model = phase2_creator.model
+        self.data = phase2_creator.data
+        self.penalties = phase2_creator.penalties
+        self.fixed_group2slot = {group: int(slot) for group, slot in fixed_group2slot.items()}
+        self.no_group2slot = no_group2slot
+        self.neighborhood_size = neighborhood_size
+        self.subproblem_time_limit = subproblem_time_limit
+        self.on_improvement = on_improvement
+
+        # x_gt variables of each group: {group: {timeslot: variable}}
+        self.group_vars = {g: dict() for g in self.data["G"]}
+        for (g, t), var in phase2_creator.sch.items():
+            self.group_vars[g][t] = var
+
+        # Students enrolled in each group. Used to find the groups with the worst penalties.
+        h = self.data["h"]
+        self.group_students = {g: [s for s in self.data["S"] if h[s, g] == 1] for g in self.data["G"]}
+
+        self.free_groups = [g for g in self.data["G"] if g not in self.fixed_group2slot]
+        self.days = self.compute_days()
+
+        missing = missing_groups(self.data["G"], group2slot)
+        if missing:
+            raise ValueError("LNS needs a complete schedule to start from, {} course groups are missing: {}".format(len(missing), ", ".join(map(str, missing[:10]))))
+        self.best_group2slot = {g: int(group2slot[g]) for g in self.data["G"]}
+        self.best_obj = float('inf')
+        self.model.hideOutput()
+
+    def compute_days(self):
+        """
+        Groups the valid timeslots by exam day.
+        returns: list of lists of timeslots, one list per day that has at least one valid timeslot
+        """
+        d = self.data["d"]
+        n = self.data["n"]
+        T = self.data["T"]
+
+        # The night exam is the last exam of the day. Without a night exam, every timeslot is taken as the same day.
+        nights = [t for t in T if n.get(t) == 1]
+        slots_per_day = min(nights) + 1 if nights else len(T)
+
+        days = dict()
+        for t in T:
+            if d[t] == 1:
+                days.setdefault(t // slots_per_day, []).append(t)
+        return list(days.values())
+
+    def run(self, seconds):
+        """
+        Runs LNS until the time limit is reached.
+        param seconds: time limit for the whole search
+        returns: the best schedule in the form {course_group: timeslot} and its objective value
+        """
+        start = time.time()
+
+        # Evaluate the starting schedule by solving with every group fixed.
+        group2slot, obj = self.solve_neighborhood([], self.subproblem_time_limit)
+        if group2slot is not None:
+            self.accept(group2slot, obj)
+        print("LNS starting objective:", self.best_obj)
+
+        iteration = 0
+        while time.time() - start < seconds:
+            kind = self.NEIGHBORHOODS[iteration % len(self.NEIGHBORHOODS)]
+            iteration += 1
+
+            free = self.choose_neighborhood(kind)
+            if len(free) == 0:
+                continue
+
+            remaining = seconds - (time.time() - start)
+            group2slot, obj = self.solve_neighborhood(free, min(self.subproblem_time_limit, remaining))
+            if group2slot is not None and obj < self.best_obj - settings.EPSILON:
+                print("LNS iteration {} ({}, {} groups): {} -> {}, time: {:.1f}".format(iteration, kind, len(free), self.best_obj, obj, time.time() - start))
+                self.accept(group2slot, obj)
+
+        return self.best_group2slot, self.best_obj
+
+    def accept(self, group2slot, obj):
+        self.best_group2slot = group2slot
+        self.best_obj = obj
+        if self.on_improvement is not None:
+            self.on_improvement(group2slot, obj)
+
+    def choose_neighborhood(self, kind):
+        """
+        param kind: one of NEIGHBORHOODS
+        returns: list of course groups to free
+        """
+        size = min(self.neighborhood_size, len(self.free_groups))
+
+        if kind == self.RANDOM_NEIGHBORHOOD:
+            return random.sample(self.free_groups, size)
+
+        if kind == self.TWO_DAYS_NEIGHBORHOOD:
+            days = random.sample(self.days, min(2, len(self.days)))
+            slots = set(t for day in days for t in day)
+            return [g for g in self.free_groups if self.best_group2slot[g] in slots]
+
+        if kind == self.WORST_GROUPS_NEIGHBORHOOD:
+            scores = self.compute_group_penalties()
+            ranked = sorted(self.free_groups, key=lambda g: -scores[g])
+            # Sample from the worst 2 * size groups so that consecutive iterations do not free the exact same groups.
+            return random.sample(ranked[:2 * size], size)
+
+        raise ValueError(kind)
+
+    def compute_group_penalties(self):
+        """
+        Computes how much penalty the students in each group incur in the incumbent solution.
+        returns: dict of the form {course_group: penalty of the students enrolled in the group}
+        """
+        if self.model.getNSols() == 0:
+            return {g: 0 for g in self.free_groups}
+
+        solution = self.model.getBestSol()
+        student_penalty = dict()
+        for key, var in self.creator.bad.items():
+            value = self.model.getSolVal(solution, var)
+            if value > settings.EPSILON:
+                student_penalty[key[0]] = student_penalty.get(key[0], 0) + self.penalties[key[-1]] * value
+
+        return {g: sum(student_penalty.get(s, 0) for s in self.group_students[g]) for g in self.free_groups}
+
+    def solve_neighborhood(self, free, time_limit):
+        """
+        Fixes every group that is not in free to its incumbent timeslot and solves the remaining MIP.
+        The incumbent is given to SCIP as a starting solution.
+        param free: list of course groups that may move
+        param time_limit: SCIP time limit in seconds
+        returns: the best schedule found in the form {course_group: timeslot} and its objective value, or (None, None) if none was found
+        """
+        model = self.model
+        model.freeTransform()
+
+        free = set(free)
+        for g, slot_vars in self.group_vars.items():
+            forbidden = self.no_group2slot.get(g, [])
+            for t, var in slot_vars.items():
+                if g in free:
+                    ub = 0 if t in forbidden else 1
+                    model.chgVarLb(var, 0)
+                    model.chgVarUb(var, ub)
+                else:
+                    value = 1 if t == self.best_group2slot[g] else 0
+                    model.chgVarLb(var, value)
+                    model.chgVarUb(var, value)
+
+        partial_solution = model.createPartialSol()
+        for g, slot_vars in self.group_vars.items():
+            for t, var in slot_vars.items():
+                model.setSolVal(partial_solution, var, 1 if t == self.best_group2slot[g] else 0)
+        model.addSol(partial_solution)
+
+        model.setRealParam("limits/time", max(time_limit, 1))
+        model.optimize()
+
+        if model.getNSols() == 0:
+            return None, None
+
+        solution = model.getBestSol()
+        group2slot = dict()
+        for g, slot_vars in self.group_vars.items():
+            for t, var in slot_vars.items():
+                if model.getSolVal(solution, var) > 0.5:
+                    group2slot[g] = t
+        return group2slot, model.getSolObjVal(solution)
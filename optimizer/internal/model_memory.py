@@ -0,0 +1,97 @@
+"""
+Exam Scheduler Web-UI
+Tsugunobu Miyake, Luke Snyder. 2025
+
+Estimates the memory of the phase 1 and phase 2 SCIP models before they are built, from the numbers of variables, rows and nonzeros
+that follow from the params. The WorkerPool only starts a solve while the estimates of the running solves fit in OPTIMIZER_MEMORY_BUDGET,
+and the solve gets its estimate as SCIP's limits/memory. The pool prints the estimate of every task next to the memory it really used,
+so that the coefficients below can be calibrated.
+"""
+
+# MB of a solve, whatever the size of its model: the SCIP instance with its plugins, its first branch and bound nodes and the Python objects around it.
+BASE_MB = 250
+
+# MB per variable, row and nonzero of a model. Fitted on the peak memory of phase 2 solves of the first minute, which holds the original
+# and the presolved problem, the LP and the Python objects of every variable and constraint. The tree of a long solve grows past it,
+# until SCIP reaches limits/memory and saves memory by searching depth first.
+VARIABLE_MB = 2.5e-3
+ROW_MB = 2.5e-3
+NONZERO_MB = 1.5e-4
+
+def estimate_mb(variables, rows, nonzeros):
+    """
+    returns: estimated memory in MB that a solve of a model of this size adds to its process
+    """
+    return BASE_MB + VARIABLE_MB * variables + ROW_MB * rows + NONZERO_MB * nonzeros
+
+def slots(params):
+    """
+    returns: (number of exam slots, number of pairs of consecutive exam slots)
+    """
+    T = params["T"]
+    d = params["d"]
+    num_slots = sum(1 for t in T if d[t] == 1)
+    consecutive = sum(1 for t in T[0:len(T)-1] if d[t] == 1 and d.get(t + 1) == 1)
+    return num_slots, consecutive
+
+def phase1_model_size(params, num_courses, num_constrained):
+    """
+    Size of the model of Phase1ModelCreator. Every pair of groups is counted, even the pairs without common students or faculty.
+    param num_courses: number of courses placed in phase 1
+    param num_constrained: number of groups of the initial group2slot and no_group2slot, which are placed too
+    returns: (variables, rows, nonzeros)
+    """
+    num_slots, consecutive = slots(params)
+    groups = min(max(num_courses, num_constrained), len(params["G"]))
+    pairs = groups * (groups - 1) // 2
+    variables = groups * num_slots + 3 * pairs
+    rows = groups + pairs * (num_slots + 2 * consecutive) + num_slots
+    nonzeros = 2 * groups * num_slots + pairs * (3 * num_slots + 6 * consecutive)
+    return variables, rows, nonzeros
+
+def phase2_model_size(params, lazy_windows=False):
+    """
+    Size of the model of Phase2ModelCreator. The number of exams of a student or faculty stands for the number of their groups,
+    which it can only exceed.
+    param lazy_windows: whether the 3 in 24 and 4 in 48 windows are left out of the model, see PHASE_2_LAZY_WINDOWS
+    returns: (variables, rows, nonzeros)
+    """
+    S = params["S"]
+    G = params["G"]
+    F = params["F"]
+    T = params["T"]
+    d = params["d"]
+    num_exams = params["num_exams"]
+    f_num_exams = params["f_num_exams"]
+    num_slots, consecutive = slots(params)
+    student_groups = sum(num_exams[s] for s in S)
+    faculty_groups = sum(f_num_exams[f] for f in F)
+
+    # x_gt, m_st, o_ft, the 2 + 3 per slot badness of each student and the 2 of each faculty.
+    variables = len(G) * num_slots + len(S) * num_slots + len(F) * num_slots + len(S) * (2 + 3 * num_slots) + 2 * len(F)
+
+    # One group per slot, overlap and m_st of every student, and the students per slot.
+    rows = len(G) + 2 * len(S) * num_slots + num_slots
+    nonzeros = 2 * len(G) * num_slots + 2 * (student_groups + len(S)) * num_slots
+
+    if not lazy_windows:
+        three_in_24 = sum(1 for t in T[0:len(T)-3] if d[t] == 1 and d.get(t + 3) == 1)
+        four_in_48 = sum(1 for t in T[0:len(T)-7] if d[t] == 1 and (d.get(t + 7) == 1 or d.get(t + 6) == 1))
+        for s in S:
+            if num_exams[s] >= 3:
+                rows += three_in_24
+                nonzeros += 5 * three_in_24
+            if num_exams[s] >= 4:
+                rows += four_in_48
+                nonzeros += 9 * four_in_48
+
+    # Back to back and night to morning of every student with 2 exams.
+    students_with_two = sum(1 for s in S if num_exams[s] >= 2)
+    rows += students_with_two * consecutive
+    nonzeros += 4 * students_with_two * consecutive
+
+    # Overlap of every pair of groups of a faculty, o_ft and back to back of every faculty.
+    pairs = sum(f_num_exams[f] ** 2 for f in F)
+    rows += pairs + len(F) * num_slots + len(F) * consecutive
+    nonzeros += pairs * (2 * num_slots + 1) + (faculty_groups + len(F)) * num_slots + 3 * len(F) * consecutive
+    return variables, rows, nonzeros
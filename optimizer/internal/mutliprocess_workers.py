@@ -5,10 +5,12 @@ Tsugunobu Miyake, Luke Snyder. 2025
 Contains multiprocess workers for the exam scheduling optimization.
 """
 
+import gc
 import os
 import django
-import random
-import copy
+import json
+import time
+import numpy as np
 from datetime import datetime
 
 
@@ -17,11 +19,55 @@ django.setup()
 
 from django.conf import settings
 
+from .grasp import GraspEngine, ElitePool
+from .kernels import grasp_kernels
+from .warm_start import FullScheduleHeuristic
+from .evaluate import ScheduleEvaluator
+from .racing import RacingEventhdlr
+from .checkpoint import Phase2Checkpointer
+from . import worker_pool, telemetry
+
+# Best cost found so far by the GRASP processes of a pool, one value per number of courses. Set by init_grasp_pool_worker.
+shared_best_costs = None
+
+# ExamOptimizer of the processes of the WorkerPool of an optimization. Set by init_optimizer_pool_worker.
+pool_optimizer = None
+
+# params dict of the model_creator of pool_optimizer, inherited from the main process. Set by init_optimizer_pool_worker.
+inherited_params = None
+
 def init_django():
     os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'ExamScheduling.settings')
     django.setup()
 
-def SCIP_phase1_worker(optimizer, num_courses, num_exam_slots, grasp_solution, time_minimum, results, penalties, warm_start_grasp):
+def init_optimizer_pool_worker(optimizer, shared_params):
+    """
+    Initializer of the processes of the WorkerPool of an ExamOptimizer.
+    The model_creator of the optimizer reads its params from shared memory in this process.
+    param optimizer: the ExamOptimizer, inherited from the main process when the process is forked
+    param shared_params: SharedParams of the params of the model_creator
+    """
+    global pool_optimizer, inherited_params
+    # The inherited dicts are kept but never read. Freeing them would write to every page holding them, copying the pages into this process.
+    inherited_params = optimizer.model_creator.params
+    optimizer.model_creator.params = shared_params.params
+    pool_optimizer = optimizer
+    init_django()
+
+def run_with_pool_optimizer(worker, *args):
+    """
+    Task of the WorkerPool. Calls worker with the ExamOptimizer of the process, so that it is not pickled with every task.
+    returns: the result of worker
+    """
+    try:
+        return worker(pool_optimizer, *args)
+    finally:
+        # The process runs other tasks afterwards. Its phase 2 model is freed now, instead of when the next task replaces it.
+        pool_optimizer.model_creator.phase2 = None
+        pool_optimizer.model_creator.phase2SCIP_model = None
+        gc.collect()
+
+def SCIP_phase1_worker(optimizer, num_courses, num_exam_slots, grasp_solution, time_minimum, penalties, warm_start_grasp):
         """
         multiprocess function to solve phase1 using SCIP
         param optimizer: ExamOptimizer object used to reference information and create the SCIP model
@@ -29,12 +75,12 @@ def SCIP_phase1_worker(optimizer, num_courses, num_exam_slots, grasp_solution, t
         param num_exam_slots: number of exam slots the semester has
         param grasp_solution: an incomplete schedule used to warm start SCIP. As SCIP says, this "may or may not be ignored"
         param time_minimum: minimum number of seconds that SCIP will try and solve phase1
-        param results: multiprocess dict to store the output of this function. output is stored in the format {phase1_cost:phase1_solution}
         param penalties: dict of the form {string of problem: float penalty associated with the problem}
         param warm_start_grasp: boolean as to whether to run grasp and use it to suggest a solution to scip
-        returns: None, results is used to pull info out
+        returns: ((phase1_cost, num_courses), phase1_solution), or (-1, 0) if phase1 is infeasible
         """
         init_django()
+        start = time.time()
         large_courses = optimizer.choose_large_classes(num_courses)
         grasp_pairs, grasp_schedule = optimizer.grasp_pair_creation(large_courses)
         group_sizes = optimizer.model_creator.params["N_s"]
@@ -44,43 +90,61 @@ def SCIP_phase1_worker(optimizer, num_courses, num_exam_slots, grasp_solution, t
         
         SCIP_model = optimizer.model_creator.create_phase1_SCIP_model(optimizer.group2slot, optimizer.no_groupslot, num_courses, time_minimum, penalties)
         SCIP_model.hideOutput()
+        set_memory_limit(SCIP_model)
+        worker_pool.task_stats.update(stage="phase1", num_courses=num_courses, grasp=warm_start_grasp, build_time=time.time() - start,
+                                      **telemetry.model_stats(SCIP_model))
         if warm_start_grasp:
-            grasp_solution, grasp_cost = single_process_grasp_solver(num_courses, grasp_pairs, grasp_schedule, penalties, optimizer.model_creator.params, max_size, time_minimum)
-            partial_solution = SCIP_model.createPartialSol()
-            variables = SCIP_model.getVars()
-            for group in grasp_solution:
-                timeslot = grasp_solution[group]
-                found = False
-                for current in variables:
-                    if (current.name == "x_gt[" + str(group) + "," + str(timeslot) + "]"):
-                        found = True
-                        SCIP_model.setSolVal(partial_solution, current, 1)
-                        break
-                if (not found):
-                    print("failed to find variable named:", "x_gt[" + str(group) + "," + str(timeslot) + "]")
+            start = time.time()
+            # Every schedule of the GRASP elite pool, up to PHASE_1_GRASP_SEEDS, is offered to SCIP as a partial solution.
+            grasp_solutions = single_process_grasp_solver(num_courses, grasp_pairs, grasp_schedule, penalties, optimizer.model_creator.params, max_size, time_minimum)
+            variables = {current.name: current for current in SCIP_model.getVars()}
+            for grasp_solution, grasp_cost in grasp_solutions[:settings.PHASE_1_GRASP_SEEDS]:
+                partial_solution = SCIP_model.createPartialSol()
+                for group in grasp_solution:
+                    timeslot = grasp_solution[group]
+                    name = "x_gt[" + str(group) + "," + str(timeslot) + "]"
+                    if name in variables:
+                        SCIP_model.setSolVal(partial_solution, variables[name], 1)
+                    else:
+                        print("failed to find variable named:", name)
+                SCIP_model.addSol(partial_solution)
+            print("offered {} GRASP schedules to phase 1 with {} classes".format(min(len(grasp_solutions), settings.PHASE_1_GRASP_SEEDS), num_courses))
+            worker_pool.task_stats["grasp_time"] = time.time() - start
 
 
         print("beginning phase one solve with {} classes".format(num_courses))
+        start = time.time()
         SCIP_model.optimize()
+        worker_pool.task_stats.update(solve_time=time.time() - start, **telemetry.solve_stats(SCIP_model))
         if (SCIP_model.getStatus() == "infeasible"):
-            results[-1] = 0
-            return
+            return -1, 0
         print("----------------\nphase 1 using {} courses: {}\n----------------".format(num_courses, SCIP_model.getObjVal()))
 
         SCIP_group2slot, SCIP_partial_solution = optimizer.get_SCIP_group2slot(SCIP_model, num_exam_slots)
-        results[(SCIP_model.getObjVal(), num_courses)] = SCIP_group2slot
+        return (SCIP_model.getObjVal(), num_courses), SCIP_group2slot
 
-def SCIP_phase2_worker(optimizer, preference_profile, group2slot, num_exam_slots, results, num_courses, output_dir):
+def SCIP_phase2_worker(optimizer, preference_profile, group2slot, num_exam_slots, num_courses, output_dir, schedule_pk=None, threads=1, board=None, run=0, checkpoint=None, run_name=None,
+                       start_group2slot=None, time_limit=None):
     """
     multiprocess function to do the final optimization and produce a full schedule that can be displayed
     param optimizer: ExamOptimizer object used to reference information and create the SCIP model
     param preference_profile: dict of the form {string of problem: float penalty associated with the problem}
     param group2slot: dict of the form {group:timeslot} produced by phase1. Used to create constraints to narrow down the problem such that it can be solved in the lifetime of the universe
     param num_exam_slots: number of exam slots the semester has
-    param results: multiprocess dict to store the output of this function. output is stored in the format {phase1_cost:phase1_solution}
-    returns: None, results is used to pull info out
+    param schedule_pk: database id of the schedule being optimized. If given, every new incumbent is recorded in the database
+    param threads: if more than 1, the model is solved by SCIP's concurrent solver using this many threads
+    param board: BoundBoard shared with the other phase 2 runs. If given, this run is stopped once another run's incumbent is out of its reach
+    param run: index of this run in board
+    param checkpoint: dict with the "params_hash" and "phase1_cost" of the run. If given with schedule_pk, the run updates its Phase2Checkpoint.
+                      A resumed run also has the "group2slot" of its saved incumbent, the "elapsed_time" it already ran, and whether it "finished"
+    param run_name: name of the run, the prefix of its files. Defaults to "Fixed<num_courses>"
+    param start_group2slot: dict of the form {group:timeslot} of a schedule to start from, e.g. to re-optimize a saved schedule,
+                            instead of the phase 2 warm start. It may leave out some groups, then SCIP completes it
+    param time_limit: seconds of the solve. Defaults to PHASE_2_TIME_LIMIT
+    returns: (phase2_cost, phase2_solution), or (-1, 0) if phase2 is infeasible or the run was stopped before finding a solution
     """
-    SCIP_model = optimizer.model_creator.create_phase2_SCIP_model(preference_profile, num_courses, output_dir)
+    start = time.time()
+    SCIP_model = optimizer.model_creator.create_phase2_SCIP_model(preference_profile, num_courses, output_dir, name=run_name, schedule_pk=schedule_pk)
     variables = SCIP_model.getVars()
     for group in group2slot:
         timeslot = group2slot[group]
@@ -93,44 +157,154 @@ def SCIP_phase2_worker(optimizer, preference_profile, group2slot, num_exam_slots
         if (not found):
             print("failed to find variable named:", "x_gt[" + str(group) + "," + str(timeslot) + "]")
 
+    worker_pool.task_stats.update(stage="phase2", run_name=run_name or "Fixed{}".format(num_courses), schedule_pk=schedule_pk,
+                                  build_time=time.time() - start, **telemetry.model_stats(SCIP_model))
+    start = time.time()
+    if time_limit is None:
+        time_limit = settings.PHASE_2_TIME_LIMIT
+    if start_group2slot is not None:
+        heuristic = FullScheduleHeuristic(optimizer.model_creator.params, preference_profile, group2slot, optimizer.no_groupslot)
+        add_phase2_solution(optimizer, heuristic, {g: int(t) for g, t in start_group2slot.items()})
+        print("phase 2 starts from a schedule of {} groups".format(len(start_group2slot)))
+    elif checkpoint is not None and checkpoint.get("group2slot") is not None:
+        # Resumed run: start from the saved incumbent, with the rest of the time limit.
+        heuristic = FullScheduleHeuristic(optimizer.model_creator.params, preference_profile, group2slot, optimizer.no_groupslot)
+        add_phase2_solution(optimizer, heuristic, {g: int(t) for g, t in checkpoint["group2slot"].items()})
+        time_limit = 1 if checkpoint.get("finished") else max(time_limit - checkpoint["elapsed_time"], 1)
+        print("resuming phase 2 with {} courses from objective {} after {:.0f} s".format(num_courses, checkpoint.get("objective"), checkpoint["elapsed_time"]))
+    elif settings.PHASE_2_WARM_START_TIME_LIMIT > 0:
+        add_phase2_warm_start(optimizer, preference_profile, group2slot, settings.PHASE_2_WARM_START_TIME_LIMIT)
+
+    worker_pool.task_stats["warm_start_time"] = time.time() - start
     # SCIP_model.hideOutput()
-    SCIP_model.setRealParam("limits/time", settings.PHASE_2_TIME_LIMIT)
-    SCIP_model.optimize()
-    if (SCIP_model.getStatus() == "infeasible"):
-        results[-1] = 0
-        return
+    SCIP_model.setRealParam("limits/time", time_limit)
+    set_memory_limit(SCIP_model)
+    eventhdlr = optimizer.model_creator.phase2.eventhdlr
+    checkpointer = None
+    if checkpoint is not None and schedule_pk is not None:
+        checkpointer = Phase2Checkpointer(eventhdlr, schedule_pk, checkpoint, settings.PHASE_2_CHECKPOINT_INTERVAL)
+        SCIP_model.includeEventhdlr(checkpointer, "checkpoint", "saves the incumbent and elapsed time of the run, so that it can be resumed")
+    racing = None
+    if board is not None:
+        racing = RacingEventhdlr(board, run, settings.PHASE_2_RACING_MARGIN)
+        SCIP_model.includeEventhdlr(racing, "racing", "stops the run once another phase 2 run has a better incumbent than its dual bound")
+    start = time.time()
+    if threads > 1:
+        SCIP_model.setIntParam("parallel/maxnthreads", threads)
+        SCIP_model.solveConcurrent()
+        if SCIP_model.getNSols() > 0:
+            eventhdlr.publish(SCIP_model.getBestSol())
+    else:
+        SCIP_model.optimize()
+    worker_pool.task_stats.update(solve_time=time.time() - start, **telemetry.solve_stats(SCIP_model))
+    if checkpointer is not None:
+        checkpointer.finish()
+    # The main process reads the files written by the callback once this task returns.
+    eventhdlr.wait_for_writes()
+    stopped_by = racing.stopped_by if racing is not None else None
+    save_phase2_stats(SCIP_model, os.path.join(output_dir, eventhdlr.run_name + "_stats.json"), threads, stopped_by)
+    if racing is not None:
+        racing.close()
+    if (SCIP_model.getStatus() == "infeasible") or SCIP_model.getNSols() == 0:
+        return -1, 0
     
     print("-----------------------\nOptimal value phase 2:", SCIP_model.getObjVal(), "\n-----------------------")
 
     SCIP_group2slot, SCIP_partial_solution = optimizer.get_SCIP_group2slot(SCIP_model, num_exam_slots)
-    results[SCIP_model.getObjVal()] = SCIP_group2slot
+    return SCIP_model.getObjVal(), SCIP_group2slot
+
+def set_memory_limit(SCIP_model):
+    """
+    Limits the memory of SCIP to the memory the WorkerPool reserved for this task, if it has a memory budget.
+    Close to the limit, SCIP saves memory by searching depth first. At the limit, it stops with its incumbent.
+    """
+    if worker_pool.task_memory_limit > 0:
+        SCIP_model.setRealParam("limits/memory", worker_pool.task_memory_limit)
 
-def multi_process_grasp_solver(id, pairs, schedule, penalties, params, max_group_size, seconds_limit, smoothing, results, num_courses):
+def add_phase2_warm_start(optimizer, preference_profile, group2slot, seconds):
     """
-    multiprocess function that uses grasp to solve phase1
+    Builds a schedule of every course group with FullScheduleHeuristic and gives it to the phase 2 model as a partial solution,
+    so that SCIP starts with an incumbent. Every x_gt variable is set, as well as the student and faculty variables that follow from it.
+    param group2slot: dict of the form {group:timeslot} of the groups fixed by phase 1
+    param seconds: time limit of the heuristic
+    """
+    heuristic = FullScheduleHeuristic(optimizer.model_creator.params, preference_profile, group2slot, optimizer.no_groupslot)
+    full_group2slot, cost = heuristic.run(seconds)
+    if full_group2slot is None:
+        print("no warm start schedule found for phase 2")
+        return
+
+    add_phase2_solution(optimizer, heuristic, full_group2slot)
+    print("phase 2 warm start objective:", cost)
+
+def add_phase2_solution(optimizer, heuristic, full_group2slot):
+    """
+    Gives a schedule to the phase 2 model as a partial solution.
+    param heuristic: FullScheduleHeuristic of the run, gives the student and faculty variables that follow from the schedule
+    param full_group2slot: dict of the form {group:timeslot}. If it contains every course group, the student and faculty variables are set too.
+                           Otherwise only the x_gt variables of its groups are, and SCIP completes the schedule
+    """
+    phase2 = optimizer.model_creator.phase2
+    SCIP_model = phase2.model
+    partial_solution = SCIP_model.createPartialSol()
+    for (g, t), var in phase2.sch.items():
+        if g in full_group2slot:
+            SCIP_model.setSolVal(partial_solution, var, 1 if full_group2slot[g] == t else 0)
+    if all(g in full_group2slot for g, t in phase2.sch):
+        for key, value in heuristic.variable_values(full_group2slot).items():
+            for index, var in getattr(phase2, key).items():
+                SCIP_model.setSolVal(partial_solution, var, value.get(index, 0))
+    SCIP_model.addSol(partial_solution)
+
+def save_phase2_stats(SCIP_model, path, threads, stopped_by=None):
+    """
+    Saves the final bounds of a phase 2 solve, e.g. to compare the single and multi-threaded modes.
+    param stopped_by: incumbent of the other phase 2 run that made racing stop this run, or None
+    """
+    stats = {
+        "status": SCIP_model.getStatus(),
+        "primal_bound": SCIP_model.getPrimalbound(),
+        "dual_bound": SCIP_model.getDualbound(),
+        "gap": SCIP_model.getGap(),
+        "nodes": SCIP_model.getNNodes(),
+        "solving_time": SCIP_model.getSolvingTime(),
+        "threads": threads,
+        "stopped_by": stopped_by,
+    }
+    with open(path, "w") as f:
+        json.dump(stats, f)
+
+def init_grasp_pool_worker(best_costs):
+    """
+    Initializer of the processes of the GRASP pool.
+    param best_costs: multiprocessing.Array of the best cost found for each number of courses, shared by the processes
+    """
+    global shared_best_costs
+    shared_best_costs = best_costs
+
+def multi_process_grasp_solver(id, pairs, schedule, penalties, params, max_group_size, seconds_limit, smoothing, num_courses, best_index=None):
+    """
+    function run by the processes of the GRASP pool to solve phase1
     param pairs: list of grasp_pairs that represent all combinations of (group, timeslot) to be optimized
     param schedule: dict of the form {timeslot: [groups_at_this_time]}. has initial constraints inside it already if any exist
     param penalties: dict of the form {string of problem: float penalty associated with the problem}
-    param params: dict of the form {string: data} stolen from the model_creator, since I need a a couple of the stuff in it
+    param params: SharedGraspParams of the semester, or the params dict of the model_creator
     param max_group_size: max number of studets that can be in a single group
     param seconds_limit: number of seconds that this function will run grasp solutions
     param smoothing: value that makes the grasp placement more random... supposedly... its pretty bad... higher value is more random
-    param results: multiprocess dict used to extract the output
-    returns: none, see results
+    param num_courses: number of courses placed, returned with the result
+    param best_index: index of the number of courses in shared_best_costs, shared with the other processes placing the same courses
+    returns: (cost of the best schedule, num_courses, best schedule in the form {timeslot: [groups_at_this_time]})
     """
+    engine = GraspEngine(pairs, schedule, penalties, params, max_group_size, smoothing, settings.GRASP_LOCAL_SEARCH, grasp_kernels())
+    pool = grasp_search(id, engine, seconds_limit, smoothing, best_index)
+
     winner = None
-    winning_cost = float('inf')
-    
-    start = datetime.now()
-    while (datetime.now() - start).total_seconds() < seconds_limit:
-        output, cost, placed = grasp_placement(copy.deepcopy(pairs), copy.deepcopy(schedule), penalties, params, max_group_size, smoothing)
-
-        if (cost < winning_cost):
-            print("id: {}, old: {}, new: {}, time: {}, smoothness: {}".format(id, winning_cost, cost, datetime.now() - start, smoothing))
-            winner = output
-            winning_cost = cost  
-           
-    results[(winning_cost, num_courses)] = winner
+    winning_cost = pool.best_cost()
+    if len(pool) > 0:
+        engine.load(pool.ranked()[0][1])
+        winner = engine.get_schedule()
+    return winning_cost, num_courses, winner
     
 def single_process_grasp_solver(id, pairs, schedule, penalties, params, max_group_size, seconds_limit, smoothing = 0):
     """
@@ -142,206 +316,102 @@ def single_process_grasp_solver(id, pairs, schedule, penalties, params, max_grou
     param max_group_size: max number of studets that can be in a single group
     param seconds_limit: number of seconds that this function will run grasp solutions
     param smoothing: value that makes the grasp placement more random... supposedly... its pretty bad... higher value is more random
-    returns: dict of the form {course:timeslot} and the cost of the schedule it found
+    returns: list of (dict of the form {course:timeslot}, cost of the schedule) for the schedules of the elite pool, from the best to the worst
     """
-    winner = None
-    winning_cost = float('inf')
-    win_pairs = []
+    engine = GraspEngine(pairs, schedule, penalties, params, max_group_size, smoothing, settings.GRASP_LOCAL_SEARCH, grasp_kernels())
+    pool = grasp_search(id, engine, seconds_limit, smoothing)
+
+    solutions = []
+    for rank, (cost, solution) in enumerate(pool.ranked()):
+        engine.load(solution)
+        winner = engine.get_schedule()
+        if rank == 0:
+            check_grasp_solution(winner, schedule, params, penalties, engine.get_pairs(), cost)
+
+        output_format = dict()
+        for key in winner:
+            for group in winner[key]:
+                output_format[group] = key
+        solutions.append((output_format, cost))
+    return solutions
+
+def grasp_search(id, engine, seconds_limit, smoothing, best_index=None):
+    """
+    Runs GRASP restarts until the time limit, keeping the best diverse schedules in an elite pool.
+    Every GRASP_PATH_RELINKING_INTERVAL restarts, relinks two schedules of the pool and offers the result to the pool.
+    param engine: GraspEngine to construct the schedules with
+    param seconds_limit: number of seconds to run for
+    param best_index: index in shared_best_costs of the best cost shared with the other processes, or None to not share it.
+                      Without local search, a construction is abandoned as soon as its cost goes over the shared best cost.
+                      With local search, every construction is finished, since the local search may still make it the best
+    returns: the ElitePool
+    """
+    pool = ElitePool(settings.GRASP_ELITE_POOL_SIZE, max(1, engine.num_free // 10))
+    interval = settings.GRASP_PATH_RELINKING_INTERVAL
+    shared = shared_best_costs if best_index is not None else None
+    restarts = 0
+    relinks = 0
+    pruned = 0
     start = datetime.now()
     while (datetime.now() - start).total_seconds() < seconds_limit:
-        output, cost, new_pairs = grasp_placement(copy.deepcopy(pairs), copy.deepcopy(schedule), penalties, params, max_group_size, smoothing)
+        if settings.GRASP_LOCAL_SEARCH is None and shared is not None:
+            cost = engine.construct(shared[best_index])
+            pruned += not np.isfinite(cost)
+        else:
+            cost = engine.construct()
+        if settings.GRASP_LOCAL_SEARCH is not None:
+            cost = engine.local_search(cost)
+        restarts += 1
+        if (cost < pool.best_cost()):
+            print("id: {}, old: {}, new: {}, time: {}, smoothness: {}".format(id, pool.best_cost(), cost, datetime.now() - start, smoothing))
+            share_best_cost(shared, best_index, cost)
+        pool.add(cost, engine.get_solution())
 
-        if (cost < winning_cost):
-            print("id: {}, old: {}, new: {}, time: {}, smoothness: {}".format(id, winning_cost, cost, datetime.now() - start, smoothing))
-            winner = output
-            winning_cost = cost  
-            win_pairs = new_pairs
-    
-    check_grasp_solution(winner, schedule, params, penalties, win_pairs, winning_cost)
-    
-    output_format = dict()
-    for key in winner:
-        for group in winner[key]:
-            output_format[group] = key
-    return output_format, winning_cost
+        if interval > 0 and restarts % interval == 0 and len(pool) >= 2:
+            cost, solution = engine.path_relink(*pool.choose_pair(engine.rng), pool.min_distance)
+            relinks += 1
+            if (cost < pool.best_cost()):
+                print("id: {}, old: {}, new: {}, time: {}, path relinking".format(id, pool.best_cost(), cost, datetime.now() - start))
+                share_best_cost(shared, best_index, cost)
+            if solution is not None:
+                pool.add(cost, solution)
+
+    print_grasp_throughput(id, restarts, start)
+    seconds = (datetime.now() - start).total_seconds()
+    worker_pool.task_stats.update(grasp_restarts=restarts, grasp_restarts_per_second=restarts / seconds if seconds > 0 else 0)
+    if shared is not None:
+        print("id: {}, constructions pruned by the shared best cost: {}".format(id, pruned))
+    print("id: {}, path relinks: {}, elite pool costs: {}".format(id, relinks, [round(cost, 4) for cost, solution in pool.ranked()]))
+    return pool
+
+def share_best_cost(shared, best_index, cost):
+    if shared is not None:
+        with shared.get_lock():
+            shared[best_index] = min(shared[best_index], cost)
+
+def print_grasp_throughput(id, restarts, start):
+    seconds = (datetime.now() - start).total_seconds()
+    print("id: {}, grasp restarts: {}, restarts per second: {:.1f}".format(id, restarts, restarts / seconds))
 
 def check_grasp_solution(winner, schedule, params, penalties, win_pairs, winning_cost):
     """
-    method to verify a grasp solution by manually computing the cost of the schedule and comparing it to what grasp says
+    method to verify a grasp solution by recomputing the cost of the schedule from the student enrollments and comparing it to what grasp says
     """
-    intersect = params["N_s"]
-    night_time_slots = params["n"]
-    over_lis = []
-    overlap = 0
-    b2b = 0
-    n2m = 0
-    #overlaps
-    for timeslot in winner:
-        for group1 in winner[timeslot]:
-            for group2 in winner[timeslot]:
-                if group1 == group2:
-                    continue
-                overlap += intersect[group1, group2]
-                if intersect[group1, group2] > 0:
-                    over_lis.append((group1, group2, intersect[group1, group2]))
-    
-    for timeslot in winner:
-        if timeslot + 1 in schedule.keys() and night_time_slots[timeslot] == 0:
-            for group1 in winner[timeslot]:
-                for group2 in winner[timeslot + 1]:
-                    if group1 == group2:
-                        continue
-                    b2b += intersect[group1, group2]
-        if timeslot - 1 in schedule.keys() and night_time_slots[timeslot] == 0:
-            for group1 in winner[timeslot]:
-                for group2 in winner[timeslot - 1]:
-                    if group1 == group2:
-                        continue
-                    b2b += intersect[group1, group2]
-    #n2m (night-to-morning)
-    ## placing at night which might conflict with the morning slot.
-        if timeslot + 1 in schedule.keys() and night_time_slots[timeslot] == 1:
-            for group1 in winner[timeslot]:
-                for group2 in winner[timeslot + 1]:
-                    if group1 == group2:
-                        continue
-                    n2m += intersect[group1, group2]
-
-    ## placing at morning which might conflict with the night slot.
-        if timeslot - 1 in schedule.keys() and night_time_slots[timeslot - 1] == 1:
-            for group1 in winner[timeslot]:
-                for group2 in winner[timeslot - 1]:
-                    if group1 == group2:
-                        continue
-                    n2m += intersect[group1, group2]
+    evaluator = ScheduleEvaluator.from_params(params)
+    group2slot = {group: timeslot for timeslot in winner for group in winner[timeslot]}
+    issues = evaluator.evaluate(evaluator.slots_of(group2slot), pairs=True)
+    overlap = issues["overlap_pairs"]
+    b2b = issues["B2B_pairs"]
+    n2m = issues["PMtoAM_pairs"]
     comp_cost = penalties["overlap"] * overlap + penalties["B2B"] * b2b + penalties["PMtoAM"] * n2m
     pair_overlap = 0
     pair_b2b = 0
     pair_n2m = 0
     for pair in win_pairs:
-        print("pair:", pair)
         pair_overlap += pair.overlap
         pair_b2b += pair.b2b
         pair_n2m += pair.n2m
     print("----------------------------")
-    print(f"ACTUAL overlaps: {overlap/2}, b2b: {b2b/2}, n2m: {n2m/2}, comp_cost: {comp_cost/2}")
+    print(f"ACTUAL overlaps: {overlap}, b2b: {b2b}, n2m: {n2m}, comp_cost: {comp_cost}")
     print(f"PAIRS  overlaps: {pair_overlap}, b2b: {pair_b2b}, n2m: {pair_n2m}, win_cost: {winning_cost}")
-    print(f"overlap sources", over_lis)
     print("----------------------------")
-
-def grasp_placement(pairs, schedule, penalties, params, max_group_size, smoothing):
-    total_cost = 0
-    valid_slots = params["d"]
-    timeslots = [key for key in valid_slots if valid_slots[key] == 1]
-    #place largest group randomly
-    random_slot = random.choice(timeslots)
-    max_pair = max(pairs, key=lambda pair: pair.group_size)
-    for pair in pairs:
-        if pair.group == max_pair.group and pair.timeslot == random_slot:
-            max_pair = pair
-            break
-    schedule[max_pair.timeslot].append(max_pair.group)
-    pairs = remove_group(pairs, max_pair.group)
-    placed = [max_pair]
-    update_affected_pair_costs(pairs, max_pair, schedule, penalties, max_group_size, params)
-    while pairs:
-        next_pair = weighted_random_choice(pairs, smoothing=smoothing)
-        schedule[next_pair.timeslot].append(next_pair.group)
-        placed.append(next_pair)
-        total_cost += next_pair.get_cost()
-        pairs = remove_group(pairs, next_pair.group)
-        update_affected_pair_costs(pairs, next_pair, schedule, penalties, max_group_size, params)
-    return schedule, total_cost, placed
-
-def update_affected_pair_costs(pairs, placed_pair, schedule, penalties, max_group_size, params):
-    for pair in pairs:  
-        if abs(placed_pair.timeslot - pair.timeslot) <= 1:
-            update_pair_cost(pair, schedule, penalties, max_group_size, params)
-
-def update_all_pair_costs(pairs, schedule, penalties, max_group_size, params):
-    lis = []
-    count = 0
-    for pair in pairs:
-        count += 1
-        if update_pair_cost(pair, schedule, penalties, max_group_size, params):
-            lis.append(pair)
-    print("number of pairs that ran in all loop:", count)
-    for pair in lis:
-        print("changed by all updated:", pair)
-
-    return lis
-
-def update_pair_cost(pair, schedule, penalties, max_group_size, params):
-    night_time_slots = params["n"]
-    group_sizes = params["N_s"]
-    cost = 0
-    pair.overlap = 0
-    pair.b2b = 0
-    pair.n2m = 0
-    pair.last_update = "None"
-    #overlap
-    for group in schedule[pair.timeslot]:
-        cost += penalties["overlap"] * group_sizes[pair.group, group]
-        pair.overlap += group_sizes[pair.group, group]
-
-    # if there is an exam in front of it
-    if pair.timeslot + 1 in schedule.keys():
-        # If it is NOT a night exam, it might be in back-to-back
-        if night_time_slots[pair.timeslot] == 0:
-            for group in schedule[pair.timeslot + 1]:
-                cost += penalties["B2B"] * group_sizes[pair.group, group]
-                pair.b2b += group_sizes[pair.group, group]
-
-        # If it is a night exam, it might be in night-to-morning
-        else:
-            for group in schedule[pair.timeslot + 1]:
-                cost += penalties["PMtoAM"] * group_sizes[pair.group, group]
-                pair.n2m += group_sizes[pair.group, group]
-
-    # if there is an exam behind it
-    if pair.timeslot - 1 in schedule.keys():
-        # If it is NOT a night exam, it might be back-to-back
-        if night_time_slots[pair.timeslot - 1] == 0:
-            for group in schedule[pair.timeslot - 1]:
-                cost += penalties["B2B"] * group_sizes[pair.group, group]
-                pair.b2b += group_sizes[pair.group, group]
-        # If it is a night exam, it might be night-to-morning
-        else:
-            for group in schedule[pair.timeslot - 1]:
-                cost += penalties["PMtoAM"] * group_sizes[pair.group, group]
-                pair.n2m += group_sizes[pair.group, group]
-    
-        
-
-    
-    #too many students per block
-    total_students = 0
-    for group in schedule[pair.timeslot]:
-        total_students += group_sizes[group]
-    if total_students + pair.group_size >= max_group_size:
-        cost += float('inf')
-
-    pair.update_cost(cost)
-
-def weighted_random_choice(grasp_pairs, smoothing = 0):
-    zero_cost_pairs = [gp for gp in grasp_pairs if gp.cost == 0]
-    
-    # If there are pairs with zero cost, choose from them equally
-    if zero_cost_pairs:
-        return random.choice(zero_cost_pairs)
-    
-    non_zero_pairs = [gp for gp in grasp_pairs if gp.cost != 0 and gp.cost != float('inf')]
-    weights = [1 / (gp.cost + smoothing) for gp in non_zero_pairs]
-    
-    # Normalize weights to sum to 1
-    total_weight = sum(weights)
-    probabilities = [w / total_weight for w in weights]
-
-    # Choose a GraspPair object based on the calculated probabilities
-    chosen_pair = random.choices(non_zero_pairs, weights=probabilities, k=1)[0]
-    return chosen_pair   
-    
-
-def remove_group(pairs, group):
-    pairs = [gp for gp in pairs if gp.group != group]
-    return pairs
@@ -15,16 +15,46 @@ import re
 import multiprocessing
 import django
 import json
-
-from .mutliprocess_workers import SCIP_phase1_worker, SCIP_phase2_worker, multi_process_grasp_solver
+import time
+import numpy as np
+from collections import namedtuple
+from functools import partial
+
+from .mutliprocess_workers import SCIP_phase1_worker, SCIP_phase2_worker, multi_process_grasp_solver, init_grasp_pool_worker, \
+    init_optimizer_pool_worker, run_with_pool_optimizer
+from .lns import LNSOptimizer, missing_groups
+from .warm_start import FullScheduleHeuristic
+from .grasp import GraspPair, SharedGraspParams
+from .shared_params import SharedParams
+from .racing import BoundBoard
+from . import checkpoint, phase1_cache, model_memory, telemetry
+from .progress import close_connections_before_fork
+from . import kernels
+from .worker_pool import WorkerPool, core_budget
 
 from django.conf import settings
 
+# The fields of a phase 1 or phase 2 solve its memory estimate depends on, given to the WorkerPool next to the task, see estimate_task_memory.
+# phase is 1 or 2, threads is the number of threads of a phase 2 solve, and run_name names a phase 2 run in the memory report.
+SolveMemory = namedtuple("SolveMemory", ["phase", "num_courses", "threads", "run_name"])
+
 
 """
 Optimizes a given phase. Note that this class will be initialized before each phase.
+The solves of every phase run on one WorkerPool, started by the first phase. Call close once the optimization is done.
 """
 class ExamOptimizer:
+    # The only penalties of the phase 1 model and of GRASP.
+    PHASE_1_PENALTIES = ["overlap", "B2B", "PMtoAM"]
+    # The settings of GRASP that change the result of a phase 1 solve it warm starts.
+    PHASE_1_GRASP_SETTINGS = ["GRASP_LOCAL_SEARCH", "GRASP_ELITE_POOL_SIZE", "GRASP_PATH_RELINKING_INTERVAL", "PHASE_1_GRASP_SEEDS"]
+
+    # How reoptimize improves a schedule: a phase 2 solve starting from it, LNS around it, or a local search moving single groups.
+    REOPTIMIZE_PHASE2 = "phase2"
+    REOPTIMIZE_LNS = "lns"
+    REOPTIMIZE_LOCAL_SEARCH = "local_search"
+    REOPTIMIZE_MODES = [REOPTIMIZE_PHASE2, REOPTIMIZE_LNS, REOPTIMIZE_LOCAL_SEARCH]
+
     SURVEY_PREF = "survey"
     NIGHT_TO_MORNING_PREF = "fewer_night_morning"
     BACK_TO_BACK_PREF = "fewer_back_to_back"
@@ -47,9 +77,66 @@ class ExamOptimizer:
         self.group2slot = group2slot
         self.no_groupslot = no_group2slot
         
+        start = time.time()
         self.model_creator = create_model.ModelCreator(self.semester_entry)
         self.model_creator.retrieve_course_info()
         self.model_creator.retrieve_params()
+        # Stages of the optimization for its OptimizationRun, see telemetry. The pool tasks add theirs once they are done.
+        self.stages = [telemetry.stage("params", start)]
+        self.pool = None
+        self.shared_params = None
+        self.params_digest = None
+        self.phase2_size = None
+
+    def get_pool(self):
+        """
+        returns: the WorkerPool of this optimizer, started with a budget of OPTIMIZER_CORES cores and OPTIMIZER_MEMORY_BUDGET MB the first time
+        """
+        if self.pool is None:
+            # Compiled before the processes are forked, so that they do not each compile the GRASP kernels.
+            kernels.warm_up()
+            self.pool = WorkerPool(core_budget(), init_optimizer_pool_worker, (self, self.get_shared_params()),
+                                   memory_budget=settings.OPTIMIZER_MEMORY_BUDGET, estimate_memory=self.estimate_task_memory)
+        return self.pool
+
+    def get_shared_params(self):
+        """
+        returns: the SharedParams of the params of the model_creator, created the first time
+        """
+        if self.shared_params is None:
+            start = time.time()
+            self.shared_params = SharedParams(self.model_creator.params)
+            print("shared params: {:.1f} MB in {:.2f} s".format(self.shared_params.size() / 2**20, time.time() - start))
+        return self.shared_params
+
+    def estimate_task_memory(self, memory):
+        """
+        Estimates the memory of a task of the WorkerPool from the size of its SCIP model, see model_memory.
+        param memory: SolveMemory given next to the task
+        returns: (estimated MB, description of the task)
+        """
+        if memory.phase == 1:
+            num_constrained = len(set(self.group2slot) | set(self.no_groupslot))
+            size = model_memory.phase1_model_size(self.model_creator.params, memory.num_courses, num_constrained)
+            return model_memory.estimate_mb(*size), "phase 1 with {} courses".format(memory.num_courses)
+        threads = max(memory.threads, 1)
+        run_name = memory.run_name or "Fixed{}".format(memory.num_courses)
+        if self.phase2_size is None:
+            # Every phase 2 run has the same model, apart from the groups fixed by phase 1.
+            self.phase2_size = model_memory.phase2_model_size(self.model_creator.params, settings.PHASE_2_LAZY_WINDOWS and threads <= 1)
+        # The concurrent solver copies the model for every thread.
+        return model_memory.estimate_mb(*self.phase2_size) * threads, "phase 2 " + run_name
+
+    def close(self):
+        """
+        Stops the processes of the WorkerPool, if it was started, and frees the shared memory of its params.
+        """
+        if self.pool is not None:
+            self.pool.shutdown()
+            self.pool = None
+        if self.shared_params is not None:
+            self.shared_params.unlink()
+            self.shared_params = None
         
     def get_course_info(self):
         return self.model_creator.course_info
@@ -61,76 +148,298 @@ class ExamOptimizer:
                 print(sol_schedule[i][j], end=" ")
             print()
 
-    def SCIP_optimize_phase1(self, num_exam_slots, num_phase1_courses, penalties, seconds_limit, warm_start_grasp):
+    def SCIP_optimize_phase1(self, num_exam_slots, num_phase1_courses, penalties, seconds_limit, warm_start_grasp, schedule_pk=None):
         """
+        The phase 1 results are cached, see phase1_cache. A cached result is reused instead of solving phase 1 again.
         param num_exam_slots: number of possible exam slots this semester has
         param num_phase1_courses: number of courses that phase1 places into the schedule
         param preference_profile: dict of the form {string of problem: float penalty associated with the problem}
         param seconds limit: determines how long phase1 is supposed to run
+        param schedule_pk: database id of the schedule being optimized. If given, it records whether a cached phase 1 result was reused
         """
         os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'ExamScheduling.settings')
         django.setup()
-        jobs = []
-        manager = multiprocessing.Manager()
-        phase1_results = manager.dict()
+        tasks = []
+        phase1_keys = []
+        phase1_results = dict()
         for i in range(len(num_phase1_courses)):
-                print("creating process for ", num_phase1_courses[i], " courses")
-                p = multiprocessing.Process(target=SCIP_phase1_worker, args=(self, num_phase1_courses[i], num_exam_slots, {}, seconds_limit, phase1_results, penalties, warm_start_grasp))
-                jobs.append(p)
-                p.start()
-        for job in jobs:
-            job.join()
+                phase1_key = self.phase1_key(penalties, num_phase1_courses[i], warm_start_grasp, seconds_limit)
+                cached = phase1_cache.lookup(self, phase1_key)
+                if cached is not None:
+                    phase1_cache.mark_cached(schedule_pk)
+                    phase1_results[cached[0]] = cached[1]
+                    self.stages.append({"stage": "phase1", "num_courses": num_phase1_courses[i], "grasp": warm_start_grasp, "cached": True})
+                    continue
+                print("queueing phase 1 for ", num_phase1_courses[i], " courses")
+                tasks.append((1, run_with_pool_optimizer, (SCIP_phase1_worker, num_phase1_courses[i], num_exam_slots, {}, seconds_limit, penalties, warm_start_grasp),
+                              SolveMemory(1, num_phase1_courses[i], 1, None)))
+                phase1_keys.append(phase1_key)
+        if tasks:
+            results = self.get_pool().run(tasks)
+            self.stages.extend(self.pool.pop_stats())
+            for phase1_key, result in zip(phase1_keys, results):
+                phase1_cache.store(self, phase1_key, result)
+            phase1_results.update(dict(results))
         return phase1_results
     
-    def SCIP_optimize_phase2(self, preference_profile, group2slot_dict, num_exam_slots, results_dir):
+    def SCIP_optimize_phase2(self, preference_profile, group2slot_dict, num_exam_slots, results_dir, schedule_pk=None, checkpoints=None):
         """
         Optimizes the phase 2 with a given Optimization type preference profile.
         param preference_profile: dict of the form {string of problem: float penalty associated with the problem}
         pram group2slot_dict: dict of the form {phase1 cost: phase1 output}, used to create constraints on phase2 model with what was produced in phase1
         param num_exam_slots: number of exam slots this semester has
+        param schedule_pk: database id of the schedule being optimized. If given, the progress of every process is recorded in the database,
+                           and every run saves a Phase2Checkpoint unless PHASE_2_CHECKPOINT_INTERVAL is 0
+        param checkpoints: dict of the form {phase1 cost: Phase2Checkpoint} to resume the runs from, as given by checkpoint.load
         """
-        manager = multiprocessing.Manager()
-        results = manager.dict()
-        jobs = []
+        tasks = []
         num_course_list = []
 
+        run_checkpoints = {key: None for key in group2slot_dict}
+        if schedule_pk is not None and (settings.PHASE_2_CHECKPOINT_INTERVAL > 0 or checkpoints):
+            params_hash = checkpoint.run_hash(self.params_hash(), preference_profile)
+            for key in group2slot_dict:
+                run_checkpoints[key] = {"params_hash": params_hash, "phase1_cost": key[0]}
+                saved = checkpoints.get(key) if checkpoints else None
+                if saved is None:
+                    continue
+                if saved.params_hash != params_hash:
+                    raise ValueError("The semester data or the penalties changed since the checkpoint of {}, it can not be resumed.".format(saved.run_name))
+                run_checkpoints[key].update(group2slot=saved.group2slot, objective=saved.objective, elapsed_time=saved.elapsed_time, finished=saved.finished)
+
+        threads = settings.PHASE_2_CONCURRENT_THREADS
+        if threads > 1:
+            # A single multi-threaded solve, starting from the best phase 1 result, instead of one process per phase 1 result.
+            best_key = min(group2slot_dict.keys(), key=lambda key: key[0])
+            group2slot_dict = {best_key: group2slot_dict[best_key]}
+
+        # The runs share their bounds, so that a run that can not beat the incumbent of another one is stopped.
+        board = BoundBoard(len(group2slot_dict)) if settings.PHASE_2_RACING and len(group2slot_dict) > 1 else None
+
+        for key in group2slot_dict:
+            if run_checkpoints[key] is not None:
+                # Created before any run starts, so that a resume finds the phase 1 result of every run, see checkpoint.
+                checkpoint.create(schedule_pk, "Fixed{}".format(key[1]), key[1], key[0], group2slot_dict[key], run_checkpoints[key]["params_hash"])
+
         for key in group2slot_dict:
                 print("phase 2 optimization for process id:", key)
                 num_courses = key[1]
                 num_course_list.append(num_courses)
-                p = multiprocessing.Process(target=SCIP_phase2_worker, args=(self, preference_profile, group2slot_dict[key], num_exam_slots, results, num_courses, results_dir))
-                jobs.append(p)
-                p.start()
-        
-        for job in jobs:
-            job.join()
-        
-        solutions = {}
-        inconveniences = {}
+                tasks.append((max(threads, 1), run_with_pool_optimizer, (SCIP_phase2_worker, preference_profile, group2slot_dict[key], num_exam_slots, num_courses, results_dir, schedule_pk, threads, board, len(tasks), run_checkpoints[key]),
+                               SolveMemory(2, num_courses, threads, None)))
+        try:
+            results = self.get_pool().run(tasks)
+            self.stages.extend(self.pool.pop_stats())
+        finally:
+            if board is not None:
+                board.unlink()
 
-        minimum_ObjVal = 100000000000000000
-        chosen_num_course = -1
+        print(f"len(results) = {len(results)}. Objective values = {[result[0] for result in results]}")
+        solution, minimum_ObjVal, run_name = self.best_phase2_result(results_dir, [(f"Fixed{num_course}", ObjVal) for num_course, (ObjVal, group2slot) in zip(num_course_list, results)])
+        return solution, minimum_ObjVal
 
-        for num_course in num_course_list:
-            with open(os.path.join(results_dir, f"Fixed{num_course}_best_solution.json"), "r") as f:
-                solutions[num_course] = json.load(f)
-            
-            with open(os.path.join(results_dir, f"Fixed{num_course}_analysis.json"), "r") as f:
-                inconveniences[num_course] = json.load(f)
+    def best_phase2_result(self, results_dir, runs):
+        """
+        param results_dir: directory the phase 2 runs saved their files to
+        param runs: list of (run name, objective value) of the phase 2 runs. The value is -1 if the run is infeasible, or was stopped before finding a solution
+        returns: (group2slot, objective value, run name) of the best run, read from its files, or (None, None, None) if no run found a solution
+        """
+        solution = None
+        minimum_ObjVal = None
+        chosen_run = None
 
-            if inconveniences[num_course]["ObjVal"] < minimum_ObjVal:
-                minimum_ObjVal = inconveniences[num_course]["ObjVal"]
-                chosen_num_course = num_course
+        for run_name, ObjVal in runs:
+            if ObjVal == -1:
+                # Infeasible, or stopped by racing before it found a solution.
+                continue
+            with open(os.path.join(results_dir, f"{run_name}_analysis.json"), "r") as f:
+                inconveniences = json.load(f)
 
-        
-        print(f"Solution with fixing {chosen_num_course} courses for Phase 1 is chosen. ObjVal = {minimum_ObjVal}")
-        print(f"len(results) = {len(results)}. Keys = {results.keys()}")
-        
-        final_inconveniences = inconveniences[chosen_num_course]
-        final_inconveniences["num_fixed_courses"] = chosen_num_course
+            if minimum_ObjVal is None or inconveniences["ObjVal"] < minimum_ObjVal:
+                with open(os.path.join(results_dir, f"{run_name}_best_solution.json"), "r") as f:
+                    solution = json.load(f)
+                minimum_ObjVal = inconveniences["ObjVal"]
+                chosen_run = run_name
+
+        print(f"Solution of {chosen_run} is chosen. ObjVal = {minimum_ObjVal}")
+        return solution, minimum_ObjVal, chosen_run
 
-        return solutions[chosen_num_course], minimum_ObjVal
+    def params_hash(self):
+        """
+        returns: hex sha256 of the params of the semester, computed from their shared memory the first time
+        """
+        if self.params_digest is None:
+            self.params_digest = checkpoint.params_hash(self.get_shared_params())
+        return self.params_digest
+
+    def phase1_penalties(self, penalties):
+        """
+        returns: dict of the penalties of phase 1 (and GRASP) in penalties. The other penalties only matter in phase 2
+        """
+        return {key: penalties[key] for key in self.PHASE_1_PENALTIES}
+
+    def phase1_settings(self, warm_start_grasp):
+        """
+        returns: dict of the settings the result of a phase 1 solve depends on. The GRASP settings only matter when GRASP warm starts it
+        """
+        phase1_settings = {"MAX_STUDENTS_PER_SLOT": settings.MAX_STUDENTS_PER_SLOT}
+        if warm_start_grasp:
+            for name in self.PHASE_1_GRASP_SETTINGS:
+                phase1_settings[name] = getattr(settings, name)
+        return phase1_settings
+
+    def phase1_key(self, penalties, num_courses, warm_start_grasp, seconds_limit):
+        """
+        param seconds_limit: time limit of the phase 1 solve, also the time GRASP runs when it warm starts it
+        returns: tuple identifying a phase 1 solve of this optimizer: its penalties, the constraints, the number of courses, whether GRASP warm starts it,
+                 its time limit, and the settings of phase 1 and GRASP
+        """
+        return (json.dumps(self.phase1_penalties(penalties), sort_keys=True), json.dumps(self.group2slot, sort_keys=True),
+                json.dumps(self.no_groupslot, sort_keys=True), num_courses, warm_start_grasp, seconds_limit,
+                json.dumps(self.phase1_settings(warm_start_grasp), sort_keys=True))
+
+    def SCIP_optimize_portfolio(self, schedules, num_exam_slots, num_phase1_courses, seconds_limit):
+        """
+        Optimizes several schedules with the constraints of this optimizer, e.g. the schedules of a portfolio, as one graph of tasks on the WorkerPool.
+        Every schedule solves phase 1 with and without the GRASP warm start for every number of courses, then phase 2 from each phase 1 result.
+        Phase 1 only depends on the phase 1 penalties, so a phase 1 solve shared by several schedules is solved once, or not at all if it is cached.
+        A phase 2 run starts as soon as its phase 1 solve is done and a core is free, and the phase 2 runs of a schedule race each other.
+        Each phase 2 run is single-threaded, whatever PHASE_2_CONCURRENT_THREADS is.
+        param schedules: list of (penalties, results_dir, schedule_pk) of the schedules
+        param num_exam_slots: number of exam slots this semester has
+        param num_phase1_courses: list of the numbers of courses of phase 1
+        param seconds_limit: time limit of phase 1
+        returns: list of (group2slot, cost) of the best phase 2 run of each schedule, or None for a schedule without any
+        """
+        tasks = dict()
+        boards = []
+        phase2_runs = []
+        cached = dict()
+        phase1_keys = []
+        try:
+            for index, (penalties, results_dir, schedule_pk) in enumerate(schedules):
+                # The runs of a schedule share their bounds, so that a run that can not beat the incumbent of another one is stopped.
+                board = BoundBoard(2 * len(num_phase1_courses)) if settings.PHASE_2_RACING else None
+                boards.append(board)
+                runs = []
+                for warm_start_grasp in [True, False]:
+                    for num_courses in num_phase1_courses:
+                        phase1_key = self.phase1_key(penalties, num_courses, warm_start_grasp, seconds_limit)
+                        run_name = f"Fixed{num_courses}" if warm_start_grasp else f"Fixed{num_courses}NoGRASP"
+                        phase2_args = partial(phase2_task_args, phase1_key, penalties, num_exam_slots, results_dir, schedule_pk, board, len(runs), run_name)
+                        phase2_memory = SolveMemory(2, num_courses, 1, run_name)
+                        runs.append(run_name)
+                        if phase1_key not in cached:
+                            cached[phase1_key] = phase1_cache.lookup(self, phase1_key)
+                            if cached[phase1_key] is not None:
+                                self.stages.append({"stage": "phase1", "num_courses": num_courses, "grasp": warm_start_grasp, "cached": True})
+                        if cached[phase1_key] is not None:
+                            phase1_cache.mark_cached(schedule_pk)
+                            tasks[(index, run_name)] = (1, run_with_pool_optimizer, phase2_args({phase1_key: cached[phase1_key]}), [], phase2_memory)
+                            continue
+                        if phase1_key not in tasks:
+                            print("queueing phase 1 for ", num_courses, " courses", "with GRASP" if warm_start_grasp else "without GRASP")
+                            tasks[phase1_key] = (1, run_with_pool_optimizer, (SCIP_phase1_worker, num_courses, num_exam_slots, {}, seconds_limit, self.phase1_penalties(penalties), warm_start_grasp), [],
+                                                 SolveMemory(1, num_courses, 1, None))
+                            phase1_keys.append(phase1_key)
+                        tasks[(index, run_name)] = (1, run_with_pool_optimizer, phase2_args, [phase1_key], phase2_memory)
+                phase2_runs.append(runs)
+            print("portfolio: {} phase 1 solves and {} phase 2 runs for {} schedules".format(len(phase1_keys), sum(len(runs) for runs in phase2_runs), len(schedules)))
+            results = self.get_pool().run_graph(tasks)
+            self.stages.extend(self.pool.pop_stats())
+            for phase1_key in phase1_keys:
+                phase1_cache.store(self, phase1_key, results[phase1_key])
+        finally:
+            for board in boards:
+                if board is not None:
+                    board.unlink()
+
+        best = []
+        for index, (penalties, results_dir, schedule_pk) in enumerate(schedules):
+            runs = [(run_name, results[(index, run_name)][0]) for run_name in phase2_runs[index] if results[(index, run_name)] is not None]
+            solution, cost, run_name = self.best_phase2_result(results_dir, runs)
+            best.append((solution, cost) if solution is not None else None)
+        return best
     
+    def LNS_optimize_phase2(self, preference_profile, group2slot, results_dir, seconds, schedule_pk=None, cost=None):
+        """
+        Improves a complete schedule with Large Neighborhood Search around the phase 2 model.
+        Every improvement is written to "LNS_best_solution.json" and "LNS_analysis.json" in results_dir as soon as it is found.
+        param preference_profile: dict of the form {string of problem: float penalty associated with the problem}
+        param group2slot: dict of the form {course_group: timeslot} containing every course group. The starting schedule
+        param results_dir: directory to save the output files to
+        param seconds: time limit for the whole search
+        param schedule_pk: database id of the schedule being optimized. If given, every improvement is recorded in the database
+        param cost: objective value of group2slot
+        returns: the best schedule in the form {course_group: timeslot} and its objective value.
+                 group2slot and cost are returned unchanged if group2slot misses a course group, e.g. when phase 2 found no schedule
+        """
+        missing = missing_groups(self.model_creator.params["G"], group2slot)
+        if missing:
+            print("LNS is skipped: the schedule to start from misses {} course groups".format(len(missing)))
+            return group2slot, cost
+        start = time.time()
+        self.model_creator.create_phase2_SCIP_model(preference_profile, 0, results_dir, name="LNS", schedule_pk=schedule_pk)
+        lns = LNSOptimizer(self.model_creator.phase2, group2slot, self.group2slot, self.no_groupslot,
+                           neighborhood_size=settings.LNS_NEIGHBORHOOD_SIZE,
+                           subproblem_time_limit=settings.LNS_SUBPROBLEM_TIME_LIMIT)
+        group2slot, cost = lns.run(seconds)
+        self.model_creator.phase2.eventhdlr.wait_for_writes()
+        self.stages.append(telemetry.stage("lns", start, schedule_pk=schedule_pk, objective=cost))
+        return group2slot, cost
+
+    def reoptimize(self, preference_profile, start_group2slot, num_exam_slots, results_dir, mode, seconds, schedule_pk=None):
+        """
+        Improves an existing schedule, e.g. a saved schedule or version, instead of optimizing from scratch. Phase 1 is skipped.
+        The groups fixed by the constraints of this optimizer are moved to their timeslot first, and the groups the semester no longer has are left out.
+        param preference_profile: dict of the form {string of problem: float penalty associated with the problem}
+        param start_group2slot: dict of the form {course_group: timeslot} of the schedule to start from. It may leave out some groups
+        param num_exam_slots: number of exam slots this semester has
+        param results_dir: directory to save the output files to
+        param mode: one of REOPTIMIZE_MODES. REOPTIMIZE_PHASE2 gives the schedule to the phase 2 model as its first solution, which SCIP completes
+                    if groups are missing. The other modes first complete the schedule with FullScheduleHeuristic, keeping the given groups
+        param seconds: time limit
+        param schedule_pk: database id of the schedule being optimized. If given, the progress of the phase 2 solve or LNS is recorded in the database
+        returns: the schedule in the form {course_group: timeslot} and its objective value, or (None, None) if no schedule was found
+        """
+        if mode not in self.REOPTIMIZE_MODES:
+            raise ValueError("Unknown re-optimization mode {}.".format(mode))
+        groups = set(self.model_creator.params["G"])
+        start_group2slot = {g: int(t) for g, t in start_group2slot.items() if g in groups}
+        start_group2slot.update({g: int(t) for g, t in self.group2slot.items()})
+
+        if mode == self.REOPTIMIZE_PHASE2:
+            task = (1, run_with_pool_optimizer, (SCIP_phase2_worker, preference_profile, self.group2slot, num_exam_slots, 0, results_dir, schedule_pk,
+                                                 1, None, 0, None, "Reoptimize", start_group2slot, seconds), SolveMemory(2, 0, 1, "Reoptimize"))
+            (ObjVal, group2slot), = self.get_pool().run([task])
+            self.stages.extend(self.pool.pop_stats())
+            solution, cost, run_name = self.best_phase2_result(results_dir, [("Reoptimize", ObjVal)])
+            return solution, cost
+
+        start = time.time()
+        if len(start_group2slot) < len(groups):
+            print("completing the schedule: {} of {} groups are placed".format(len(start_group2slot), len(groups)))
+            heuristic = FullScheduleHeuristic(self.model_creator.params, preference_profile, start_group2slot, self.no_groupslot)
+            start_group2slot, cost = heuristic.run(min(settings.PHASE_2_WARM_START_TIME_LIMIT, seconds / 2))
+            self.stages.append(telemetry.stage("complete_schedule", start, schedule_pk=schedule_pk, objective=cost if start_group2slot is not None else None))
+            if start_group2slot is None:
+                return None, None
+        remaining = max(seconds - (time.time() - start), 1)
+
+        if mode == self.REOPTIMIZE_LNS:
+            return self.LNS_optimize_phase2(preference_profile, start_group2slot, results_dir, remaining, schedule_pk)
+
+        start = time.time()
+        heuristic = FullScheduleHeuristic(self.model_creator.params, preference_profile, self.group2slot, self.no_groupslot)
+        slot_of = np.array([start_group2slot[g] for g in heuristic.groups], dtype=int)
+        print("local search starting objective:", heuristic.evaluate(slot_of))
+        cost = heuristic.improve(slot_of, remaining)
+        print("local search objective:", cost)
+        self.stages.append(telemetry.stage("local_search", start, schedule_pk=schedule_pk, objective=cost))
+        if cost >= FullScheduleHeuristic.INFEASIBLE:
+            return None, None
+        return {g: int(slot_of[i]) for i, g in enumerate(heuristic.groups)}, cost
+
     def get_SCIP_group2slot(self, model, num_exam_slots):
         """ Extracts the group to slot mapping from the SCIP model.
         param model: the SCIP model that was solved.
@@ -157,7 +466,9 @@ class ExamOptimizer:
     def grasp_optimize(self, num_courses, penalties, seconds):
         """
         uses a Greedy Randomized Adaptive Search algo to optimize phase1. Calls the grasp algorithm as many times as it can and stores the best one
-        param num_courses: number of courses to place during optimization
+        Runs on a process pool of GRASP_PROCESSES processes, split between the numbers of courses. The group intersections are
+        shared with the processes through shared memory, and the processes placing the same courses share their best cost.
+        param num_courses: list of numbers of courses to place during optimization
         param preference_profile: dict of the form {string of problem: float penalty associated with the problem}
         param seconds: timelimit on how long GRASP is allowed to run
         """
@@ -166,28 +477,32 @@ class ExamOptimizer:
         for g in self.model_creator.params["G"]:
             max_size = group_sizes[g] if group_sizes[g] > max_size else max_size
 
-        jobs = []
-        manager = multiprocessing.Manager()
-        results = manager.dict()
-        small = min(num_courses)
-        # for _ in range(0, 2):
-        for smooth in [0]:
-                for i in range(0, 4):
-                        large_courses = self.choose_large_classes(num_courses[i])
-                        pairs, schedule = self.grasp_pair_creation(large_courses)
-                        if pairs == -1:
-                            print("stopping grasp due to infeasibility")
-                            return {}, -1
-                        p = multiprocessing.Process(target=multi_process_grasp_solver, args=(i, pairs, schedule, penalties, self.model_creator.params, max_size, seconds, smooth, results, num_courses[i]))
-                        jobs.append(p)
-                        p.start()
-
-                for job in jobs:
-                    job.join()
-                cost = min(results)
-                print("best grasp cost found:", cost)
-        schedule = results[cost]
-        
+        num_processes = settings.GRASP_PROCESSES or len(os.sched_getaffinity(0))
+        processes_per_size = max(1, num_processes // len(num_courses))
+        best_costs = multiprocessing.Array("d", [float('inf')] * len(num_courses))
+        shared_params = SharedGraspParams(self.model_creator.params)
+        try:
+            tasks = []
+            smooth = 0
+            for i in range(len(num_courses)):
+                large_courses = self.choose_large_classes(num_courses[i])
+                pairs, schedule = self.grasp_pair_creation(large_courses)
+                if pairs == -1:
+                    print("stopping grasp due to infeasibility")
+                    return {}, -1
+                for _ in range(processes_per_size):
+                    tasks.append((len(tasks), pairs, schedule, penalties, shared_params, max_size, seconds, smooth, num_courses[i], i))
+
+            kernels.warm_up()
+            close_connections_before_fork()
+            with multiprocessing.Pool(min(num_processes, len(tasks)), initializer=init_grasp_pool_worker, initargs=(best_costs,)) as pool:
+                results = pool.starmap(multi_process_grasp_solver, tasks)
+        finally:
+            shared_params.unlink()
+
+        cost, num, schedule = min(results, key=lambda result: result[:2])
+        print("best grasp cost found:", (cost, num))
+
         #need to convert schedule to match the format phase2 expects
         phase2_format = self.convert_grasp_to_phase2(schedule)
         return phase2_format
@@ -254,25 +569,15 @@ class ExamOptimizer:
 
         return new_G
 
-class GraspPair:
-    def __init__(self, g, g_size, t):
-        self.group = g
-        self.timeslot = t
-        self.cost = 0
-        self.group_size = g_size
-        self.overlap = 0
-        self.b2b = 0
-        self.n2m = 0
-        self.last_update = "None"
-
-    def update_cost(self, new_cost):
-        self.cost = new_cost
-
-    def get_cost(self):
-        return self.cost
-
-    def __str__(self):
-        return "g: {}, t: {}, cost: {}, overlap {}, b2b {}, n2m {} last update: {}".format(self.group, self.timeslot, self.cost, self.overlap, self.b2b, self.n2m, self.last_update)
-    
-
 
+def phase2_task_args(phase1_key, penalties, num_exam_slots, results_dir, schedule_pk, board, run, run_name, results):
+    """
+    Args of a phase 2 task of the graph of SCIP_optimize_portfolio, once its phase 1 solve is done.
+    The run has no checkpoint, since a portfolio job is not resumed after the job runner stopped, see jobs.RESUMABLE_KINDS.
+    param results: dict of the form {phase1 key: result of the phase 1 solve}
+    returns: the args of run_with_pool_optimizer, or None if phase 1 is infeasible
+    """
+    phase1_result, group2slot = results[phase1_key]
+    if phase1_result == -1:
+        return None
+    return (SCIP_phase2_worker, penalties, group2slot, num_exam_slots, phase1_result[1], results_dir, schedule_pk, 1, board, run, None, run_name)
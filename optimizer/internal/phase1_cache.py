@@ -0,0 +1,57 @@
+"""
+Exam Scheduler Web-UI
+Tsugunobu Miyake, Luke Snyder. 2025
+
+Cache of the phase 1 results in the database, as Phase1Result. Planners often optimize a semester again after changing only
+penalties of phase 2, e.g. 3 in 24 or the faculty penalties, and phase 1 would then be solved again the same way.
+A result is reused when the semester params, the constraints, the phase 1 penalties, the number of courses, the GRASP warm start,
+the time limit and the settings of phase 1 and GRASP are the same.
+"""
+
+import hashlib
+
+from django.conf import settings
+
+from ..models import Phase1Result, Schedule
+
+
+def cache_key(optimizer, phase1_key):
+    """
+    param optimizer: ExamOptimizer of the semester
+    param phase1_key: tuple given by optimizer.phase1_key
+    returns: hex sha256 identifying the phase 1 solve
+    """
+    return hashlib.sha256((optimizer.params_hash() + repr(phase1_key)).encode()).hexdigest()
+
+def lookup(optimizer, phase1_key):
+    """
+    returns: ((phase1 cost, num_courses), group2slot) of the cached result, like the result of SCIP_phase1_worker, or None
+    """
+    if not settings.PHASE_1_CACHE:
+        return None
+    result = Phase1Result.objects.filter(key=cache_key(optimizer, phase1_key)).first()
+    if result is None:
+        return None
+    print("reusing the cached phase 1 result with {} courses: {}".format(result.num_courses, result.cost))
+    return (result.cost, result.num_courses), result.group2slot
+
+def store(optimizer, phase1_key, result):
+    """
+    Caches a result of SCIP_phase1_worker. Infeasible results are not cached.
+    """
+    if not settings.PHASE_1_CACHE or result[0] == -1:
+        return
+    (cost, num_courses), group2slot = result
+    Phase1Result.objects.update_or_create(key=cache_key(optimizer, phase1_key), defaults={
+        "semester": optimizer.semester_entry,
+        "num_courses": num_courses,
+        "cost": cost,
+        "group2slot": group2slot,
+    })
+
+def mark_cached(schedule_pk):
+    """
+    Records in the schedule that a cached phase 1 result was reused for it.
+    """
+    if schedule_pk is not None:
+        Schedule.objects.filter(pk=schedule_pk).update(phase1_cached=True)
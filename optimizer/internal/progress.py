@@ -0,0 +1,98 @@
+"""
+Exam Scheduler Web-UI
+Tsugunobu Miyake, Luke Snyder. 2025
+
+Records the progress of running optimizations in the database, so that it can be shown while the optimization is running.
+"""
+
+import queue
+import threading
+import traceback
+
+from django.db import connections
+
+from ..models import OptimizationProgress
+
+
+def compute_gap(primal_bound, dual_bound):
+    """
+    Computes the gap the same way SCIP does: |primal - dual| / min(|primal|, |dual|).
+    returns: the gap, or None if it is infinite
+    """
+    if primal_bound is None or dual_bound is None:
+        return None
+    if primal_bound == dual_bound:
+        return 0.0
+    if primal_bound * dual_bound <= 0:
+        return None
+    return abs(primal_bound - dual_bound) / min(abs(primal_bound), abs(dual_bound))
+
+def record_progress(schedule_pk, run_name, elapsed_time, primal_bound, dual_bound, nodes, inconveniences):
+    """
+    Saves the state of a SCIP solve when a better solution was found. Called by the IncumbentWriter of the phase 2 callback.
+    param schedule_pk: database id of the schedule being optimized
+    param run_name: name of the run within the optimization, e.g. "Fixed18" or "LNS"
+    param elapsed_time: seconds since the run started
+    param primal_bound: objective value of the new solution
+    param dual_bound: dual bound of the solve, or None if it is infinite
+    param nodes: number of branch and bound nodes processed so far
+    param inconveniences: dict of the form {inconvenience type: count} for the new solution
+    """
+    OptimizationProgress.objects.create(
+        schedule_id=schedule_pk,
+        run_name=run_name,
+        elapsed_time=elapsed_time,
+        primal_bound=primal_bound,
+        dual_bound=dual_bound,
+        gap=compute_gap(primal_bound, dual_bound),
+        nodes=nodes,
+        inconveniences=inconveniences,
+    )
+    # This runs in the writer thread, which has its own connection. Do not keep it open between incumbents.
+    connections.close_all()
+
+def get_progress(schedule_pk, since=0):
+    """
+    param schedule_pk: database id of the schedule
+    param since: only entries with a larger id are returned, so that a page polling for updates only receives new entries
+    returns: list of dicts, one per progress entry, ordered from oldest to newest
+    """
+    entries = OptimizationProgress.objects.filter(schedule_id=schedule_pk, pk__gt=since).order_by("pk")
+    return list(entries.values("id", "run_name", "elapsed_time", "primal_bound", "dual_bound", "gap", "nodes", "inconveniences"))
+
+def close_connections_before_fork():
+    """
+    A process created by multiprocessing inherits the open database connections of its parent, and sharing one connection
+    between processes corrupts it. Closing them before starting the processes makes every process open its own connection.
+    """
+    connections.close_all()
+
+class IncumbentWriter(threading.Thread):
+    """
+    Background thread that runs the file and database writes of the SCIP callbacks,
+    so that the solver does not wait for them every time it finds a better solution.
+    Writes are done one at a time in the order they are submitted.
+    """
+    def __init__(self):
+        super().__init__(daemon=True)
+        self.jobs = queue.Queue()
+        self.start()
+
+    def submit(self, function, *args):
+        self.jobs.put((function, args))
+
+    def flush(self):
+        """
+        Blocks until every submitted write is done.
+        """
+        self.jobs.join()
+
+    def run(self):
+        while True:
+            function, args = self.jobs.get()
+            try:
+                function(*args)
+            except Exception:
+                print(traceback.format_exc())
+            finally:
+                self.jobs.task_done()
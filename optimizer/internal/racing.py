@@ -0,0 +1,89 @@
+"""
+Exam Scheduler Web-UI
+Tsugunobu Miyake, Luke Snyder. 2025
+
+Races the phase 2 runs of an optimization, one per phase 1 result, against each other.
+Every run posts its primal and dual bounds to a BoundBoard in shared memory. All runs optimize the same objective over the full schedule,
+so a run whose dual bound is worse than the incumbent of another run, by PHASE_2_RACING_MARGIN, can not find a better schedule and is stopped.
+Its core then goes to the runs still waiting in the queue of the WorkerPool.
+"""
+
+import numpy as np
+from pyscipopt import Eventhdlr, SCIP_EVENTTYPE
+
+from .shared_params import SharedArrays
+
+
+class BoundBoard(SharedArrays):
+    """
+    Primal and dual bounds of every phase 2 run, in a shared memory block. Each run only writes its own row, so no lock is needed.
+    """
+    def __init__(self, num_runs):
+        """
+        param num_runs: number of phase 2 runs
+        """
+        super().__init__()
+        bounds = self.create("bounds", (num_runs, 2), np.float64)
+        bounds[:, 0] = np.inf
+        bounds[:, 1] = -np.inf
+
+    def post(self, run, primal, dual):
+        """
+        Records the bounds of a run.
+        param run: index of the run
+        """
+        self.bounds[run, 0] = primal
+        self.bounds[run, 1] = dual
+
+    def best_other_primal(self, run):
+        """
+        returns: the best incumbent value of the runs other than run, inf if none has one
+        """
+        others = np.delete(self.bounds[:, 0], run)
+        return others.min() if len(others) > 0 else np.inf
+
+
+class RacingEventhdlr(Eventhdlr):
+    """
+    Posts the bounds of a phase 2 run to the BoundBoard whenever they can change, and stops the run
+    once its dual bound is worse than the incumbent of another run by the margin.
+    """
+    EVENTS = SCIP_EVENTTYPE.BESTSOLFOUND | SCIP_EVENTTYPE.DUALBOUNDIMPROVED | SCIP_EVENTTYPE.NODESOLVED
+
+    def __init__(self, board, run, margin):
+        """
+        param board: BoundBoard of the runs
+        param run: index of this run in board
+        param margin: relative margin. The run stops when its dual bound >= the incumbent of another run + margin * |incumbent|
+        """
+        self.board = board
+        self.run = run
+        self.margin = margin
+        self.stopped_by = None
+
+    def eventinit(self):
+        self.model.catchEvent(self.EVENTS, self)
+
+    def eventexit(self):
+        self.model.dropEvent(self.EVENTS, self)
+
+    def close(self):
+        """
+        Detaches the board once the run is done. The model may still run this handler afterwards, e.g. while it is freed, so it ignores the events from then on.
+        """
+        self.board.detach()
+        self.board = None
+
+    def eventexec(self, event):
+        if self.board is None:
+            return
+        primal = self.model.getPrimalbound()
+        dual = self.model.getDualbound()
+        self.board.post(self.run, primal if not self.model.isInfinity(primal) else np.inf, dual if not self.model.isInfinity(-dual) else -np.inf)
+        if self.stopped_by is not None:
+            return
+        best = self.board.best_other_primal(self.run)
+        if np.isfinite(best) and dual >= best + self.margin * abs(best):
+            self.stopped_by = best
+            print("phase 2 run {} stopped: its dual bound {} can not beat the incumbent {} of another run".format(self.run, dual, best))
+            self.model.interruptSolve()
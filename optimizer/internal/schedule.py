@@ -15,7 +15,7 @@ from ..models import (
 )
 
 # Create a new Schedule instance, only specifying 'name' and 'semester' fields at this point
-def create(name, semester_entry, course_info, penalties = {}, group_constraints={}, predefined_constraints={}):
+def create(name, semester_entry, course_info, penalties = {}, group_constraints={}, predefined_constraints={}, hard_constraints=None):
     """_summary_
 
     Args:
@@ -25,6 +25,7 @@ def create(name, semester_entry, course_info, penalties = {}, group_constraints=
         penalties (dict, optional): _description_. Defaults to {}.
         group_constraints (dict, optional): _description_. Defaults to {}.
         predefined_constraints (dict, optional): _description_. Defaults to {}.
+        hard_constraints (dict, optional): {group: timeslot} the optimizer fixes. Defaults to None.
 
     Returns:
         _type_: _description_
@@ -33,7 +34,8 @@ def create(name, semester_entry, course_info, penalties = {}, group_constraints=
     i = 1
     name_candidate = copy.deepcopy(name)
     while not created:      
-        schedule, created = Schedule.objects.get_or_create(semester=semester_entry, name=name_candidate, course_info=course_info, group_constraints=group_constraints, predefined_constraints=predefined_constraints, preference_profile=penalties)
+        schedule, created = Schedule.objects.get_or_create(semester=semester_entry, name=name_candidate, course_info=course_info, group_constraints=group_constraints, predefined_constraints=predefined_constraints, preference_profile=penalties,
+                                                          defaults={"hard_constraints": hard_constraints})
         name_candidate = name + " (" + str(i) + ")"
         i += 1
     
@@ -0,0 +1,197 @@
+"""
+Exam Scheduler Web-UI
+Tsugunobu Miyake, Luke Snyder. 2025
+
+Keeps the large parameters of the optimization models in multiprocessing.shared_memory blocks, so that the processes of the
+WorkerPool read them without a copy. The dicts of the model_creator with an entry per (student, group), (faculty, group)
+or pair of groups are stored as matrices, and read through SharedMatrix views, which are used like the dicts.
+"""
+
+import numpy as np
+from multiprocessing import shared_memory
+
+
+class SharedArrays:
+    """
+    Base of the objects keeping NumPy arrays in multiprocessing.shared_memory blocks. Only the names of the blocks are pickled:
+    a process that unpickles the object attaches to the blocks by name, and a forked process uses the blocks it inherited.
+    The process that creates the blocks unlinks them once every process using them is done.
+    """
+    def __init__(self):
+        self.blocks = {}
+
+    def create(self, name, shape, dtype):
+        """
+        Creates a block and keeps a zero filled array of it in the attribute name.
+        returns: the array
+        """
+        size = max(int(np.prod(shape)) * np.dtype(dtype).itemsize, 1)
+        block = shared_memory.SharedMemory(create=True, size=size)
+        self.blocks[name] = (block, shape, dtype)
+        array = np.ndarray(shape, dtype=dtype, buffer=block.buf)
+        array.fill(0)
+        setattr(self, name, array)
+        return array
+
+    def __getstate__(self):
+        state = {key: value for key, value in self.__dict__.items() if key not in self.blocks and key != "blocks"}
+        state["block_names"] = {name: (block.name, shape, dtype) for name, (block, shape, dtype) in self.blocks.items()}
+        return state
+
+    def __setstate__(self, state):
+        block_names = state.pop("block_names")
+        self.__dict__.update(state)
+        self.blocks = {}
+        for name, (block_name, shape, dtype) in block_names.items():
+            block = shared_memory.SharedMemory(name=block_name)
+            self.blocks[name] = (block, shape, dtype)
+            setattr(self, name, np.ndarray(shape, dtype=dtype, buffer=block.buf))
+
+    def size(self):
+        """
+        returns: the total size of the blocks in bytes
+        """
+        return sum(block.size for block, shape, dtype in self.blocks.values())
+
+    def detach(self):
+        """
+        Closes the blocks in a process that attached to them by unpickling this object. The blocks are not freed.
+        """
+        for name, (block, shape, dtype) in self.blocks.items():
+            delattr(self, name)
+            block.close()
+        self.blocks = {}
+
+    def unlink(self):
+        """
+        Frees the blocks. Call it once, in the process that created them, after every process using them is done.
+        """
+        for name, (block, shape, dtype) in self.blocks.items():
+            delattr(self, name)
+            block.close()
+            block.unlink()
+        self.blocks = {}
+
+
+class SharedMatrix:
+    """
+    Read-only view of a matrix as a dict of the form {(row, column): value}, e.g. h[s, g] or N_s[g1, g2].
+    If diagonal is given, a single column is also a key, e.g. N_s[g].
+    """
+    def __init__(self, matrix, row_index, col_index, diagonal=None):
+        """
+        param matrix: 2d array
+        param row_index: dict of the form {row: index of the row in matrix}
+        param col_index: dict of the form {column: index of the column in matrix}
+        param diagonal: 1d array of the value of every column, or None
+        """
+        self.matrix = matrix
+        self.row_index = row_index
+        self.col_index = col_index
+        self.diagonal = diagonal
+
+    def __getitem__(self, key):
+        if isinstance(key, tuple):
+            return self.matrix.item(self.row_index[key[0]], self.col_index[key[1]])
+        if self.diagonal is None:
+            raise KeyError(key)
+        return self.diagonal.item(self.col_index[key])
+
+    def __contains__(self, key):
+        if isinstance(key, tuple):
+            return len(key) == 2 and key[0] in self.row_index and key[1] in self.col_index
+        return self.diagonal is not None and key in self.col_index
+
+    def get(self, key, default=None):
+        return self[key] if key in self else default
+
+    def keys(self):
+        """
+        returns: list of every (row, column) key, except (x, x) if the rows are the columns, followed by the single columns if diagonal is given
+        """
+        square = self.row_index is self.col_index
+        keys = [(r, c) for r in self.row_index for c in self.col_index if not (square and r == c)]
+        if self.diagonal is not None:
+            keys += list(self.col_index)
+        return keys
+
+    def __iter__(self):
+        return iter(self.keys())
+
+
+class SharedParams(SharedArrays):
+    """
+    The params of a model_creator, with "h", "u", "N_s" and "N_f" as matrices in shared memory.
+    The params attribute is a dict like the one of the model_creator, where these four are SharedMatrix views.
+    "v" ({(faculty, group1, group2): 1 or 0}) is left out, since it follows from "u".
+    Every other entry (the sets, the timeslot data, the numbers of exams) is small and kept as it is.
+    """
+    MATRICES = {"h": ("S", "G", np.int8), "u": ("F", "G", np.int8), "N_s": ("G", "G", np.int32), "N_f": ("G", "G", np.int32)}
+
+    def __init__(self, params):
+        """
+        param params: dict of the form {string: data} from the model_creator
+        """
+        super().__init__()
+        self.small = {key: value for key, value in params.items() if key not in self.MATRICES and key != "v"}
+        self.indices = {key: {item: i for i, item in enumerate(params[key])} for key in ["S", "F", "G"]}
+        for key, (rows, cols, dtype) in self.MATRICES.items():
+            row_index = self.indices[rows]
+            col_index = self.indices[cols]
+            matrix = self.create(key, (len(row_index), len(col_index)), dtype)
+            for entry, value in params[key].items():
+                if isinstance(entry, tuple) and value != 0:
+                    matrix[row_index[entry[0]], col_index[entry[1]]] = value
+        sizes = self.create("sizes", (len(self.indices["G"]),), np.int32)
+        for g, i in self.indices["G"].items():
+            sizes[i] = params["N_s"][g]
+        self.params = self.views()
+
+    def views(self):
+        """
+        returns: dict of the form {string: data} with the small params and a SharedMatrix of each matrix
+        """
+        params = dict(self.small)
+        for key, (rows, cols, dtype) in self.MATRICES.items():
+            params[key] = SharedMatrix(getattr(self, key), self.indices[rows], self.indices[cols], self.sizes if key == "N_s" else None)
+        return params
+
+    def __getstate__(self):
+        state = super().__getstate__()
+        state.pop("params")
+        return state
+
+    def __setstate__(self, state):
+        super().__setstate__(state)
+        self.params = self.views()
+
+
+def nonzero_indices(table, rows, cols):
+    """
+    param table: dict of the form {(row, column): 1 or 0}, e.g. h, or a SharedMatrix of one
+    param rows: list of the rows
+    param cols: list of the columns
+    returns: (row indices, column indices) of the entries that are 1, ordered by row and then column. The indices are positions in rows and cols
+    """
+    if isinstance(table, SharedMatrix):
+        row_order = [table.row_index[r] for r in rows]
+        col_order = [table.col_index[c] for c in cols]
+        return np.nonzero(table.matrix[np.ix_(row_order, col_order)] == 1)
+    found = ([], [])
+    for i, r in enumerate(rows):
+        for j, c in enumerate(cols):
+            if table[r, c] == 1:
+                found[0].append(i)
+                found[1].append(j)
+    return np.array(found[0], dtype=np.int64), np.array(found[1], dtype=np.int64)
+
+
+def nonzero_columns(table, rows, cols):
+    """
+    returns: dict of the form {row: [column, ...]} of the columns whose entry is 1, in the order of cols, e.g. the groups of every student
+    """
+    columns = {r: [] for r in rows}
+    row_indices, col_indices = nonzero_indices(table, rows, cols)
+    for i, j in zip(row_indices.tolist(), col_indices.tolist()):
+        columns[rows[i]].append(cols[j])
+    return columns
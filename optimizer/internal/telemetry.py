@@ -0,0 +1,135 @@
+"""
+Exam Scheduler Web-UI
+Tsugunobu Miyake, Luke Snyder. 2025
+
+Records how an optimization ran: the wall time and peak RSS of every stage (params, every phase 1 and phase 2 solve, LNS, analysis),
+the size of the SCIP models per constraint family, and the node counts and gaps of the solves.
+The stages of the WorkerPool tasks are filled by the solves in their process, see worker_pool.task_stats.
+Every optimization saves an OptimizationRun per schedule, and compare puts runs side by side.
+"""
+
+import resource
+import time
+
+from ..models import OptimizationRun
+
+# Prefixes of the names of the constraints of the phase 1 and phase 2 models, one per constraint family.
+# The constraints fixing a group to a timeslot or away from it end with "_constraint" after the name of the group.
+CONSTRAINT_FAMILIES = [
+    "timeslot_Constraint", "overlap", "B2B", "PMtoAM", "mst_constraint", "threein24_constraint", "fourin48_constraint",
+    "backtoback_constraint", "MaxNumOfStudents", "faculty_overlap", "oft_constraint", "faculty_B2B",
+]
+
+
+def peak_rss():
+    """
+    returns: the peak RSS of this process in MB
+    """
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def stage(name, start, **details):
+    """
+    param name: name of the stage, e.g. "params" or "analysis"
+    param start: time.time() when the stage started
+    returns: dict describing a stage run in this process, with its wall time and the peak RSS of the process so far
+    """
+    return dict(details, stage=name, wall_time=time.time() - start, peak_rss=peak_rss())
+
+def constraint_family(name):
+    for family in CONSTRAINT_FAMILIES:
+        if name.startswith(family + "_"):
+            return family
+    return "fixed_groups" if name.endswith("_constraint") else "other"
+
+def model_stats(model):
+    """
+    returns: dict with the numbers of variables, rows and nonzeros of a SCIP model before it is solved,
+             and the numbers of rows and nonzeros of every constraint family
+    """
+    families = dict()
+    nonzeros = 0
+    for cons in model.getConss():
+        try:
+            count = model.getConsNVars(cons)
+            name = constraint_family(cons.name)
+        except TypeError:
+            # The constraint handlers written in Python, e.g. the lazy windows of Phase2WindowConshdlr, do not count their variables.
+            count = 0
+            name = "other"
+        family = families.setdefault(name, {"rows": 0, "nonzeros": 0})
+        family["rows"] += 1
+        family["nonzeros"] += count
+        nonzeros += count
+    return {"variables": model.getNVars(), "rows": model.getNConss(), "nonzeros": nonzeros, "families": families}
+
+def solve_stats(model):
+    """
+    returns: dict with the status, node count, bounds and gap of a solved SCIP model
+    """
+    has_solution = model.getNSols() > 0
+    return {
+        "status": model.getStatus(),
+        "nodes": model.getNNodes(),
+        "objective": model.getPrimalbound() if has_solution else None,
+        "dual_bound": model.getDualbound(),
+        "gap": model.getGap() if has_solution else None,
+    }
+
+def save_run(schedule_entry, kind, stages, start, objective=None):
+    """
+    Saves the OptimizationRun of a schedule.
+    param kind: kind of the OptimizationJob that ran the optimization
+    param stages: list of the dicts of the stages of the schedule
+    param start: time.time() when the optimization started
+    param objective: objective value of the saved schedule. The gap of the run is the one of the phase 2 solve that found it
+    returns: the OptimizationRun
+    """
+    solves = [entry for entry in stages if "nodes" in entry]
+    gap = None
+    phase2 = [entry for entry in stages if entry["stage"] == "phase2" and entry.get("objective") is not None]
+    if phase2:
+        gap = min(phase2, key=lambda entry: entry["objective"])["gap"]
+    return OptimizationRun.objects.create(
+        schedule=schedule_entry,
+        kind=kind,
+        wall_time=time.time() - start,
+        peak_rss=max([entry.get("peak_rss", 0) for entry in stages] + [0]),
+        objective=objective,
+        gap=gap,
+        nodes=sum(entry["nodes"] for entry in solves),
+        stages=stages,
+    )
+
+def stage_key(entry):
+    """
+    returns: string naming a stage so that the same stage of two runs has the same key, e.g. "phase1 20 courses GRASP" or "phase2 Fixed20"
+    """
+    if entry["stage"] == "phase1":
+        return "phase1 {} courses{}".format(entry.get("num_courses"), " GRASP" if entry.get("grasp") else "")
+    if entry["stage"] == "phase2":
+        return "phase2 " + str(entry.get("run_name"))
+    return entry["stage"]
+
+def compare(runs):
+    """
+    param runs: list of OptimizationRun
+    returns: dict of the form {"runs": [summary of every run], "stages": {stage key: [stage of every run, or None]}}
+    """
+    summaries = []
+    stages = dict()
+    for index, run in enumerate(runs):
+        summaries.append({
+            "id": run.pk,
+            "schedule_pk": run.schedule_id,
+            "schedule": run.schedule.name,
+            "kind": run.kind,
+            "created_at": run.created_at.isoformat(),
+            "wall_time": run.wall_time,
+            "peak_rss": run.peak_rss,
+            "objective": run.objective,
+            "gap": run.gap,
+            "nodes": run.nodes,
+        })
+        for entry in run.stages:
+            stages.setdefault(stage_key(entry), [None] * len(runs))[index] = entry
+    return {"runs": summaries, "stages": stages}
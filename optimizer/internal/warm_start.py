@@ -0,0 +1,233 @@
+"""
+Exam Scheduler Web-UI
+Tsugunobu Miyake, Luke Snyder. 2025
+
+Builds a complete schedule of every course group to warm start phase 2.
+GRASP places every group with the pairwise costs, then a local search moves single groups using the phase 2 objective,
+computed from the number of exams of every student and faculty at every timeslot, including the 3 in 24 and 4 in 48 windows.
+"""
+
+import numpy as np
+from datetime import datetime
+
+from django.conf import settings
+
+from .grasp import GraspEngine, GraspPair
+from .kernels import grasp_kernels
+from .evaluate import ScheduleEvaluator
+
+
+class FullScheduleHeuristic:
+    # Cost of a student with 3 or more exams in one timeslot, which the phase 2 model does not allow.
+    INFEASIBLE = 1e6
+
+    def __init__(self, params, penalties, fixed_group2slot, no_group2slot):
+        """
+        param params: dict of the form {string: data} from the model_creator
+        param penalties: dict of the form {string of problem: float penalty associated with the problem}, the phase 2 preference profile
+        param fixed_group2slot: dict of the form {course_group: timeslot} of the groups that can not move, e.g. the phase 1 result
+        param no_group2slot: dict of the form {course_group: [t1, t2]} of the timeslots the groups can not be placed at
+        """
+        self.params = params
+        self.penalties = {issue: penalties.get(issue, 0) for issue in ["overlap", "B2B", "PMtoAM", "threein24", "fourin48", "facultyoverlap", "facultyB2B"]}
+        self.fixed_group2slot = {g: int(t) for g, t in fixed_group2slot.items()}
+        self.no_group2slot = no_group2slot
+        self.rng = np.random.default_rng()
+
+        G = params["G"]
+        T = params["T"]
+        d = params["d"]
+        N_s = params["N_s"]
+
+        self.groups = list(G)
+        self.group_index = {g: i for i, g in enumerate(self.groups)}
+        self.valid_slots = [t for t in T if d[t] == 1]
+        self.max_group_size = settings.MAX_STUDENTS_PER_SLOT
+        for g in G:
+            self.max_group_size = max(self.max_group_size, N_s[g])
+
+        # Students and faculty of every group, as row indices of the count arrays of the evaluator.
+        self.evaluator = ScheduleEvaluator.from_params(params)
+        evaluator = self.evaluator
+        self.group_students = [evaluator.student_rows[evaluator.student_cols == g] for g in range(len(G))]
+        self.group_faculty = [evaluator.faculty_rows[evaluator.faculty_cols == g] for g in range(len(G))]
+        self.sizes = np.array([N_s[g] for g in G], dtype=float)
+
+        # facultyoverlap is set for every faculty with a group, since the model counts a group with itself.
+        self.constant = self.penalties["facultyoverlap"] * len(np.unique(evaluator.faculty_rows))
+
+    def student_costs(self, counts):
+        """
+        param counts: T x ... array of the number of exams of students at every timeslot
+        returns: ... array of the phase 2 cost of every student
+        """
+        cost = ScheduleEvaluator.cost(self.evaluator.student_issues(counts), self.penalties)
+        return cost + self.INFEASIBLE * np.maximum(counts - 2, 0).sum(axis=0)
+
+    def faculty_costs(self, counts):
+        """
+        param counts: T x ... array of the number of exams of faculty at every timeslot
+        returns: ... array of the phase 2 cost of every faculty, without facultyoverlap
+        """
+        return self.penalties["facultyB2B"] * self.evaluator.faculty_issues(counts)["facultyB2B"]
+
+    def counts_of(self, slot_of):
+        """
+        param slot_of: array of the timeslot of every group
+        returns: the number of exams of every student and every faculty at every timeslot
+        """
+        return self.evaluator.student_counts(slot_of), self.evaluator.faculty_counts(slot_of)
+
+    def evaluate(self, slot_of):
+        """
+        returns: the phase 2 objective of the schedule given by the timeslot of every group
+        """
+        student_counts, faculty_counts = self.counts_of(slot_of)
+        return self.student_costs(student_counts).sum() + self.faculty_costs(faculty_counts).sum() + self.constant
+
+    def variable_values(self, group2slot):
+        """
+        Computes the values of the phase 2 student and faculty variables that follow from a schedule.
+        param group2slot: dict of the form {course_group: timeslot} with every group
+        returns: dict of the form {attribute of Phase2ModelCreator: {variable index: value}}, with only the values that are not 0
+        """
+        S = self.params["S"]
+        F = self.params["F"]
+        evaluator = self.evaluator
+        slot_of = evaluator.slots_of(group2slot)
+        student_counts, faculty_counts = self.counts_of(slot_of)
+        issues = evaluator.student_issues(student_counts)
+        values = {"student": {}, "faculty": {}, "bad": {}, "faculty_bad": {}}
+
+        exams = student_counts > 0
+        for t, i in zip(*np.nonzero(exams)):
+            values["student"][S[i], int(t)] = 1
+        for t, i in zip(*np.nonzero(student_counts >= 2)):
+            values["bad"][S[i], int(t), "overlap"] = 1
+        for starts, issue in [(evaluator.b2b_starts, "B2B"), (evaluator.n2m_starts, "PMtoAM")]:
+            for j, i in zip(*np.nonzero(exams[starts] & exams[starts + 1])):
+                values["bad"][S[i], int(starts[j]), issue] = 1
+        for issue in ["threein24", "fourin48"]:
+            for i in np.flatnonzero(issues[issue]):
+                values["bad"][S[i], issue] = 1
+
+        for t, i in zip(*np.nonzero(faculty_counts > 0)):
+            values["faculty"][F[i], int(t)] = 1
+        for i in np.unique(evaluator.faculty_rows):
+            values["faculty_bad"][F[i], "facultyoverlap"] = 1
+        for i in np.flatnonzero(evaluator.faculty_issues(faculty_counts)["facultyB2B"]):
+            values["faculty_bad"][F[i], "facultyB2B"] = 1
+        return values
+
+    def construct(self, seconds):
+        """
+        Places every group that is not fixed with GRASP, using the pairwise costs of the phase 2 penalties, until the time limit.
+        returns: the array of the timeslot of every group with the lowest phase 2 objective, or None if no schedule was found
+        """
+        schedule = {t: [] for t in self.valid_slots}
+        for g, t in self.fixed_group2slot.items():
+            schedule[t].append(g)
+        pairs = []
+        for g in self.groups:
+            if g in self.fixed_group2slot:
+                continue
+            for t in self.valid_slots:
+                if t not in self.no_group2slot.get(g, []):
+                    pairs.append(GraspPair(g, self.sizes[self.group_index[g]], t))
+        engine = GraspEngine(pairs, schedule, self.penalties, self.params, self.max_group_size, 0, settings.GRASP_LOCAL_SEARCH or GraspEngine.BEST_IMPROVEMENT,
+                             grasp_kernels())
+
+        best = None
+        best_cost = float('inf')
+        start = datetime.now()
+        while True:
+            cost = engine.construct()
+            if np.isfinite(cost):
+                engine.local_search(cost)
+                slot_of = self.slots_of_schedule(engine.get_schedule())
+                cost = self.evaluate(slot_of)
+                if cost < best_cost:
+                    best, best_cost = slot_of, cost
+            if (datetime.now() - start).total_seconds() >= seconds:
+                return best
+
+    def slots_of_schedule(self, schedule):
+        """
+        param schedule: dict of the form {timeslot: [groups_at_this_time]} with every group
+        returns: array of the timeslot of every group, in the order of params["G"]
+        """
+        slots = np.zeros(len(self.groups), dtype=int)
+        for t, groups in schedule.items():
+            for g in groups:
+                slots[self.group_index[g]] = t
+        return slots
+
+    def improve(self, slot_of, seconds):
+        """
+        Moves single groups to the timeslot that lowers the phase 2 objective the most, until no move does or the time limit.
+        The cost of a move is computed from the exam counts of the students and faculty of the group only.
+        param slot_of: array of the timeslot of every group, changed in place
+        returns: the phase 2 objective of the schedule
+        """
+        epsilon = 1e-9
+        student_counts, faculty_counts = self.counts_of(slot_of)
+        slots = np.array(self.valid_slots, dtype=int)
+        students_per_slot = np.zeros(self.evaluator.num_timeslots)
+        np.add.at(students_per_slot, slot_of, self.sizes)
+        movable = [i for i, g in enumerate(self.groups) if g not in self.fixed_group2slot]
+        start = datetime.now()
+
+        improved = True
+        while improved and (datetime.now() - start).total_seconds() < seconds:
+            improved = False
+            for g in self.rng.permutation(movable):
+                old = slot_of[g]
+                allowed = np.array([t != old and t not in self.no_group2slot.get(self.groups[g], []) for t in slots])
+                allowed &= students_per_slot[slots] + self.sizes[g] <= self.max_group_size
+                if not allowed.any():
+                    continue
+                targets = slots[allowed]
+                delta = self.move_delta(student_counts, self.group_students[g], self.student_costs, old, targets)
+                delta += self.move_delta(faculty_counts, self.group_faculty[g], self.faculty_costs, old, targets)
+                best = int(np.argmin(delta))
+                if delta[best] < -epsilon:
+                    new = targets[best]
+                    student_counts[old, self.group_students[g]] -= 1
+                    student_counts[new, self.group_students[g]] += 1
+                    faculty_counts[old, self.group_faculty[g]] -= 1
+                    faculty_counts[new, self.group_faculty[g]] += 1
+                    students_per_slot[old] -= self.sizes[g]
+                    students_per_slot[new] += self.sizes[g]
+                    slot_of[g] = new
+                    improved = True
+                if (datetime.now() - start).total_seconds() >= seconds:
+                    break
+        return self.student_costs(student_counts).sum() + self.faculty_costs(faculty_counts).sum() + self.constant
+
+    def move_delta(self, counts, rows, costs, old, targets):
+        """
+        returns: array of the change of the total cost of the given rows when a group of theirs moves from old to every target timeslot
+        """
+        if len(rows) == 0:
+            return np.zeros(len(targets))
+        current = counts[:, rows]
+        moved = np.repeat(current[:, :, None], len(targets), axis=2)
+        moved[old] -= 1
+        moved[targets, :, np.arange(len(targets))] += 1
+        return (costs(moved) - costs(current)[:, None]).sum(axis=0)
+
+    def run(self, seconds):
+        """
+        Builds a schedule with GRASP for half of the time limit, then improves it with the phase 2 objective for the rest.
+        returns: the schedule in the form {course_group: timeslot} and its phase 2 objective, or (None, inf) if no schedule was found
+        """
+        start = datetime.now()
+        slot_of = self.construct(seconds / 2)
+        if slot_of is None:
+            return None, float('inf')
+        print("full schedule GRASP objective:", self.evaluate(slot_of))
+        cost = self.improve(slot_of, seconds - (datetime.now() - start).total_seconds())
+        print("full schedule local search objective:", cost)
+        if cost >= self.INFEASIBLE:
+            return None, float('inf')
+        return {g: int(slot_of[i]) for i, g in enumerate(self.groups)}, cost
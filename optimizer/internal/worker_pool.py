@@ -0,0 +1,272 @@
+"""
+Exam Scheduler Web-UI
+Tsugunobu Miyake, Luke Snyder. 2025
+
+Process pool that runs the phase 1 and phase 2 solves of an optimization within a budget of cores.
+Tasks wait in a queue until enough cores are free, e.g. a multi-threaded phase 2 solve takes several cores,
+and the tasks of a graph also wait for the tasks they depend on, e.g. a phase 2 run for its phase 1 solve.
+With a memory budget, a task also waits until its estimated memory fits next to the estimates of the running tasks,
+and it can read the memory reserved for it from task_memory_limit, e.g. to set SCIP's limits/memory.
+The processes are started once and reused by every phase of the run, and the results come back through futures.
+If a task fails, the processes are terminated with the tasks still running, and the exception is raised.
+After each run, the start-up time of the processes and their memory are reported, and the memory each task used next to its estimate.
+The statistics of every task, e.g. the timings and model sizes a solve records in task_stats, are kept until pop_stats.
+"""
+
+import gc
+import multiprocessing
+import os
+import resource
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from django.conf import settings
+
+from .progress import close_connections_before_fork
+
+# time.time() when the main process started forking the processes of a pool. Inherited by the processes.
+forked_at = 0
+
+# Seconds between the fork of this process and the end of its initializer. Set by start_worker.
+startup_seconds = 0
+
+# MB of the memory budget reserved for the task running in this process, or 0 without a budget. Set by run_task.
+task_memory_limit = 0
+
+# Statistics of the task running in this process, filled by the task and returned with its result. Reset by run_task.
+task_stats = dict()
+
+# Seconds a terminated process gets to exit before it is killed.
+TERMINATE_SECONDS = 5
+
+
+def core_budget():
+    """
+    returns: the number of cores the optimizer may use at once, OPTIMIZER_CORES or every available core if it is 0
+    """
+    return settings.OPTIMIZER_CORES or len(os.sched_getaffinity(0))
+
+
+class WorkerPool:
+    def __init__(self, cores, initializer=None, initargs=(), memory_budget=0, estimate_memory=None):
+        """
+        param cores: budget of cores. At most this many processes are started, and the cores of the running tasks never exceed it
+        param initializer: function run by every process when it starts, e.g. to keep objects the tasks share
+        param initargs: arguments of the initializer. The processes are forked, so they are inherited instead of pickled
+        param memory_budget: budget of memory in MB. The estimates of the running tasks never exceed it. 0 for no budget
+        param estimate_memory: function called in this process before a task starts, with the memory fields given next to the task, if any.
+                               It returns (estimated MB the task adds to its process, description of the task)
+        """
+        self.cores = cores
+        self.memory_budget = memory_budget
+        self.estimate_memory = estimate_memory
+        self.executor = ProcessPoolExecutor(max_workers=cores, mp_context=multiprocessing.get_context("fork"),
+                                            initializer=start_worker, initargs=(initializer, initargs))
+        self.started = False
+        self.memory = dict()
+        self.stats = []
+
+    def run(self, tasks):
+        """
+        Runs the tasks, starting each one as soon as its cores are free, in the order of the list.
+        A task that needs more cores than the budget runs alone.
+        param tasks: list of (cores, function, args) or (cores, function, args, memory) tuples, where memory is given to estimate_memory
+        returns: list of the results of the functions, in the order of tasks. An exception of a task is raised here
+        """
+        results = self.run_graph({index: task[:3] + ([],) + task[3:] for index, task in enumerate(tasks)})
+        return [results[index] for index in range(len(tasks))]
+
+    def run_graph(self, tasks):
+        """
+        Runs a graph of tasks. A task is ready once the tasks it depends on are done, and the ready tasks start
+        in the order of the dict as soon as their cores, and their estimated memory if there is a memory budget, are free.
+        A task that needs more cores or memory than the budget runs alone, and only gets the memory budget.
+        param tasks: dict of the form {name: (cores, function, args, dependencies)}, where dependencies is a list of names of other tasks,
+                     or {name: (cores, function, args, dependencies, memory)}, where memory is given to estimate_memory.
+                     If dependencies is not empty, args is a function called in this process with the dict {name: result} of the dependencies
+                     once they are done. It returns the args of the task, or None to skip the task, whose result is then None
+        returns: dict of the form {name: result of the function}. An exception of a task is raised here
+        """
+        if not self.started:
+            # Every process is forked when the first task is submitted. They must not share the database connections,
+            # and the objects of the main process are frozen, so that the garbage collector of a process does not write to them,
+            # which would copy the memory pages holding them into the process.
+            global forked_at
+            close_connections_before_fork()
+            gc.freeze()
+            forked_at = time.time()
+        try:
+            results = self.schedule_graph(tasks)
+        except BaseException:
+            # A task failed, or the run was interrupted: the other tasks are stopped instead of solving on until their time limit.
+            self.terminate()
+            raise
+        if self.memory:
+            self.report()
+        return results
+
+    def schedule_graph(self, tasks):
+        """
+        Submits the tasks of run_graph as they get ready and collects their results.
+        returns: dict of the form {name: result of the function}
+        """
+        waiting = {name: task if len(task) == 5 else task + (None,) for name, task in tasks.items()}
+        results = dict()
+        running = dict()
+        free = self.cores
+        free_memory = self.memory_budget
+        while waiting or running:
+            while waiting:
+                ready = [name for name, task in waiting.items() if all(dependency in results for dependency in task[3])]
+                if not ready:
+                    break
+                name = ready[0]
+                cores, function, args, dependencies, memory = waiting[name]
+                if dependencies:
+                    args = args({dependency: results[dependency] for dependency in dependencies})
+                    if args is None:
+                        del waiting[name]
+                        results[name] = None
+                        continue
+                    waiting[name] = (cores, function, args, [], memory)
+                estimate, description = self.estimate_memory(memory) if self.estimate_memory is not None and memory is not None else (0, None)
+                reserved = min(estimate, self.memory_budget)
+                if (cores > free or reserved > free_memory) and running:
+                    break
+                del waiting[name]
+                running[self.executor.submit(run_task, function, args, reserved)] = (name, cores, reserved, estimate, description)
+                free -= cores
+                free_memory -= reserved
+                if not self.started:
+                    self.started = True
+                    gc.unfreeze()
+            if not running:
+                if waiting:
+                    raise ValueError("The tasks {} depend on tasks that are not in the graph.".format(list(waiting)))
+                break
+            done, pending = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name, cores, reserved, estimate, description = running.pop(future)
+                free += cores
+                free_memory += reserved
+                results[name], pid, self.memory[pid], stats = future.result()
+                self.stats.append(stats)
+                if description is not None:
+                    # To calibrate the estimates, see model_memory.
+                    print("{}: estimated memory {:.0f} MB, used {:.0f} MB".format(description, estimate, stats["memory"]))
+        return results
+
+    def report(self):
+        """
+        Prints the start-up time of the processes, and the sum of their peak RSS and of their private memory after their last task.
+        The peak RSS of a forked process counts the pages it shares with the main process and with the other processes,
+        so the private memory is what a process really adds.
+        """
+        startup = max(memory[0] for memory in self.memory.values())
+        peak_rss = sum(memory[1] for memory in self.memory.values())
+        private = sum(memory[2] for memory in self.memory.values())
+        print("worker pool: {} processes, started in {:.2f} s, peak RSS {:.0f} MB, private memory {:.0f} MB".format(
+            len(self.memory), startup, peak_rss, private))
+
+    def pop_stats(self):
+        """
+        returns: list of the statistics of the tasks done since the last call, in the order they finished. See run_task
+        """
+        stats = self.stats
+        self.stats = []
+        return stats
+
+    def shutdown(self):
+        """
+        Stops the processes once their running tasks are done, without waiting for them. The tasks that did not start are cancelled.
+        """
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+    def terminate(self):
+        """
+        Stops the processes right away, with their running tasks, e.g. after a task failed. The tasks that did not start are cancelled.
+        A process that does not exit within TERMINATE_SECONDS is killed.
+        """
+        processes = list((self.executor._processes or {}).values())
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            process.join(TERMINATE_SECONDS)
+            if process.is_alive():
+                process.kill()
+                process.join()
+
+
+def start_worker(initializer, initargs):
+    """
+    Initializer of the processes of a WorkerPool. Runs the initializer of the pool and records the start-up time of the process.
+    """
+    global startup_seconds
+    if initializer is not None:
+        initializer(*initargs)
+    startup_seconds = time.time() - forked_at
+
+
+def run_task(function, args, memory_limit=0):
+    """
+    Task of a WorkerPool.
+    param memory_limit: MB of the memory budget reserved for the task, or 0 without a budget
+    returns: (result of function, process id, (start-up seconds, peak RSS in MB, private memory in MB) of the process,
+             dict of the statistics of the task: its task_stats, and its "wall_time", the "peak_rss" of the process during the task
+             and the "memory" in MB this peak rose above the RSS of the process before the task)
+    """
+    global task_memory_limit, task_stats
+    task_memory_limit = memory_limit
+    task_stats = dict()
+    start = time.time()
+    rss_before = reset_peak_rss()
+    result = function(*args)
+    task_peak = process_status("VmHWM")
+    stats = dict(task_stats, wall_time=time.time() - start, peak_rss=task_peak, memory=max(task_peak - rss_before, 0))
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    return result, os.getpid(), (startup_seconds, peak_rss, private_memory()), stats
+
+
+def process_status(key):
+    """
+    returns: the memory in MB of the line key of /proc/self/status, e.g. "VmHWM" for the peak RSS, or 0 if it can not be read
+    """
+    try:
+        with open("/proc/self/status", "r") as f:
+            for line in f:
+                if line.startswith(key + ":"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return 0
+
+
+def reset_peak_rss():
+    """
+    Resets the peak RSS of this process to its RSS, so that the peak after a task is the peak of the task.
+    If the kernel does not allow it, the peak stays the peak of the process so far.
+    returns: the RSS of this process in MB
+    """
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+    except OSError:
+        pass
+    return process_status("VmRSS")
+
+
+def private_memory():
+    """
+    returns: the memory of this process in MB that is not shared with other processes, or 0 if /proc/self/smaps_rollup can not be read
+    """
+    try:
+        with open("/proc/self/smaps_rollup", "r") as f:
+            lines = f.readlines()
+    except OSError:
+        return 0
+    kilobytes = 0
+    for line in lines:
+        if line.startswith("Private_"):
+            kilobytes += int(line.split()[1])
+    return kilobytes / 1024
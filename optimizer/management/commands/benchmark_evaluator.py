@@ -0,0 +1,91 @@
+"""
+Exam Scheduler Web-UI
+Tsugunobu Miyake, Luke Snyder. 2025
+
+Times the ScheduleEvaluator against a per-student Python loop on random enrollments and schedules,
+and checks that both count the same issues.
+Usage: python manage.py benchmark_evaluator [--students 10000 50000] [--groups 800] [--days 10] [--repeats 5]
+"""
+
+import time
+
+import numpy as np
+from django.core.management.base import BaseCommand
+
+from ...internal.evaluate import ScheduleEvaluator
+
+
+class Command(BaseCommand):
+    help = "Benchmarks the vectorized schedule evaluator against a per-student Python loop."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--students", type=int, nargs="+", default=[10000, 50000])
+        parser.add_argument("--groups", type=int, default=800)
+        parser.add_argument("--days", type=int, default=10, help="number of exam days, with 3 timeslots per day and the last one at night")
+        parser.add_argument("--repeats", type=int, default=5, help="number of random schedules evaluated")
+        parser.add_argument("--seed", type=int, default=0)
+
+    def handle(self, *args, **options):
+        rng = np.random.default_rng(options["seed"])
+        num_groups = options["groups"]
+        num_timeslots = 3 * options["days"]
+        night = np.array([1 if t % 3 == 2 else 0 for t in range(num_timeslots)])
+        pair_starts = np.arange(num_timeslots - 1)
+        three_windows = np.array([(t, min(t + 3, num_timeslots)) for t in range(num_timeslots)])
+        four_windows = np.array([(t, min(t + 6, num_timeslots)) for t in range(num_timeslots)])
+
+        self.stdout.write("{:>10}{:>12}{:>14}{:>14}{:>10}{:>8}".format("students", "enrollments", "loop (ms)", "vector (ms)", "speedup", "match"))
+        for num_students in options["students"]:
+            # Every student takes 3 to 6 exams, some of the groups are much larger than the others.
+            popularity = rng.pareto(1.5, num_groups) + 1
+            popularity /= popularity.sum()
+            rows = []
+            cols = []
+            for s in range(num_students):
+                for g in rng.choice(num_groups, size=rng.integers(3, 7), replace=False, p=popularity):
+                    rows.append(s)
+                    cols.append(g)
+            evaluator = ScheduleEvaluator(range(num_groups), num_students, (rows, cols), num_timeslots, night, pair_starts, three_windows, four_windows)
+            exams_of = [[] for s in range(num_students)]
+            for s, g in zip(rows, cols):
+                exams_of[s].append(g)
+
+            loop_time = 0
+            vector_time = 0
+            match = True
+            for repeat in range(options["repeats"]):
+                slot_of = rng.integers(0, num_timeslots, num_groups)
+
+                start = time.perf_counter()
+                expected = self.loop_issues(exams_of, slot_of, night, three_windows, four_windows)
+                loop_time += time.perf_counter() - start
+
+                start = time.perf_counter()
+                issues = evaluator.evaluate(slot_of)
+                vector_time += time.perf_counter() - start
+
+                match &= all(issues[issue] == expected[issue] for issue in expected)
+
+            self.stdout.write("{:>10}{:>12}{:>14.1f}{:>14.1f}{:>10.1f}{:>8}".format(
+                num_students, len(rows), 1000 * loop_time / options["repeats"], 1000 * vector_time / options["repeats"],
+                loop_time / vector_time, "yes" if match else "NO"))
+
+    def loop_issues(self, exams_of, slot_of, night, three_windows, four_windows):
+        """
+        Counts the student issues one student at a time, the way the Analyzer used to.
+        returns: dict of the form {issue: total over the students}
+        """
+        totals = {issue: 0 for issue in ScheduleEvaluator.STUDENT_ISSUES}
+        for groups in exams_of:
+            timeslots = sorted(slot_of[g] for g in groups)
+            unique = sorted(set(timeslots))
+            totals["overlap"] += len(timeslots) - len(unique)
+            for i in range(len(unique) - 1):
+                if unique[i + 1] - unique[i] == 1:
+                    totals["PMtoAM" if night[unique[i]] == 1 else "B2B"] += 1
+            for issue, windows, limit in [("threein24", three_windows, 2), ("fourin48", four_windows, 3)]:
+                for i in range(len(unique) - limit):
+                    if unique[i + limit] < windows[unique[i], 1]:
+                        totals[issue] += 1
+                        break
+        return totals
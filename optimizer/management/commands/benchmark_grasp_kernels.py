@@ -0,0 +1,75 @@
+"""
+Exam Scheduler Web-UI
+Tsugunobu Miyake, Luke Snyder. 2025
+
+Benchmarks the numba-compiled GRASP kernels against the NumPy implementation of the GraspEngine on a synthetic semester.
+That both make the same schedules is checked by optimizer/tests/test_grasp.py.
+Usage: python manage.py benchmark_grasp_kernels [--groups 600] [--timeslots 30] [--students 20000] [--seconds 10]
+"""
+
+import time
+
+import numpy as np
+from django.core.management.base import BaseCommand
+
+from ...internal import kernels
+from ...internal.grasp import GraspEngine, GraspPair
+
+
+def synthetic_engine(num_groups, num_timeslots, num_students, seed, local_search):
+    """
+    returns: a GraspEngine of a random semester, where every student takes 3 to 6 groups and some groups are much larger than the others
+    """
+    rng = np.random.default_rng(seed)
+    popularity = rng.pareto(1.5, num_groups) + 1
+    popularity /= popularity.sum()
+    intersections = np.zeros((num_groups, num_groups), dtype=int)
+    for s in range(num_students):
+        groups = rng.choice(num_groups, size=rng.integers(3, 7), replace=False, p=popularity)
+        intersections[np.ix_(groups, groups)] += 1
+
+    N_s = {(g1, g2): intersections[g1, g2] for g1 in range(num_groups) for g2 in range(num_groups)}
+    for g in range(num_groups):
+        N_s[g] = intersections[g, g]
+    night = {t: 1 if t % 3 == 2 else 0 for t in range(num_timeslots)}
+    penalties = {"overlap": 1, "B2B": 0.02, "PMtoAM": 0.04}
+
+    # Two groups are fixed, and every other group can not be placed at a tenth of the timeslots.
+    schedule = {t: [] for t in range(num_timeslots)}
+    schedule[0].append(num_groups - 1)
+    schedule[num_timeslots // 2].append(num_groups - 2)
+    pairs = [GraspPair(g, N_s[g], t) for g in range(num_groups - 2) for t in range(num_timeslots) if rng.random() >= 0.1]
+    max_group_size = 3 * intersections.diagonal().sum() / num_timeslots
+    return GraspEngine(pairs, schedule, penalties, {"N_s": N_s, "n": night}, max_group_size, 0.01, local_search)
+
+
+class Command(BaseCommand):
+    help = "Benchmarks the numba-compiled GRASP kernels against the NumPy GraspEngine on a synthetic semester."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--groups", type=int, default=600, help="number of groups of the benchmark semester")
+        parser.add_argument("--timeslots", type=int, default=30, help="number of timeslots of the benchmark semester")
+        parser.add_argument("--students", type=int, default=20000, help="number of students of the benchmark semester")
+        parser.add_argument("--seconds", type=float, default=10, help="seconds of GRASP restarts for every implementation")
+
+    def handle(self, *args, **options):
+        if kernels.COMPILED is None:
+            self.stderr.write("numba is not installed, there are no compiled kernels to benchmark")
+            return
+
+        engine = synthetic_engine(options["groups"], options["timeslots"], options["students"], 1, GraspEngine.BEST_IMPROVEMENT)
+        engine.kernels = kernels.COMPILED
+        start = time.perf_counter()
+        engine.local_search(engine.construct())
+        self.stdout.write("numba compile and first restart: {:.1f} s".format(time.perf_counter() - start))
+        self.stdout.write("{:<10}{:>12}{:>16}{:>14}".format("kernels", "restarts", "restarts / s", "best cost"))
+        for candidate in [None, kernels.COMPILED]:
+            engine.kernels = candidate
+            restarts = 0
+            best = float("inf")
+            start = time.perf_counter()
+            while time.perf_counter() - start < options["seconds"]:
+                best = min(best, engine.local_search(engine.construct()))
+                restarts += 1
+            seconds = time.perf_counter() - start
+            self.stdout.write("{:<10}{:>12}{:>16.2f}{:>14.2f}".format("numpy" if candidate is None else candidate.name, restarts, restarts / seconds, best))
@@ -0,0 +1,85 @@
+"""
+Exam Scheduler Web-UI
+Tsugunobu Miyake, Luke Snyder. 2025
+
+Compares the two phase 2 strategies on a semester: one single-threaded process per phase 1 result,
+and one multi-threaded solve of the best phase 1 result with SCIP's concurrent solver.
+The gap is the one of the chosen run, relative to its own phase 1 fixings.
+Usage: python manage.py benchmark_phase2 <semester_pk> [--profile <pk>] [--threads 4] [--time-limit 600]
+"""
+
+import json
+import os
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from ...models import PreferenceProfile, Semester
+from ...internal import optimize
+
+
+class Command(BaseCommand):
+    help = "Benchmarks the multi-process and the concurrent (multi-threaded) phase 2 strategies on a semester."
+
+    def add_arguments(self, parser):
+        parser.add_argument("semester_pk", type=int)
+        parser.add_argument("--profile", type=int, default=None, help="preference profile id. The default penalties are used if not given")
+        parser.add_argument("--threads", type=int, default=4, help="number of threads of the concurrent solve")
+        parser.add_argument("--time-limit", type=int, default=600, help="phase 2 time limit in seconds for each strategy")
+        parser.add_argument("--output-dir", default=os.path.join(settings.OPT_HOME_DIR, "benchmark_phase2"))
+
+    def handle(self, *args, **options):
+        semester_entry = Semester.objects.get(pk=options["semester_pk"])
+        if options["profile"] is None:
+            preference_profile = PreferenceProfile(name="default")
+        else:
+            preference_profile = PreferenceProfile.objects.get(pk=options["profile"])
+
+        time_strings = semester_entry.exam_start_times.split(",")
+        duration = semester_entry.exam_end_date - semester_entry.exam_start_date
+        total_exams = (duration.days + 1) * len(time_strings)
+
+        optimizer = optimize.ExamOptimizer(semester_entry.pk, {}, {})
+        # Both strategies start from the same phase 1 results.
+        phase1_group2slot = dict(optimizer.SCIP_optimize_phase1(total_exams,
+                                                                settings.PHASE_1_NUM_COURSES,
+                                                                preference_profile.get_phase1_penalty_dictionary(),
+                                                                settings.PHASE_1_TIME_LIMIT,
+                                                                settings.USE_GRASP))
+        if -1 in phase1_group2slot:
+            optimizer.close()
+            self.stderr.write("phase 1 is infeasible")
+            return
+
+        settings.PHASE_2_TIME_LIMIT = options["time_limit"]
+        strategies = [("multi-process", 0, len(phase1_group2slot)), ("concurrent", options["threads"], options["threads"])]
+
+        rows = []
+        for strategy, threads, cores in strategies:
+            output_dir = os.path.join(options["output_dir"], strategy)
+            os.makedirs(output_dir, exist_ok=True)
+            for file_name in os.listdir(output_dir):
+                if file_name.endswith("_stats.json"):
+                    os.remove(os.path.join(output_dir, file_name))
+            settings.PHASE_2_CONCURRENT_THREADS = threads
+
+            start = time.time()
+            optimizer.SCIP_optimize_phase2(preference_profile.get_penalty_dictionary(), phase1_group2slot, total_exams, output_dir)
+            wall_time = time.time() - start
+
+            # Report the bounds of the run whose solution was chosen.
+            chosen = None
+            for file_name in os.listdir(output_dir):
+                if file_name.endswith("_stats.json"):
+                    with open(os.path.join(output_dir, file_name), "r") as f:
+                        stats = json.load(f)
+                    if chosen is None or stats["primal_bound"] < chosen["primal_bound"]:
+                        chosen = stats
+            rows.append((strategy, cores, wall_time, cores * wall_time / 3600, chosen))
+        optimizer.close()
+
+        self.stdout.write("{:<15}{:>7}{:>12}{:>12}{:>14}{:>14}{:>10}{:>12}".format("strategy", "cores", "wall (s)", "core-hours", "primal", "dual", "gap", "nodes"))
+        for strategy, cores, wall_time, core_hours, stats in rows:
+            self.stdout.write("{:<15}{:>7}{:>12.1f}{:>12.3f}{:>14.4f}{:>14.4f}{:>10.4f}{:>12}".format(
+                strategy, cores, wall_time, core_hours, stats["primal_bound"], stats["dual_bound"], stats["gap"], stats["nodes"]))
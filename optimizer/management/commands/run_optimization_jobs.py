@@ -0,0 +1,51 @@
+"""
+Exam Scheduler Web-UI
+Tsugunobu Miyake, Luke Snyder. 2025
+
+Runs the optimization requests queued by the web UI, each in its own process, at most OPTIMIZATION_JOBS_CONCURRENCY at once.
+Keep it running alongside the server. When it starts, the schedule jobs left running by a stopped job runner are resumed from their
+phase 2 checkpoints. The other jobs, e.g. the portfolios, do not checkpoint their phase 2 runs and are marked as failed.
+Usage: python manage.py run_optimization_jobs [--concurrency 1] [--poll 5] [--once]
+"""
+
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from ...internal import jobs
+
+
+class Command(BaseCommand):
+    help = "Runs the queued optimization requests, each in its own process."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--concurrency", type=int, default=settings.OPTIMIZATION_JOBS_CONCURRENCY, help="number of jobs run at once")
+        parser.add_argument("--poll", type=float, default=5, help="seconds between two looks at the queue")
+        parser.add_argument("--once", action="store_true", help="exit once the queue is empty and every started job is done")
+
+    def handle(self, *args, **options):
+        concurrency = max(options["concurrency"], 1)
+        processes = {} # {job pk: multiprocessing.Process}
+        # Jobs left running by a job runner that stopped, e.g. with the server.
+        for job_pk, resumed in jobs.recover():
+            self.stdout.write("Job {} {}.".format(job_pk, "resumes from its phase 2 checkpoints" if resumed else "failed, its process stopped"))
+        self.stdout.write("Running optimization jobs, {} at once.".format(concurrency))
+        while True:
+            for job_pk, process in list(processes.items()):
+                if not process.is_alive():
+                    process.join()
+                    jobs.check_exit(job_pk, process.exitcode)
+                    del processes[job_pk]
+                    self.stdout.write("Job {} finished with exit code {}.".format(job_pk, process.exitcode))
+
+            while len(processes) < concurrency:
+                job = jobs.claim(concurrency)
+                if job is None:
+                    break
+                self.stdout.write("Starting job {} ({}).".format(job.pk, job.kind))
+                processes[job.pk] = jobs.start(job)
+
+            if options["once"] and not processes:
+                break
+            time.sleep(options["poll"])
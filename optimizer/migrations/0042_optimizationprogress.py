@@ -0,0 +1,29 @@
+# Generated by Django 5.0.6 on 2026-10-19 11:10
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('optimizer', '0041_delete_dbprogress'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OptimizationProgress',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('run_name', models.CharField(max_length=100)),
+                ('elapsed_time', models.FloatField(default=0)),
+                ('primal_bound', models.FloatField(null=True)),
+                ('dual_bound', models.FloatField(null=True)),
+                ('gap', models.FloatField(null=True)),
+                ('nodes', models.IntegerField(default=0)),
+                ('inconveniences', models.JSONField(default=dict)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('schedule', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='progress', to='optimizer.schedule')),
+            ],
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.0.6 on 2026-10-19 13:10
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('optimizer', '0043_optimizationjob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='optimizationjob',
+            name='schedule',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='jobs', to='optimizer.schedule'),
+        ),
+        migrations.CreateModel(
+            name='Phase2Checkpoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('run_name', models.CharField(max_length=100)),
+                ('num_courses', models.IntegerField()),
+                ('phase1_cost', models.FloatField()),
+                ('phase1_group2slot', models.JSONField(default=dict)),
+                ('group2slot', models.JSONField(blank=True, null=True)),
+                ('objective', models.FloatField(null=True)),
+                ('params_hash', models.CharField(max_length=64)),
+                ('elapsed_time', models.FloatField(default=0)),
+                ('finished', models.BooleanField(default=False)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('schedule', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='checkpoints', to='optimizer.schedule')),
+            ],
+            options={
+                'unique_together': {('schedule', 'run_name')},
+            },
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.0.6 on 2026-10-19 13:29
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('optimizer', '0044_phase2checkpoint'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='schedule',
+            name='phase1_cached',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.CreateModel(
+            name='Phase1Result',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=64, unique=True)),
+                ('num_courses', models.IntegerField()),
+                ('cost', models.FloatField()),
+                ('group2slot', models.JSONField(default=dict)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('semester', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='phase1_results', to='optimizer.semester')),
+            ],
+        ),
+    ]
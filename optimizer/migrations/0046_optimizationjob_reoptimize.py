@@ -0,0 +1,18 @@
+# Generated by Django 5.0.6 on 2026-10-19 13:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('optimizer', '0045_phase1result'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='optimizationjob',
+            name='kind',
+            field=models.CharField(choices=[('schedule', 'Schedule'), ('portfolio', 'Portfolio'), ('reoptimize', 'Re-optimization')], max_length=20),
+        ),
+    ]
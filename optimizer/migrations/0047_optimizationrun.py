@@ -0,0 +1,29 @@
+# Generated by Django 5.0.6 on 2026-10-19 13:52
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('optimizer', '0046_optimizationjob_reoptimize'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OptimizationRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(max_length=20)),
+                ('wall_time', models.FloatField(default=0)),
+                ('peak_rss', models.FloatField(default=0)),
+                ('objective', models.FloatField(blank=True, null=True)),
+                ('gap', models.FloatField(blank=True, null=True)),
+                ('nodes', models.IntegerField(default=0)),
+                ('stages', models.JSONField(default=list)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('schedule', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='runs', to='optimizer.schedule')),
+            ],
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.0.6 on 2026-10-19 14:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('optimizer', '0047_optimizationrun'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='schedule',
+            name='hard_constraints',
+            field=models.JSONField(blank=True, null=True),
+        ),
+    ]
@@ -71,6 +71,7 @@ class Schedule(models.Model):
     preference_profile = models.JSONField(null=True, blank=True)
     group_constraints = models.JSONField(null=True, blank=True)
     predefined_constraints = models.JSONField(null=True, blank=True)
+    hard_constraints = models.JSONField(null=True, blank=True) # {group: timeslot} fixed by the optimizer. None for the schedules optimized before it was saved
     students_overlap = models.IntegerField(default=0)
     student_forced_overlap = models.IntegerField(default=0)
     students_3in24 = models.IntegerField(default=0)
@@ -99,6 +100,7 @@ class Schedule(models.Model):
     status = models.CharField(max_length=5, choices=TYPE_CHOICES, default=CREATED)
     is_duplicated = models.BooleanField(default=False)
     original = models.ForeignKey('self', on_delete=models.CASCADE, null=True, blank=True)
+    phase1_cached = models.BooleanField(default=False) # True if a cached phase 1 result was reused instead of solving phase 1
     
     course_info = models.JSONField(default=dict)
 
@@ -250,6 +252,24 @@ class ScheduleVersion(models.Model):
     def __str__(self):
         return f"Version {self.pk}"
     
+"""
+Records the progress of a phase 2 optimization. A new entry is created every time SCIP finds a better schedule,
+so the dashboard can show the convergence while the optimization is still running.
+"""
+class OptimizationProgress(models.Model):
+    schedule = models.ForeignKey(Schedule, on_delete=models.CASCADE, related_name='progress')
+    run_name = models.CharField(max_length=100) # Example: Fixed18, LNS
+    elapsed_time = models.FloatField(default=0) # in seconds
+    primal_bound = models.FloatField(null=True)
+    dual_bound = models.FloatField(null=True)
+    gap = models.FloatField(null=True)
+    nodes = models.IntegerField(default=0)
+    inconveniences = models.JSONField(default=dict)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"Progress of {self.schedule.name} ({self.run_name}): {self.primal_bound}"
+
 class PortfolioID(models.Model):
     current_id = models.IntegerField(default=1)
 
@@ -257,4 +277,107 @@ class PortfolioID(models.Model):
         val = int(self.current_id)
         self.current_id += 1
         self.save()
-        return val
\ No newline at end of file
+        return val
+"""
+An optimization request waiting for, or run by, the run_optimization_jobs command, so that it does not run in the HTTP request.
+The process running the job updates heartbeat_at regularly, so that a job whose process died can be told from one still running.
+"""
+class OptimizationJob(models.Model):
+    SCHEDULE = "schedule"
+    PORTFOLIO = "portfolio"
+    REOPTIMIZE = "reoptimize"
+
+    KIND_CHOICES = [
+        (SCHEDULE, "Schedule"),
+        (PORTFOLIO, "Portfolio"),
+        (REOPTIMIZE, "Re-optimization"),
+    ]
+
+    QUEUED = 0
+    RUNNING = 1
+    DONE = 2
+    FAILED = 3
+
+    choice_display = {
+        QUEUED: "Waiting for a job runner.",
+        RUNNING: "Running.",
+        DONE: "Done.",
+        FAILED: "Failed.",
+    }
+
+    STATUS_CHOICES = [(status, display) for status, display in choice_display.items()]
+
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    payload = models.JSONField(default=dict) # Data of the optimization request
+    status = models.IntegerField(choices=STATUS_CHOICES, default=QUEUED)
+    result = models.JSONField(null=True, blank=True) # Example: {"schedule_pk": 3}
+    error = models.TextField(blank=True, default="")
+    worker = models.CharField(max_length=100, blank=True, default="") # host:pid of the process running the job
+    schedule = models.ForeignKey(Schedule, on_delete=models.SET_NULL, null=True, blank=True, related_name="jobs") # Schedule being optimized by a schedule or re-optimization job
+    created_at = models.DateTimeField(auto_now_add=True)
+    claimed_at = models.DateTimeField(null=True, blank=True)
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"Job {self.pk} ({self.kind}): {self.get_status()}"
+
+    def get_status(self):
+        return OptimizationJob.choice_display[self.status]
+
+"""
+Latest state of a phase 2 run of a schedule, one per phase 1 result, saved regularly while the run solves.
+If the job runner stops during phase 2, the run is resumed from it: the model is rebuilt from the same phase 1 result,
+and SCIP starts from the saved incumbent with the rest of its time limit. params_hash tells whether the model is still the same.
+"""
+class Phase2Checkpoint(models.Model):
+    schedule = models.ForeignKey(Schedule, on_delete=models.CASCADE, related_name="checkpoints")
+    run_name = models.CharField(max_length=100) # Example: Fixed18
+    num_courses = models.IntegerField()
+    phase1_cost = models.FloatField()
+    phase1_group2slot = models.JSONField(default=dict) # {course_group: timeslot} fixed by phase 1
+    group2slot = models.JSONField(null=True, blank=True) # {course_group: timeslot} of the best incumbent, every course group
+    objective = models.FloatField(null=True)
+    params_hash = models.CharField(max_length=64)
+    elapsed_time = models.FloatField(default=0) # in seconds, over every start of the run
+    finished = models.BooleanField(default=False) # True once the run ended by itself: solved, time limit, or stopped by racing
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ("schedule", "run_name")
+
+    def __str__(self):
+        return f"Checkpoint of {self.schedule.name} ({self.run_name}): {self.objective}"
+
+"""
+Result of a phase 1 solve, reused when the same phase 1 is solved again, e.g. after only the phase 2 penalties of a schedule changed.
+key is a hash of the semester params, the constraints, the phase 1 penalties, the number of courses and whether GRASP warm started the solve.
+"""
+class Phase1Result(models.Model):
+    semester = models.ForeignKey(Semester, on_delete=models.CASCADE, related_name="phase1_results")
+    key = models.CharField(max_length=64, unique=True)
+    num_courses = models.IntegerField()
+    cost = models.FloatField()
+    group2slot = models.JSONField(default=dict) # {course_group: timeslot} of the courses placed by phase 1
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"Phase 1 result of {self.semester.name} with {self.num_courses} courses: {self.cost}"
+
+"""
+Telemetry of the optimization that created a schedule, to compare runs, e.g. before and after changing a setting.
+stages has the wall time and peak RSS of every stage, and for the SCIP solves the model size per constraint family, the nodes and the gap.
+"""
+class OptimizationRun(models.Model):
+    schedule = models.ForeignKey(Schedule, on_delete=models.CASCADE, related_name="runs")
+    kind = models.CharField(max_length=20) # kind of the OptimizationJob, Example: schedule
+    wall_time = models.FloatField(default=0) # in seconds, from the start of the optimization to the end of the analysis
+    peak_rss = models.FloatField(default=0) # in MB, the largest peak RSS of a stage
+    objective = models.FloatField(null=True, blank=True)
+    gap = models.FloatField(null=True, blank=True) # final gap of the phase 2 solve that found the schedule
+    nodes = models.IntegerField(default=0) # SCIP nodes of every phase 1 and phase 2 solve
+    stages = models.JSONField(default=list) # Example: [{"stage": "phase2", "run_name": "Fixed20", "wall_time": 60.2, "peak_rss": 812, "nodes": 31, ...}]
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"Run of {self.schedule.name}: {self.wall_time:.0f} s"
@@ -0,0 +1,53 @@
+"""
+Exam Scheduler Web-UI
+Tsugunobu Miyake, Luke Snyder. 2025
+
+Tests of the hash of the params saved in the phase 2 checkpoints and used by the phase 1 cache.
+"""
+
+from django.test import SimpleTestCase
+
+from ..internal import checkpoint
+from ..internal.shared_params import SharedParams
+from .test_create_model import PENALTIES, tiny_params
+
+
+def semester_params(seed=0):
+    """
+    returns: tiny_params with the number of faculty of every pair of groups, which the SharedParams keep as well
+    """
+    params = tiny_params(seed)
+    params["N_f"] = {(g1, g2): sum(params["u"][f, g1] * params["u"][f, g2] for f in params["F"]) for g1 in params["G"] for g2 in params["G"]}
+    return params
+
+
+class ParamsHashTest(SimpleTestCase):
+    """
+    The hash of the shared params only changes when the params do, not with the order of the students, faculty and groups.
+    """
+
+    def digest(self, params):
+        shared_params = SharedParams(params)
+        try:
+            return checkpoint.params_hash(shared_params)
+        finally:
+            shared_params.unlink()
+
+    def test_order(self):
+        params = semester_params()
+        reordered = dict(params, S=params["S"][::-1], G=params["G"][::-1], F=params["F"][::-1],
+                         h=dict(reversed(params["h"].items())), T=params["T"][::-1])
+        self.assertEqual(self.digest(params), self.digest(reordered))
+
+    def test_changes(self):
+        params = semester_params()
+        digest = self.digest(params)
+        self.assertNotEqual(digest, self.digest(semester_params(seed=1)))
+        self.assertNotEqual(digest, self.digest(dict(params, n={**params["n"], 0: 1})))
+        self.assertNotEqual(digest, self.digest(dict(params, u={**params["u"], ("F1", "G0"): 1})))
+        # A student renamed, with the same groups.
+        renamed = dict(params, S=["S9"] + params["S"][1:], h={("S9" if s == "S0" else s, g): value for (s, g), value in params["h"].items()})
+        self.assertNotEqual(digest, self.digest(renamed))
+
+        self.assertEqual(checkpoint.run_hash(digest, PENALTIES), checkpoint.run_hash(digest, dict(reversed(PENALTIES.items()))))
+        self.assertNotEqual(checkpoint.run_hash(digest, PENALTIES), checkpoint.run_hash(digest, dict(PENALTIES, B2B=0.2)))
@@ -0,0 +1,69 @@
+"""
+Exam Scheduler Web-UI
+Tsugunobu Miyake, Luke Snyder. 2025
+
+Tests of the phase 2 model, on a tiny semester that SCIP solves to optimality in about a second.
+"""
+
+import contextlib
+import io
+import tempfile
+
+import numpy as np
+from django.test import SimpleTestCase, override_settings
+
+from ..internal.create_model import Phase2ModelCreator
+
+PENALTIES = {"overlap": 1, "B2B": 0.1, "PMtoAM": 0.05, "threein24": 0.3, "fourin48": 0.5, "facultyoverlap": 0.2, "facultyB2B": 0.1}
+
+
+def tiny_params(seed=0, num_groups=6, num_timeslots=9, num_students=8):
+    """
+    returns: the phase 2 params of a random semester, where every student takes 3 to 5 groups, so the 3 in 24 and 4 in 48 windows bind.
+             Faculty F0 teaches the first two groups and F1 the next two.
+    """
+    rng = np.random.default_rng(seed)
+    S = ["S" + str(s) for s in range(num_students)]
+    G = ["G" + str(g) for g in range(num_groups)]
+    T = list(range(num_timeslots))
+    F = ["F0", "F1"]
+    enrolled = {s: set(rng.choice(G, size=rng.integers(3, 6), replace=False).tolist()) for s in S}
+    taught = {"F0": {"G0", "G1"}, "F1": {"G2", "G3"}}
+
+    h = {(s, g): 1 if g in enrolled[s] else 0 for s in S for g in G}
+    u = {(f, g): 1 if g in taught[f] else 0 for f in F for g in G}
+    N_s = {g: sum(h[s, g] for s in S) for g in G}
+    return {"S": S, "G": G, "T": T, "F": F, "h": h, "u": u, "N_s": N_s,
+            "d": {t: 1 for t in T}, "n": {t: 1 if t % 3 == 2 else 0 for t in T},
+            "num_exams": {s: len(enrolled[s]) for s in S}, "f_num_exams": {f: len(taught[f]) for f in F}}
+
+
+class Phase2WindowsTest(SimpleTestCase):
+    """
+    The phase 2 model with lazy windows (Phase2WindowConshdlr) has the same optimum as the model with every window constraint.
+    """
+
+    def solve(self, lazy):
+        with override_settings(PHASE_2_LAZY_WINDOWS=lazy, PHASE_2_CONCURRENT_THREADS=1), \
+                tempfile.TemporaryDirectory() as output_dir, contextlib.redirect_stdout(io.StringIO()):
+            creator = Phase2ModelCreator(tiny_params(), PENALTIES, 8, output_dir)
+            mod = creator.create_SCIP_model()
+            windows = [cons for cons in mod.getConss() if cons.name.startswith(("threein24", "fourin48"))]
+            mod.hideOutput()
+            mod.optimize()
+            creator.eventhdlr.wait_for_writes()
+            solution = mod.getBestSol()
+            window_issues = sum(mod.getSolVal(solution, var) for key, var in creator.bad.items() if key[-1] in ["threein24", "fourin48"])
+            return mod.getStatus(), mod.getObjVal(), len(windows), window_issues
+
+    def test_lazy_windows(self):
+        eager_status, eager_obj, eager_windows, eager_issues = self.solve(lazy=False)
+        lazy_status, lazy_obj, lazy_windows, _ = self.solve(lazy=True)
+
+        self.assertEqual(eager_status, "optimal")
+        self.assertEqual(lazy_status, "optimal")
+        self.assertGreater(eager_windows, 0)
+        self.assertEqual(lazy_windows, 0)
+        # Some students can not avoid a 3 in 24 or 4 in 48, so the windows change the optimum.
+        self.assertGreater(eager_issues, 0)
+        self.assertAlmostEqual(lazy_obj, eager_obj, places=6)
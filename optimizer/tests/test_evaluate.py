@@ -0,0 +1,155 @@
+"""
+Exam Scheduler Web-UI
+Tsugunobu Miyake, Luke Snyder. 2025
+
+Tests of the ScheduleEvaluator against the per-student counting of the old Analyzer, on a fixed random schedule.
+"""
+
+import contextlib
+import datetime
+import io
+
+import numpy as np
+import pandas as pd
+from django.test import SimpleTestCase
+
+from ..internal.analyze import Analyzer
+from ..internal.evaluate import ScheduleEvaluator
+from ..models import Semester
+
+NUM_DAYS = 5
+DAILY_NUM_EXAMS = 4
+
+
+def small_analyzer(course_info, course_groupings, students_df, group2slot):
+    """
+    returns: an Analyzer of a semester of NUM_DAYS days with the default exam start times, without the database
+    """
+    analyzer = Analyzer.__new__(Analyzer)
+    analyzer.semester_entry = Semester(name="Test", exam_start_date=datetime.date(2025, 12, 1), exam_end_date=datetime.date(2025, 12, NUM_DAYS))
+    analyzer.duration = NUM_DAYS
+    analyzer.data = {"n": {t: 1 if t % DAILY_NUM_EXAMS == DAILY_NUM_EXAMS - 1 else 0 for t in range(NUM_DAYS * DAILY_NUM_EXAMS)},
+                     "forced_overlap": 0}
+    analyzer.course_info = course_info
+    analyzer.course_groupings = course_groupings
+    analyzer.students_df = students_df
+    analyzer.group2slot = group2slot
+    analyzer.compute_sol_schedule(group2slot, analyzer.semester_entry)
+    return analyzer
+
+
+def old_student_counts(analyzer, timeslots_of):
+    """
+    The student issues the way the old Analyzer counted them, one student at a time with the exam times in hours.
+    param timeslots_of: list of the timeslots of the exams of every student
+    returns: dict of the form {issue: total over the students}
+    """
+    n = analyzer.data["n"]
+    totals = {issue: 0 for issue in ScheduleEvaluator.STUDENT_ISSUES}
+    for timeslots in timeslots_of:
+        timeslots = sorted(timeslots)
+        unique = list(timeslots)
+        for i in range(len(timeslots) - 1):
+            if timeslots[i] == timeslots[i + 1]:
+                totals["overlap"] += 1
+                unique.remove(timeslots[i])
+        timeslots = unique
+
+        four_in_48 = 0
+        three_in_24 = 0
+        for i in range(len(timeslots) - 1):
+            if i < len(timeslots) - 3 and timeslots[i + 3] - timeslots[i] < 8:
+                hours = (analyzer.timeslot_to_time_object(timeslots[i + 3]) - analyzer.timeslot_to_time_object(timeslots[i])).total_seconds() / 3600
+                if hours < 48:
+                    four_in_48 = 1
+            if i < len(timeslots) - 2:
+                hours = (analyzer.timeslot_to_time_object(timeslots[i + 2]) - analyzer.timeslot_to_time_object(timeslots[i])).total_seconds() / 3600
+                if hours < 24:
+                    three_in_24 = 1
+            if timeslots[i + 1] - timeslots[i] == 1 and n[timeslots[i]] == 0:
+                totals["B2B"] += 1
+            if timeslots[i + 1] - timeslots[i] == 1 and n[timeslots[i]] == 1:
+                totals["PMtoAM"] += 1
+        totals["fourin48"] += four_in_48
+        totals["threein24"] += three_in_24
+    return totals
+
+
+class ScheduleEvaluatorTest(SimpleTestCase):
+    """
+    The ScheduleEvaluator counts the same student issues as the old Analyzer.
+    Its faculty issues are per faculty, where the Analyzer counts every timeslot of a faculty.
+    """
+
+    def setUp(self):
+        self.num_timeslots = NUM_DAYS * DAILY_NUM_EXAMS
+        # The Analyzer prints every issue it finds.
+        self.enterContext(contextlib.redirect_stdout(io.StringIO()))
+
+    def test_student_issues(self):
+        rng = np.random.default_rng(0)
+        num_groups = 30
+        num_students = 400
+        # Two crns per group, so that a student in both crns of a group has an overlap.
+        course_groupings = {"G" + str(g): [1000 + 2 * g, 1001 + 2 * g] for g in range(num_groups)}
+        course_info = {crn: {"course_group": group, "instructor": "TBD", "course_id": crn, "title": group}
+                       for group, crns in course_groupings.items() for crn in crns}
+        group2slot = {group: int(rng.integers(0, self.num_timeslots)) for group in course_groupings}
+
+        rows = []
+        enrollments = []
+        for s in range(num_students):
+            crns = rng.choice(list(course_info), size=rng.integers(1, 8), replace=False)
+            rows.append([s] + list(crns) + [np.nan] * (15 - len(crns)))
+            enrollments.append([course_info[crn]["course_group"] for crn in crns])
+        students_df = pd.DataFrame(rows, columns=["Randomized ID"] + ["CRN " + str(i) for i in range(1, 16)])
+
+        analyzer = small_analyzer(course_info, course_groupings, students_df, group2slot)
+        expected = old_student_counts(analyzer, [[group2slot[group] for group in groups] for groups in enrollments])
+        self.assertGreater(min(expected.values()), 0)
+
+        # The evaluator of the groups, with the windows of the Analyzer.
+        groups = list(course_groupings)
+        three_windows, four_windows = analyzer.compute_windows(self.num_timeslots)
+        night = np.array([analyzer.data["n"][t] for t in range(self.num_timeslots)])
+        student_enrollments = ([s for s, enrolled in enumerate(enrollments) for group in enrolled],
+                               [groups.index(group) for enrolled in enrollments for group in enrolled])
+        evaluator = ScheduleEvaluator(groups, num_students, student_enrollments, self.num_timeslots, night,
+                                      np.arange(self.num_timeslots - 1), three_windows, four_windows)
+        issues = evaluator.evaluate(evaluator.slots_of(group2slot))
+        for issue in ScheduleEvaluator.STUDENT_ISSUES:
+            self.assertEqual(issues[issue], expected[issue], issue)
+
+        global_issues, problems = analyzer.analyze_sol()
+        for issue, key in [("overlap", "student_overlap"), ("B2B", "student_back_to_back"), ("PMtoAM", "night_morning"),
+                           ("threein24", "three_in_24"), ("fourin48", "four_in_48")]:
+            self.assertEqual(global_issues[key], expected[issue], issue)
+
+    def test_faculty_overlap(self):
+        # Faculty A has two exams at timeslot 0 and two at timeslot 5. Faculty B has two crosslisted exams of one title at timeslot 9.
+        course_groupings = {"G0": [1], "G1": [2], "G2": [3], "G3": [4], "G4": [5], "G5": [6]}
+        course_info = {
+            1: {"course_group": "G0", "instructor": "A", "course_id": "C1", "title": "One"},
+            2: {"course_group": "G1", "instructor": "A", "course_id": "C2", "title": "Two"},
+            3: {"course_group": "G2", "instructor": "A", "course_id": "C3", "title": "Three"},
+            4: {"course_group": "G3", "instructor": "A", "course_id": "C4", "title": "Four"},
+            5: {"course_group": "G4", "instructor": "B", "course_id": "C5", "title": "Five"},
+            6: {"course_group": "G5", "instructor": "B", "course_id": "C6", "title": "Five"},
+        }
+        group2slot = {"G0": 0, "G1": 0, "G2": 5, "G3": 5, "G4": 9, "G5": 9}
+        analyzer = small_analyzer(course_info, course_groupings, pd.DataFrame(), group2slot)
+        old_overlaps, problems = analyzer.find_faculty_overlaps(course_info, analyzer.sol_schedule)
+
+        groups = list(course_groupings)
+        faculty = ["A", "B"]
+        faculty_enrollments = ([faculty.index(course_info[crn]["instructor"]) for group in groups for crn in course_groupings[group]],
+                               [groups.index(group) for group in groups for crn in course_groupings[group]])
+        evaluator = ScheduleEvaluator(groups, 0, ([], []), self.num_timeslots, np.zeros(self.num_timeslots, dtype=int),
+                                      np.arange(self.num_timeslots - 1), [], [], len(faculty), faculty_enrollments)
+        per_faculty = evaluator.faculty_issues(evaluator.faculty_counts(evaluator.slots_of(group2slot)))["facultyoverlap"]
+
+        # The Analyzer counts the two timeslots of A and skips the crosslisted exams of B.
+        self.assertEqual(old_overlaps, 2)
+        self.assertEqual([problem.split(",")[0] for problem in problems], ["Faculty: A", "Faculty: A"])
+        # The evaluator counts every faculty with two groups at one timeslot once, crosslisted or not.
+        self.assertEqual(per_faculty.tolist(), [1, 1])
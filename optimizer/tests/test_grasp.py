@@ -0,0 +1,166 @@
+"""
+Exam Scheduler Web-UI
+Tsugunobu Miyake, Luke Snyder. 2025
+
+Tests of the GRASP engine of phase 1, on a small random semester with a fixed seed.
+"""
+
+import unittest
+
+import numpy as np
+from django.test import SimpleTestCase
+
+from ..internal import kernels
+from ..internal.evaluate import ScheduleEvaluator
+from ..internal.grasp import CandidateSampler, GraspEngine, GraspPair
+
+NUM_GROUPS = 20
+NUM_TIMESLOTS = 9
+PENALTIES = {"overlap": 1, "B2B": 0.02, "PMtoAM": 0.04}
+
+
+def small_engine(local_search=GraspEngine.BEST_IMPROVEMENT, seed=0, num_groups=NUM_GROUPS, num_timeslots=NUM_TIMESLOTS, num_students=300):
+    """
+    returns: a GraspEngine of a random semester, where every student takes 2 to 5 groups, and the groups of every student.
+             Two groups are fixed, and every other group can not be placed at about a tenth of the timeslots
+    """
+    rng = np.random.default_rng(seed)
+    intersections = np.zeros((num_groups, num_groups), dtype=int)
+    enrollments = []
+    for s in range(num_students):
+        groups = rng.choice(num_groups, size=rng.integers(2, 6), replace=False)
+        intersections[np.ix_(groups, groups)] += 1
+        enrollments.append(groups)
+
+    N_s = {(g1, g2): intersections[g1, g2] for g1 in range(num_groups) for g2 in range(num_groups)}
+    for g in range(num_groups):
+        N_s[g] = intersections[g, g]
+    night = {t: 1 if t % 3 == 2 else 0 for t in range(num_timeslots)}
+
+    schedule = {t: [] for t in range(num_timeslots)}
+    schedule[0].append(num_groups - 1)
+    schedule[num_timeslots // 2].append(num_groups - 2)
+    pairs = [GraspPair(g, N_s[g], t) for g in range(num_groups - 2) for t in range(num_timeslots) if rng.random() >= 0.1]
+    max_group_size = 3 * intersections.diagonal().sum() / num_timeslots
+    return GraspEngine(pairs, schedule, PENALTIES, {"N_s": N_s, "n": night}, max_group_size, 0.01, local_search), enrollments
+
+
+def restart(engine, candidate, seed, cost_limit=float("inf")):
+    """
+    returns: the cost of a construction, the cost after its local search, and the timeslot of every group
+    """
+    engine.kernels = candidate
+    engine.rng = np.random.default_rng(seed)
+    cost = engine.construct(cost_limit)
+    improved = engine.local_search(cost)
+    return cost, improved, engine.get_solution()
+
+
+class GraspKernelsTest(SimpleTestCase):
+    """
+    Given the same random numbers, the loop kernels make the same schedules as the NumPy implementation of the GraspEngine.
+    """
+    TRIALS = 8
+
+    def check_kernels(self, candidate):
+        for local_search in [GraspEngine.BEST_IMPROVEMENT, GraspEngine.FIRST_IMPROVEMENT]:
+            engine, enrollments = small_engine(local_search)
+            for trial in range(self.TRIALS):
+                # Every fourth construction is abandoned halfway, at the cost limit.
+                cost_limit = float("inf") if trial % 4 else 5
+                with self.subTest(local_search=local_search, trial=trial):
+                    expected = restart(engine, None, trial, cost_limit)
+                    result = restart(engine, candidate, trial, cost_limit)
+                    if np.isinf(expected[0]):
+                        self.assertTrue(np.isinf(result[0]))
+                        continue
+                    self.assertAlmostEqual(result[0], expected[0])
+                    self.assertAlmostEqual(result[1], expected[1])
+                    np.testing.assert_array_equal(result[2], expected[2])
+
+    def test_python_kernels(self):
+        self.check_kernels(kernels.PYTHON)
+
+    @unittest.skipIf(kernels.COMPILED is None, "numba is not installed")
+    def test_compiled_kernels(self):
+        self.check_kernels(kernels.COMPILED)
+
+
+class GraspLocalSearchTest(SimpleTestCase):
+    """
+    The cost local_search keeps up to date with its deltas is the cost of the schedule it ends with.
+    """
+    TRIALS = 4
+
+    def evaluator_cost(self, engine, evaluator):
+        # The two fixed groups are not next to each other, so the issues the engine leaves out are all 0.
+        slot_of = np.empty(NUM_GROUPS, dtype=np.int64)
+        slot_of[engine.groups] = [engine.timeslots[slot] for slot in engine.slot_of]
+        issues = evaluator.evaluate(slot_of, pairs=True)
+        return ScheduleEvaluator.cost({issue: issues[issue + "_pairs"] for issue in PENALTIES}, PENALTIES)
+
+    def test_cost(self):
+        for local_search in [GraspEngine.BEST_IMPROVEMENT, GraspEngine.FIRST_IMPROVEMENT]:
+            engine, enrollments = small_engine(local_search)
+            night = np.array([1 if t % 3 == 2 else 0 for t in range(NUM_TIMESLOTS)])
+            student_enrollments = ([s for s, groups in enumerate(enrollments) for g in groups], np.concatenate(enrollments))
+            evaluator = ScheduleEvaluator(range(NUM_GROUPS), len(enrollments), student_enrollments, NUM_TIMESLOTS, night,
+                                          np.arange(NUM_TIMESLOTS - 1), [], [])
+            for trial in range(self.TRIALS):
+                with self.subTest(local_search=local_search, trial=trial):
+                    engine.rng = np.random.default_rng(trial)
+                    cost = engine.construct()
+                    self.assertAlmostEqual(cost, self.evaluator_cost(engine, evaluator))
+                    improved = engine.local_search(cost)
+                    self.assertLess(improved, cost)
+                    self.assertAlmostEqual(improved, self.evaluator_cost(engine, evaluator))
+
+                    # The deltas updated after every step are the deltas of the final schedule.
+                    move_delta = engine.move_delta.copy()
+                    swap_delta = engine.swap_delta.copy()
+                    engine.fill_move_delta(engine.free, engine.all_slots)
+                    engine.fill_swap_delta(engine.free)
+                    np.testing.assert_array_equal(move_delta, engine.move_delta)
+                    np.testing.assert_array_equal(swap_delta, engine.swap_delta)
+
+
+class CandidateSamplerTest(SimpleTestCase):
+    """
+    The segment trees of a construction, updated one placement at a time, draw the candidates the way a pass over the dense table would.
+    """
+
+    def halfway(self):
+        engine, enrollments = small_engine()
+        engine.rng = np.random.default_rng(1)
+        self.assertTrue(np.isinf(engine.construct(cost_limit=5)))
+        self.assertLess(engine.num_placed, engine.num_free - 1)
+        return engine
+
+    def test_no_drift(self):
+        engine = self.halfway()
+        rebuilt = CandidateSampler(engine.table, engine.unavailable, engine.smoothing)
+        np.testing.assert_array_equal(engine.sampler.weights, rebuilt.weights)
+        np.testing.assert_array_equal(engine.sampler.zeros, rebuilt.zeros)
+
+    def test_weighted(self):
+        engine = self.halfway()
+        table = engine.table + np.random.default_rng(0).random(engine.table.shape) + 0.1
+        sampler = CandidateSampler(table, engine.unavailable, engine.smoothing)
+        weights = 1 / (np.where(engine.unavailable, np.inf, table).ravel() + engine.smoothing)
+        cumulative = np.cumsum(weights)
+        # The middle of the interval of every candidate, away from the rounding at the ends.
+        for index in np.flatnonzero(weights > 0):
+            u = (cumulative[index] - weights[index] / 2) / cumulative[-1]
+            self.assertEqual(sampler.sample(u), index)
+
+    def test_zero_cost(self):
+        engine = self.halfway()
+        table = np.zeros_like(engine.table)
+        table[:, ::2] = 1
+        sampler = CandidateSampler(table, engine.unavailable, engine.smoothing)
+        zero = np.flatnonzero(~engine.unavailable.ravel() & (table.ravel() == 0))
+        for k in range(len(zero)):
+            self.assertEqual(sampler.sample((k + 0.5) / len(zero)), zero[k])
+
+        sampler = CandidateSampler(table, np.ones_like(engine.unavailable), engine.smoothing)
+        self.assertIsNone(sampler.sample(0.5))
@@ -0,0 +1,64 @@
+"""
+Exam Scheduler Web-UI
+Tsugunobu Miyake, Luke Snyder. 2025
+
+Tests of the ExamOptimizer that do not need a semester in the database.
+"""
+
+from django.test import SimpleTestCase, override_settings
+
+from ..internal.optimize import ExamOptimizer
+
+PENALTIES = {"overlap": 1, "B2B": 0.1, "PMtoAM": 0.05, "threein24": 0.3, "fourin48": 0.5, "facultyoverlap": 0.2, "facultyB2B": 0.1}
+
+
+def constrained_optimizer(group2slot, no_group2slot):
+    """
+    returns: an ExamOptimizer with only its constraints, without the database
+    """
+    optimizer = ExamOptimizer.__new__(ExamOptimizer)
+    optimizer.group2slot = group2slot
+    optimizer.no_groupslot = no_group2slot
+    return optimizer
+
+
+class Phase1KeyTest(SimpleTestCase):
+    """
+    Two phase 1 solves have the same key, and share their cached result, only when they give the same result.
+    """
+
+    def setUp(self):
+        self.optimizer = constrained_optimizer({"G0": 3}, {"G1": [0, 1]})
+
+    def key(self, penalties=PENALTIES, num_courses=20, warm_start_grasp=True, seconds_limit=60):
+        return self.optimizer.phase1_key(penalties, num_courses, warm_start_grasp, seconds_limit)
+
+    def test_equal(self):
+        self.assertEqual(self.key(), self.key())
+        # The same constraints in another order.
+        self.assertEqual(self.key(), constrained_optimizer({"G0": 3}, {"G1": [0, 1]}).phase1_key(dict(reversed(PENALTIES.items())), 20, True, 60))
+        # Phase 1 does not have the penalties of phase 2.
+        self.assertEqual(self.key(), self.key(penalties=dict(PENALTIES, threein24=2, facultyoverlap=0)))
+
+    def test_not_equal(self):
+        key = self.key()
+        self.assertNotEqual(key, self.key(penalties=dict(PENALTIES, B2B=0.5)))
+        self.assertNotEqual(key, self.key(num_courses=19))
+        self.assertNotEqual(key, self.key(warm_start_grasp=False))
+        self.assertNotEqual(key, self.key(seconds_limit=300))
+        self.assertNotEqual(key, constrained_optimizer({"G0": 4}, {"G1": [0, 1]}).phase1_key(PENALTIES, 20, True, 60))
+        self.assertNotEqual(key, constrained_optimizer({"G0": 3}, {"G1": [0]}).phase1_key(PENALTIES, 20, True, 60))
+
+    def test_settings(self):
+        key = self.key()
+        for name, value in [("MAX_STUDENTS_PER_SLOT", 10), ("GRASP_LOCAL_SEARCH", "first"), ("GRASP_LOCAL_SEARCH", None),
+                            ("GRASP_ELITE_POOL_SIZE", 1), ("GRASP_PATH_RELINKING_INTERVAL", 0), ("PHASE_1_GRASP_SEEDS", 1)]:
+            with self.subTest(name=name, value=value), override_settings(**{name: value}):
+                self.assertNotEqual(key, self.key())
+
+        # Without the GRASP warm start, only MAX_STUDENTS_PER_SLOT changes the solve.
+        key = self.key(warm_start_grasp=False)
+        with override_settings(GRASP_LOCAL_SEARCH="first", GRASP_ELITE_POOL_SIZE=1, PHASE_1_GRASP_SEEDS=1):
+            self.assertEqual(key, self.key(warm_start_grasp=False))
+        with override_settings(MAX_STUDENTS_PER_SLOT=10):
+            self.assertNotEqual(key, self.key(warm_start_grasp=False))
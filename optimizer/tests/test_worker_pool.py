@@ -0,0 +1,64 @@
+"""
+Exam Scheduler Web-UI
+Tsugunobu Miyake, Luke Snyder. 2025
+
+Tests of the WorkerPool, with tasks that sleep instead of solving.
+"""
+
+import contextlib
+import io
+import multiprocessing
+import time
+
+from django.test import SimpleTestCase
+
+from ..internal.worker_pool import WorkerPool
+
+
+def sleep(seconds):
+    time.sleep(seconds)
+    return seconds
+
+def fail(seconds):
+    time.sleep(seconds)
+    raise RuntimeError("failed task")
+
+
+class WorkerPoolTest(SimpleTestCase):
+    """
+    The WorkerPool runs the graph of tasks, and stops every process once a task failed.
+    """
+
+    def setUp(self):
+        self.pool = WorkerPool(2)
+        self.addCleanup(self.pool.shutdown)
+        self.enterContext(contextlib.redirect_stdout(io.StringIO()))
+
+    def test_results(self):
+        tasks = {"a": (1, sleep, (0.1,), []), "b": (1, sleep, lambda results: (results["a"] * 2,), ["a"]),
+                 "c": (1, sleep, lambda results: None, ["a"])}
+        self.assertEqual(self.pool.run_graph(tasks), {"a": 0.1, "b": 0.2, "c": None})
+
+    def test_failed_task(self):
+        # The long task and the queued one are stopped once the other task fails, instead of running on.
+        start = time.time()
+        with self.assertRaises(RuntimeError):
+            self.pool.run([(1, sleep, (60,)), (1, fail, (0.5,)), (1, sleep, (60,))])
+        self.assertLess(time.time() - start, 30)
+        self.assertEqual(multiprocessing.active_children(), [])
+
+    def test_memory(self):
+        # Two tasks of 80 MB do not fit in a budget of 100 MB at once. The task without memory fields is not estimated.
+        estimated = []
+        def estimate_memory(memory):
+            estimated.append(memory)
+            return memory["mb"], memory["name"]
+
+        pool = WorkerPool(2, memory_budget=100, estimate_memory=estimate_memory)
+        self.addCleanup(pool.shutdown)
+        start = time.time()
+        results = pool.run([(1, sleep, (0.5,), {"mb": 80, "name": "first"}), (1, sleep, (0.5,), {"mb": 80, "name": "second"}), (1, sleep, (0,))])
+        self.assertEqual(results, [0.5, 0.5, 0])
+        # A task waiting for memory is estimated again every time the pool tries to start it.
+        self.assertEqual({memory["name"] for memory in estimated}, {"first", "second"})
+        self.assertGreater(time.time() - start, 1)
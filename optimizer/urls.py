@@ -38,6 +38,9 @@ urlpatterns = [
     # Viewing a specific semester's conflict matrix.
     path("settings/show_matrix/<int:pk>", settings.show_overlap_matrix, name="show_matrix"),
 
+    # Progress of a running optimization. Polled by the dashboard.
+    path("optimization_progress/<int:schedule_pk>", dashboard.get_progress, name="optimization_progress"),
+
     # Deleting a Schedule.
     path("delete_schedule/<int:schedule_pk>", dashboard.delete, name="delete"),
 
@@ -50,12 +53,15 @@ urlpatterns = [
     # Optimization requests.
     path("begin_optimization/", optimize.begin, name="begin_optimization"),
     path("optimize_portfolio", optimize.create_schedule_portfolio, name="optimize_portfolio"),
+    path("reoptimize/", optimize.reoptimize, name="reoptimize"),
+    path("optimization_job/<int:job_pk>/", optimize.job_status, name="optimization_job"),
     
     # Analyzing a schedule.
     path("analyze/<int:schedule_pk>", analyze.analyze_schedule, name="analyze"),
 
     # Analysis related URLs.
     path("portfolio_summary/<int:portfolio_id>/", analyze.portfolio_summary, name="portfolio_summary"), 
+    path("compare_runs", analyze.compare_runs, name="compare_runs"),
     path("save", analyze.save, name="save"),
     path("schedule/", dummy, name="schedule_dummy"),
     path("schedule/<int:schedule_pk>", analyze.main, name="schedule"),
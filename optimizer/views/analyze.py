@@ -17,11 +17,12 @@ from django.views.decorators.http import require_POST
 from django.views.decorators.csrf import csrf_exempt
 
 from ..forms import ScheduleImportForm, CourseSearchForm
-from ..internal import analyze, schedule
+from ..internal import analyze, schedule, telemetry
 from ..models import (
     Course,
     CourseGroup,
     CourseGroupSchedule,
+    OptimizationRun,
     Schedule,
     ScheduleVersion,
     Semester,
@@ -336,6 +337,23 @@ def portfolio_summary(request, portfolio_id):
     }   
     return render(request, "optimizer/portfolio_summary.html", context)
 
+def compare_runs(request):
+    """
+    Compares the optimization runs of schedules side by side, e.g. the wall time of every stage before and after changing a setting.
+    param request: GET request with "runs", comma separated ids of OptimizationRuns,
+                   or "schedules", comma separated ids of schedules whose latest run is compared
+    returns: json of the form {"runs": [summary of every run], "stages": {stage: [stage of every run, or null]}}
+    """
+    try:
+        run_pks = [int(pk) for pk in request.GET.get("runs", "").split(",") if pk.strip()]
+        schedule_pks = [int(pk) for pk in request.GET.get("schedules", "").split(",") if pk.strip()]
+    except ValueError:
+        return JsonResponse({"error": "The ids must be numbers."}, status=400)
+    runs = [OptimizationRun.objects.filter(pk=pk).select_related("schedule").first() for pk in run_pks]
+    runs += [OptimizationRun.objects.filter(schedule_id=pk).select_related("schedule").order_by("-created_at").first() for pk in schedule_pks]
+    runs = [run for run in runs if run is not None]
+    return JsonResponse(telemetry.compare(runs))
+
 """
 The rest of these are helper methods, mostly for main. they compute some information that is needed for displaying a page
 """
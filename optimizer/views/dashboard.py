@@ -9,12 +9,12 @@ Retrieves exam data and displays them in the draggable table.
 import datetime
 
 from django.conf import settings
-from django.http import HttpResponse, HttpResponseRedirect
+from django.http import HttpResponse, HttpResponseRedirect, JsonResponse
 from django.shortcuts import get_object_or_404, render
 from django.urls import reverse
 
 from ..forms import ScheduleImportForm
-from ..internal import schedule
+from ..internal import schedule, progress
 from ..models import Course, CourseGroup, Schedule, ScheduleVersion
 
 """
@@ -48,6 +48,29 @@ def get_schedule_data():
         schedule_info["semester"] = schedule_entry.semester.name
         schedule_info["observable"] = int(schedule_entry.status) == Schedule.ANALYZED or int(schedule_entry.status) == Schedule.NOT_YET_ANALYZED
         schedule_info["status_label"] = schedule_entry.get_status()
+        schedule_info["optimizing"] = int(schedule_entry.status) == Schedule.PHASE_2
         schedules_data.append(schedule_info)
 
-    return schedules_data
\ No newline at end of file
+    return schedules_data
+
+def get_progress(request, schedule_pk):
+    """
+    param schedule_pk: primary key of the schedule being optimized
+    Polled by the dashboard while the schedule is optimized. Pass ?since=<id of the last entry received> to only receive new entries.
+    returns the current status and the recorded progress of the optimization in json
+    """
+    try:
+        schedule_entry = Schedule.objects.only("status").get(pk=schedule_pk)
+    except Schedule.DoesNotExist:
+        return JsonResponse({'error': 'Schedule not found'}, status=404)
+
+    try:
+        since = int(request.GET.get("since", 0))
+    except ValueError:
+        since = 0
+
+    return JsonResponse({
+        'status': schedule_entry.get_status(),
+        'optimizing': int(schedule_entry.status) == Schedule.PHASE_2,
+        'progress': progress.get_progress(schedule_pk, since),
+    })
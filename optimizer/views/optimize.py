@@ -12,18 +12,19 @@ django.setup()
 
 from django.shortcuts import render
 from django.urls import reverse
-from django.http import HttpResponse, HttpResponseRedirect
+from django.http import HttpResponse, HttpResponseRedirect, JsonResponse
 import datetime
 import json
 import html
 import os
 import django
+import time
 import traceback
 from django.conf import settings
 
-from ..internal import optimize, analyze, schedule
+from ..internal import optimize, analyze, schedule, jobs, checkpoint, telemetry
 from .settings import get_course_group_list
-from ..models import CourseGroup, Semester, Schedule, PreferenceProfile, PortfolioID
+from ..models import CourseGroup, Semester, Schedule, ScheduleVersion, PreferenceProfile, PortfolioID, OptimizationJob
 
 
 def main(request):
@@ -47,6 +48,18 @@ def get_semesters():
 
 def get_semester_course_data(request, semester_pk):
     semester_entry = Semester.objects.get(pk=semester_pk)
+
+    return_data = dict()
+    return_data["timeslot"] = get_available_slots(semester_entry)
+    return_data["course_group"] = get_course_group_list(remove_no_exam=True, semester_pk=semester_entry.pk)
+    
+    json_data = json.dumps(return_data)
+    return HttpResponse(json_data, content_type="application/json")
+
+def get_available_slots(semester_entry):
+    """
+    returns: dict of the form {timeslot: label}, e.g. {3: "12/10 (Mon) 08:00 AM"}, of the exam slots a course group can be fixed to
+    """
     end_date = semester_entry.exam_end_date
     available_slot = {}
 
@@ -63,81 +76,123 @@ def get_semester_course_data(request, semester_pk):
         if (date.date() == end_date or date.weekday() == 4) and date.time() == last_exam_time: # if it is the last block and either a friday or the last day.
             continue
         available_slot[timeslot] = date.strftime("%m/%d (%a) %I:%M %p")
+    return available_slot
 
-    return_data = dict()
-    return_data["timeslot"] = available_slot
-    return_data["course_group"] = get_course_group_list(remove_no_exam=True, semester_pk=semester_entry.pk)
-    
-    json_data = json.dumps(return_data)
-    return HttpResponse(json_data, content_type="application/json")
+def get_predefined_group2slot(semester_entry, predefined_constraints):
+    """
+    The predefined constraints of a schedule keep the labels of the exam slots shown on the optimize page, see get_available_slots.
+    param predefined_constraints: dict of the form {group: label}, or {group: timeslot}
+    returns: dict of the form {group: timeslot}
+    """
+    label2slot = {label: timeslot for timeslot, label in get_available_slots(semester_entry).items()}
+    group2slot = dict()
+    for group, slot in predefined_constraints.items():
+        if isinstance(slot, int) or str(slot).strip().isdigit():
+            group2slot[group] = int(slot)
+        elif slot in label2slot:
+            group2slot[group] = label2slot[slot]
+        else:
+            raise ValueError("The predefined exam slot {} of {} is not an exam slot of {}.".format(slot, group, semester_entry.name))
+    return group2slot
 
 def begin(request):
     """
-    Creates a new schedule by the user's inputs. pulls information from the form the user filled up and was a part of parameter request
+    Queues the optimization of a new schedule by the user's inputs, and returns the id of the job right away.
+    The job is run by `python manage.py run_optimization_jobs`, see optimize_schedule.
+    param request: html request by the browser, with the form the user filled up as its json body
+    returns: json of the form {"job_id": id}, whose status is given by job_status
+    """
+    if request.method == "GET":
+        return HttpResponseRedirect(reverse("optimize"))
+    data = json.loads(request.body)
+    print(request.body)
+    job = jobs.enqueue(OptimizationJob.SCHEDULE, data)
+    return JsonResponse({"job_id": job.pk})
+
+def job_status(request, job_pk):
+    """
+    returns: json describing the optimization job, with its status and, once done, its result or error
+    """
+    try:
+        return JsonResponse(jobs.job_status(job_pk))
+    except OptimizationJob.DoesNotExist:
+        return JsonResponse({"error": "No such job."}, status=404)
+
+def optimize_schedule(data, job=None):
+    """
+    Creates a new schedule by the user's inputs. Run by the job queued by begin.
     Begins by finding the semester object. Then solves phase1 to narrow the problem down, then solves phase2 to optimality
     IMPORTANT VALUES ARE SET INSIDE THIS FUNCTION
     The phase1 call has an argument for a list of numbers. For each INTEGER in this list, a process will be created to optimize phase1 for that many courses
     phase1 call has an argument for an INTEGER to set the time limit for phase1. This is used as a time limit for grasp and time minimum for scip, so longer is potentially a better solve
     phase1 call has a boolean argument as to whether or not to use grasp to warm scip phase1, this sometimes produces better, sometimes worse solutions
-    param request: html request by the browser
-    param semester_pk: database id to select the semester to optimize for
+    param data: dict of the form the user filled up, with semester_pk, the database id to select the semester to optimize for.
+                If it has resume_schedule_pk, phase 2 of that schedule is resumed from its checkpoints instead
+    param job: OptimizationJob running this optimization, if any
+    returns: dict of the form {"schedule_pk": id}, with "infeasible": True if phase 1 found the model infeasible
     """
-    if request.method == "GET":
-        return HttpResponseRedirect(reverse("optimize"))
-    else:
-        try:
-            data = json.loads(request.body)
-
-            print(request.body)
-            preference_profile_id = data["opt_type"]
-            preference_profile = PreferenceProfile.objects.get(pk=preference_profile_id)
-
-            semester_pk = data["semester_pk"]
-            schedule_name = html.escape(data["schedule_name"])
-            opt_type = data["opt_type"]
-            constraints = data["constraints"]
-            no_last_day = comma2list(data["nolastday"])
-            no_last_2days = comma2list(data["nolast2days"])
-            no_night = comma2list(data["nonight"])
-            no_fri_mon = comma2list(data["no_fri_mon"])
-            predefined_constraints = data["predefined_constraints"]
-
-            group2slot = dict()
-            for entry in constraints:
-                group2slot[entry["course_group"]] = entry["timeslot"]
-
-            group_constraints = {
-                "no_last_day": no_last_day,
-                "no_last_2days": no_last_2days,
-                "no_night": no_night,
-                "no_fri_mon": no_fri_mon
-            }
+    start = time.time()
+    optimizer = None
+    schedule_entry = None
+    try:
+        preference_profile_id = data["opt_type"]
+        preference_profile = PreferenceProfile.objects.get(pk=preference_profile_id)
+
+        semester_pk = data["semester_pk"]
+        schedule_name = html.escape(data["schedule_name"])
+        opt_type = data["opt_type"]
+        constraints = data["constraints"]
+        no_last_day = comma2list(data["nolastday"])
+        no_last_2days = comma2list(data["nolast2days"])
+        no_night = comma2list(data["nonight"])
+        no_fri_mon = comma2list(data["no_fri_mon"])
+        predefined_constraints = data["predefined_constraints"]
+
+        group2slot = dict()
+        for entry in constraints:
+            group2slot[entry["course_group"]] = entry["timeslot"]
+
+        group_constraints = {
+            "no_last_day": no_last_day,
+            "no_last_2days": no_last_2days,
+            "no_night": no_night,
+            "no_fri_mon": no_fri_mon
+        }
 
 
-            predefined_constraints_dict = dict()
-            for entry in predefined_constraints:
-                predefined_constraints_dict[entry["course_group"]] = entry["timeslot"]
-            
+        predefined_constraints_dict = dict()
+        for entry in predefined_constraints:
+            predefined_constraints_dict[entry["course_group"]] = entry["timeslot"]
+        
 
-            semester_entry = Semester.objects.get(pk=semester_pk)
-            
-            for catagory in group_constraints:
-                for course in group_constraints[catagory]:
-                    print("course:", course)
-            
-            
-            no_group2slot = get_no_group2slot(semester_entry, no_last_day, no_last_2days, no_night, no_fri_mon)
+        semester_entry = Semester.objects.get(pk=semester_pk)
+        
+        for catagory in group_constraints:
+            for course in group_constraints[catagory]:
+                print("course:", course)
+        
+        
+        no_group2slot = get_no_group2slot(semester_entry, no_last_day, no_last_2days, no_night, no_fri_mon)
 
-            time_strings = semester_entry.exam_start_times.split(",")
-            daily_num_exams = len(time_strings)
-            duration = semester_entry.exam_end_date - semester_entry.exam_start_date
-            total_exams = (duration.days + 1) * daily_num_exams
+        time_strings = semester_entry.exam_start_times.split(",")
+        daily_num_exams = len(time_strings)
+        duration = semester_entry.exam_end_date - semester_entry.exam_start_date
+        total_exams = (duration.days + 1) * daily_num_exams
 
-            optimizer = optimize.ExamOptimizer(semester_pk, group2slot, no_group2slot)
-            course_info = optimizer.get_course_info()
-            
+        optimizer = optimize.ExamOptimizer(semester_pk, group2slot, no_group2slot)
+        course_info = optimizer.get_course_info()
+        
+        checkpoints = None
+        if data.get("resume_schedule_pk") is not None:
+            # Phase 1 was done before the job runner stopped. Its results are in the checkpoints of the phase 2 runs.
+            schedule_entry = Schedule.objects.get(pk=data["resume_schedule_pk"])
+            checkpoints = checkpoint.load(schedule_entry)
+            phase1_group2slot = {key: saved.phase1_group2slot for key, saved in checkpoints.items()}
+        else:
             # Schedule is created with the name and semester, but no timeslot information yet
-            schedule_entry = initialize_schedule(schedule_name, semester_entry, course_info, penalties=preference_profile.get_penalty_dictionary(), group_constraints=group_constraints, predefined_constraints=predefined_constraints_dict)   
+            schedule_entry = initialize_schedule(schedule_name, semester_entry, course_info, penalties=preference_profile.get_penalty_dictionary(), group_constraints=group_constraints, predefined_constraints=predefined_constraints_dict, hard_constraints=group2slot)
+            if job is not None:
+                jobs.attach_schedule(job, schedule_entry)
 
             # Phase 1 optimization
             phase1_group2slot = phase1(optimizer, 
@@ -151,20 +206,25 @@ def begin(request):
             
             if -1 in phase1_group2slot: #-1 indicates model was found to be infeasible
                 schedule.update_status(schedule_entry, Schedule.INFEASIBLE)
-                return HttpResponse(status=200)
-            
-            # Phase 2 optimization.
-            phase2_group2slot, cost = phase2(optimizer, schedule_entry, preference_profile.get_penalty_dictionary(), total_exams, phase1_group2slot)
-    
-        # next, update the Schedule by specifying which group belongs to which exam slot
-            schedule.save(schedule_entry, phase2_group2slot)
-            # next analyze to generate the summary table (number of cases for each type of constraint)
-            schedule.analyze(schedule_entry)
-            return HttpResponse(status=200)
-        except Exception as e:
+                return {"schedule_pk": schedule_entry.pk, "infeasible": True}
+        
+        # Phase 2 optimization.
+        phase2_group2slot, cost = phase2(optimizer, schedule_entry, preference_profile.get_penalty_dictionary(), total_exams, phase1_group2slot, checkpoints)
+
+    # next, update the Schedule by specifying which group belongs to which exam slot
+        schedule.save(schedule_entry, phase2_group2slot)
+        # next analyze to generate the summary table (number of cases for each type of constraint)
+        analyze_and_record(optimizer, schedule_entry, OptimizationJob.SCHEDULE, start, cost)
+        checkpoint.clear(schedule_entry)
+        return {"schedule_pk": schedule_entry.pk}
+    except Exception:
+        if schedule_entry is not None:
             schedule.update_status(schedule_entry, Schedule.ERROR)
-            print(traceback.format_exc())
-            return HttpResponse(status=200)
+        raise
+    finally:
+        # Stops the processes of the phase 1 and phase 2 solves.
+        if optimizer is not None:
+            optimizer.close()
 
 
 def comma2list(comma_separated):
@@ -235,25 +295,47 @@ def phase0(semester_pk, constraints, no_group2slot, schedule_entry):
 
 def phase1(optimizer, schedule_entry, group2slot, num_exam_slots, num_phase1_courses, preference_profile, time_limit, warm_start_grasp):
     schedule.update_status(schedule_entry, Schedule.PHASE_1)
-    phase1_group2slot = optimizer.SCIP_optimize_phase1(num_exam_slots, num_phase1_courses, preference_profile, time_limit, warm_start_grasp)
+    phase1_group2slot = optimizer.SCIP_optimize_phase1(num_exam_slots, num_phase1_courses, preference_profile, time_limit, warm_start_grasp, schedule_entry.pk)
+    # Set by the optimizer if a cached phase 1 result was reused. Read it, so that the next save of the schedule keeps it.
+    schedule_entry.refresh_from_db(fields=["phase1_cached"])
     return phase1_group2slot
 
-def phase2(optimizer, schedule_entry, preference_profile, num_exam_slots, group2slot):
+def phase2(optimizer, schedule_entry, preference_profile, num_exam_slots, group2slot, checkpoints=None):
     output_dir = os.path.join(settings.OPT_HOME_DIR, schedule_entry.name)
     os.makedirs(output_dir, exist_ok=True)
     schedule.update_status(schedule_entry, Schedule.PHASE_2)
-    phase2_group2slot, cost = optimizer.SCIP_optimize_phase2(preference_profile, group2slot, num_exam_slots, output_dir)
+    phase2_group2slot, cost = optimizer.SCIP_optimize_phase2(preference_profile, group2slot, num_exam_slots, output_dir, schedule_entry.pk, checkpoints)
+
+    if settings.USE_LNS:
+        phase2_group2slot, cost = optimizer.LNS_optimize_phase2(preference_profile, phase2_group2slot, output_dir, settings.LNS_TIME_LIMIT, schedule_entry.pk, cost)
     
     print(phase2_group2slot)
     
     return phase2_group2slot, cost
 
+def analyze_and_record(optimizer, schedule_entry, kind, start, cost):
+    """
+    Analyzes an optimized schedule, then saves the OptimizationRun of its optimization with the stages of the optimizer, see telemetry.
+    param kind: kind of the OptimizationJob running the optimization
+    param start: time.time() when the optimization started
+    param cost: objective value of the schedule
+    """
+    analysis_start = time.time()
+    schedule.analyze(schedule_entry)
+    optimizer.stages.append(telemetry.stage("analysis", analysis_start, schedule_pk=schedule_entry.pk))
+    # The stages of the other schedules optimized by the same optimizer, e.g. of a portfolio, are left out.
+    stages = [entry for entry in optimizer.stages if entry.get("schedule_pk") in (None, schedule_entry.pk)]
+    telemetry.save_run(schedule_entry, kind, stages, start, objective=cost)
+
 # Create a Schedule instance without specifying timeslot information.
-def initialize_schedule(schedule_name, semester_entry, course_info, penalties, group_constraints={}, predefined_constraints={}):
+def initialize_schedule(schedule_name, semester_entry, course_info, penalties, group_constraints={}, predefined_constraints={}, hard_constraints=None):
+    """
+    param hard_constraints: dict of the form {group: timeslot} of the groups the optimizer fixes, saved so that a re-optimization fixes the same ones
+    """
     if schedule_name == "":
         schedule_name = str(semester_entry.name)
     
-    return schedule.create(schedule_name, semester_entry, course_info, penalties, group_constraints, predefined_constraints)
+    return schedule.create(schedule_name, semester_entry, course_info, penalties, group_constraints, predefined_constraints, hard_constraints)
 
 def timeslot_to_time(semester_entry, timeslot):
         exam_strings = semester_entry.exam_start_times.split(",")
@@ -269,6 +351,25 @@ def timeslot_to_time(semester_entry, timeslot):
 
 
 def create_schedule_portfolio(request):
+    """
+    Queues the optimization of a portfolio of schedules, one per penalty profile, and returns the id of the job right away.
+    returns: json of the form {"job_id": id}, whose status is given by job_status
+    """
+    print("running portfolio")
+    if request.method == "GET":
+        return HttpResponseRedirect(reverse("optimize"))
+    data = json.loads(request.body)
+    print(request.body)
+    job = jobs.enqueue(OptimizationJob.PORTFOLIO, data)
+    return JsonResponse({"job_id": job.pk})
+
+def optimize_portfolio(data, job=None):
+    """
+    Creates a schedule for every penalty profile of the portfolio. Run by the job queued by create_schedule_portfolio.
+    param data: dict of the form the user filled up
+    param job: OptimizationJob running this optimization, if any. A portfolio is not resumed after the job runner stopped
+    returns: dict of the form {"schedule_pks": [id, ...]}, with "infeasible": True if phase 1 found the model infeasible
+    """
     SURVEY_PENALTY = {
             "overlap": 1,
             "threein24": 0.075,
@@ -309,16 +410,8 @@ def create_schedule_portfolio(request):
                 "facultyoverlap": 0.2,
                 "facultyB2B": 0.1,
             }
-    print("running portfolio")
-    if request.method == "GET":
-        return HttpResponseRedirect(reverse("optimize"))
-        
     penalties = [("Survey", SURVEY_PENALTY), ("Less Night to Morning", SLEEPY_STUDENT_PENALTY), ("Minimize Back to Back", SHORT_ATTENSION_SPAN_PENALTY), ("Prioritize Faculty", PRIORITIZE_FACULTY_PENALTY)]
     # penalties = [("Survey", SURVEY_PENALTY), ("Less Night to Morning", SLEEPY_STUDENT_PENALTY)]
-    data = json.loads(request.body)
-
-    print(request.body)
-
     semester_pk = data["semester_pk"]
     schedule_name = html.escape(data["schedule_name"])
     constraints = data["constraints"]
@@ -342,6 +435,7 @@ def create_schedule_portfolio(request):
     predefined_constraints_dict = dict()
     for entry in predefined_constraints:
         predefined_constraints_dict[entry["course_group"]] = entry["timeslot"]
+    start = time.time()
     semester_entry = Semester.objects.get(pk=semester_pk)   
     time_strings = semester_entry.exam_start_times.split(",")
     daily_num_exams = len(time_strings)
@@ -350,37 +444,143 @@ def create_schedule_portfolio(request):
     
 
     portfolio_id_value = get_portfolio_id()
-    schedules = []
     no_group2slot = get_no_group2slot(semester_entry, no_last_day, no_last_2days, no_night, no_fri_mon) 
     optimizer = optimize.ExamOptimizer(semester_pk, group2slot, no_group2slot)
     course_info = optimizer.get_course_info()
-    for name, penalty in penalties:
-        schedule_entry = initialize_schedule(schedule_name + " " + name, semester_entry, course_info, penalty, group_constraints=group_constraints, predefined_constraints=predefined_constraints_dict)
-        schedule.update_status(schedule_entry, Schedule.PHASE_0)
-        phase1_group2slot = phase1(optimizer, schedule_entry, group2slot, total_exams, [20, 19, 18, 17], penalty, 300, True)
-        if -1 in phase1_group2slot: #-1 indicates model was found to be infeasible
-            schedule.update_status(schedule_entry, Schedule.INFEASIBLE)
-            return HttpResponse(status=200)
-        
-        grasp_phase2_group2slot, warm_cost = phase2(optimizer, schedule_entry, penalty, total_exams, phase1_group2slot)
-
-        # now try without grasp as a baseline
-        schedule.update_status(schedule_entry, Schedule.PHASE_0)
-        phase1_group2slot = phase1(optimizer, schedule_entry, group2slot, total_exams, [20, 19, 18, 17], penalty, 300, False)
-        if -1 in phase1_group2slot:
+    schedule_entries = []
+    try:
+        for name, penalty in penalties:
+            schedule_entry = initialize_schedule(schedule_name + " " + name, semester_entry, course_info, penalty, group_constraints=group_constraints,
+                                                 predefined_constraints=predefined_constraints_dict, hard_constraints=group2slot)
+            schedule_entry.portfolio_id = portfolio_id_value
+            schedule.update_status(schedule_entry, Schedule.PHASE_1)
+            schedule_entries.append(schedule_entry)
+
+        # The phase 1 solves and phase 2 runs of every schedule are one graph of tasks, run on the processes of the optimizer.
+        runs = []
+        for (name, penalty), schedule_entry in zip(penalties, schedule_entries):
+            output_dir = os.path.join(settings.OPT_HOME_DIR, schedule_entry.name)
+            os.makedirs(output_dir, exist_ok=True)
+            runs.append((penalty, output_dir, schedule_entry.pk))
+        results = optimizer.SCIP_optimize_portfolio(runs, total_exams, settings.PORTFOLIO_PHASE_1_NUM_COURSES, settings.PORTFOLIO_PHASE_1_TIME_LIMIT)
+        for schedule_entry in schedule_entries:
+            schedule_entry.refresh_from_db(fields=["phase1_cached"])
+
+        infeasible = False
+        for (penalty, output_dir, schedule_pk), schedule_entry, result in zip(runs, schedule_entries, results):
+            if result is None:
+                schedule.update_status(schedule_entry, Schedule.INFEASIBLE)
+                infeasible = True
+                continue
+            phase2_group2slot, cost = result
+            if settings.USE_LNS:
+                phase2_group2slot, cost = optimizer.LNS_optimize_phase2(penalty, phase2_group2slot, output_dir, settings.LNS_TIME_LIMIT, schedule_entry.pk, cost)
+            schedule.save(schedule_entry, phase2_group2slot)
+            analyze_and_record(optimizer, schedule_entry, OptimizationJob.PORTFOLIO, start, cost)
+    except Exception:
+        for schedule_entry in schedule_entries:
+            schedule.update_status(schedule_entry, Schedule.ERROR)
+        raise
+    finally:
+        optimizer.close()
+    result = {"schedule_pks": [entry.pk for entry in schedule_entries]}
+    if infeasible:
+        result["infeasible"] = True
+    return result
+
+def reoptimize(request):
+    """
+    Queues the re-optimization of an existing schedule or version, and returns the id of the job right away. See reoptimize_schedule.
+    param request: html request by the browser, with a json body of the form {"schedule_pk": id} or {"version_pk": id},
+                   and optionally "mode" (one of ExamOptimizer.REOPTIMIZE_MODES, phase2 by default), "time_limit" in seconds and "schedule_name"
+    returns: json of the form {"job_id": id}, whose status is given by job_status
+    """
+    if request.method == "GET":
+        return HttpResponseRedirect(reverse("index"))
+    data = json.loads(request.body)
+    if data.get("mode", optimize.ExamOptimizer.REOPTIMIZE_PHASE2) not in optimize.ExamOptimizer.REOPTIMIZE_MODES:
+        return JsonResponse({"error": "Unknown mode."}, status=400)
+    if data.get("version_pk") is not None:
+        if not ScheduleVersion.objects.filter(pk=data["version_pk"]).exists():
+            return JsonResponse({"error": "No such version."}, status=404)
+    elif data.get("schedule_pk") is None or not Schedule.objects.filter(pk=data["schedule_pk"]).exists():
+        return JsonResponse({"error": "No such schedule."}, status=404)
+    job = jobs.enqueue(OptimizationJob.REOPTIMIZE, data)
+    return JsonResponse({"job_id": job.pk})
+
+def reoptimize_schedule(data, job=None):
+    """
+    Creates a new schedule by improving an existing schedule or version, with the penalties and constraints of its schedule.
+    The groups fixed are the hard constraints saved with the schedule, or its predefined constraints if it was optimized before they were saved.
+    Phase 1 is skipped: the existing schedule is the starting point of a short phase 2 solve, LNS or local search, see ExamOptimizer.reoptimize.
+    Run by the job queued by reoptimize.
+    param data: dict with schedule_pk or version_pk, and optionally mode, time_limit (REOPTIMIZE_TIME_LIMIT by default) and schedule_name
+    param job: OptimizationJob running this optimization, if any. A re-optimization is not resumed after the job runner stopped
+    returns: dict of the form {"schedule_pk": id}, with "infeasible": True if no schedule was found
+    """
+    start = time.time()
+    optimizer = None
+    schedule_entry = None
+    try:
+        if data.get("version_pk") is not None:
+            version_entry = ScheduleVersion.objects.get(pk=data["version_pk"])
+            source_entry = version_entry.schedule
+            # A saved version has {group: {"slot_id": timeslot, "is_special": bool}}, like the schedules saved from the drag and drop.
+            start_group2slot = {group: slot["slot_id"] if isinstance(slot, dict) else slot for group, slot in version_entry.group2slot.items()}
+        else:
+            source_entry = Schedule.objects.get(pk=data["schedule_pk"])
+            start_group2slot = schedule.get_group2slot(source_entry)
+        semester_entry = source_entry.semester
+        penalties = source_entry.preference_profile
+        group_constraints = source_entry.group_constraints or {}
+        predefined_constraints = source_entry.predefined_constraints or {}
+        mode = data.get("mode", optimize.ExamOptimizer.REOPTIMIZE_PHASE2)
+        time_limit = float(data.get("time_limit") or settings.REOPTIMIZE_TIME_LIMIT)
+
+        no_group2slot = get_no_group2slot(semester_entry, group_constraints.get("no_last_day", []), group_constraints.get("no_last_2days", []),
+                                          group_constraints.get("no_night", []), group_constraints.get("no_fri_mon", []))
+
+        time_strings = semester_entry.exam_start_times.split(",")
+        daily_num_exams = len(time_strings)
+        duration = semester_entry.exam_end_date - semester_entry.exam_start_date
+        total_exams = (duration.days + 1) * daily_num_exams
+
+        # The groups fixed when the source schedule was optimized. The schedules saved before they were kept fix their predefined constraints.
+        hard_constraints = source_entry.hard_constraints
+        if hard_constraints is None:
+            hard_constraints = get_predefined_group2slot(semester_entry, predefined_constraints)
+        optimizer = optimize.ExamOptimizer(semester_entry.pk, hard_constraints, no_group2slot)
+
+        schedule_name = html.escape(data.get("schedule_name") or "[REOPTIMIZED] " + source_entry.name)
+        name = schedule_name
+        i = 1
+        while Schedule.objects.filter(name=name).exists():
+            name = schedule_name + " (" + str(i) + ")"
+            i += 1
+        schedule_entry = initialize_schedule(name, semester_entry, optimizer.get_course_info(), penalties=penalties,
+                                             group_constraints=group_constraints, predefined_constraints=predefined_constraints, hard_constraints=hard_constraints)
+        if job is not None:
+            jobs.attach_schedule(job, schedule_entry)
+
+        output_dir = os.path.join(settings.OPT_HOME_DIR, schedule_entry.name)
+        os.makedirs(output_dir, exist_ok=True)
+        schedule.update_status(schedule_entry, Schedule.PHASE_2)
+        print("re-optimizing {} ({} groups) with {} for {} s".format(source_entry.name, len(start_group2slot), mode, time_limit))
+        group2slot, cost = optimizer.reoptimize(penalties, start_group2slot, total_exams, output_dir, mode, time_limit, schedule_entry.pk)
+        if group2slot is None:
             schedule.update_status(schedule_entry, Schedule.INFEASIBLE)
-            return HttpResponse(status=200)
-        
-        reg_phase2_group2slot, reg_cost = phase2(optimizer, schedule_entry, penalty, total_exams, phase1_group2slot)
-
-        phase2_group2slot = grasp_phase2_group2slot if warm_cost < reg_cost else reg_phase2_group2slot
+            return {"schedule_pk": schedule_entry.pk, "infeasible": True}
 
-        schedule_entry.portfolio_id = portfolio_id_value
-        schedule.save(schedule_entry, phase2_group2slot)
-        schedule.analyze(schedule_entry)
-        
-        schedules.append(schedule_entry)
-    return HttpResponse(status=200)
+        schedule.save(schedule_entry, group2slot)
+        analyze_and_record(optimizer, schedule_entry, OptimizationJob.REOPTIMIZE, start, cost)
+        return {"schedule_pk": schedule_entry.pk}
+    except Exception:
+        if schedule_entry is not None:
+            schedule.update_status(schedule_entry, Schedule.ERROR)
+        raise
+    finally:
+        if optimizer is not None:
+            optimizer.close()
 
 def get_portfolio_id():
     portfolio_id = PortfolioID.objects.first()